@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Aggregator kernel against the previous implementation
+
+The legacy path (per-group lambda quantiles + row-wise confidence apply) is
+kept here as a reference: every run checks that both produce identical
+frames, then reports timings as the number of groups grows, with and
+without the bootstrap median confidence interval.
+
+With --rollups, times aggregate_rollups() (all grouping sets) against the
+finest level alone and against one pandas groupby per level computing the
+same columns (median CI included), after checking that every level of the
+rollups equals its per-level groupby.
+
+With --dtypes, builds the cleaned frame of --rows normalized listing records
+(benchmarks/synthetic.py) both ways: object-dtype string columns, as
+pd.DataFrame(listings) gave under the pinned pandas, and the Aggregator's
+categorical keys with downcast integers. Reports deep memory, the encoding
+cost, groupby / sort time and the full kernel on each, checking that both
+aggregate identically.
+
+Usage:
+    python benchmarks/bench_aggregation.py [--rows 200000] [--groups 100 1000 10000 50000]
+    python benchmarks/bench_aggregation.py --rollups
+    python benchmarks/bench_aggregation.py --dtypes --rows 1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.aggregator import Aggregator
+from pipeline.kernels import sort_segments, segment_quantiles
+from benchmarks.synthetic import normalized_listings, cycle
+from utils.records import NormalizedListing, record_columns
+
+
+def make_frame(n_rows: int, n_groups: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic cleaned listings spread over roughly n_groups groups"""
+    rng = np.random.default_rng(seed)
+    housing_types = ['studio', 'one_bedroom', 'two_bedroom', 'three_plus_bedroom', 'villa_house']
+    years = [2022, 2023, 2024, 2025, 2026]
+    n_neighborhoods = max(1, n_groups // (2 * len(housing_types) * len(years)))
+    
+    rent = np.round(rng.lognormal(11.5, 0.6, n_rows), -3)
+    size = rng.uniform(15, 250, n_rows)
+    size[rng.random(n_rows) < 0.6] = np.nan
+    
+    return pd.DataFrame({
+        'city': rng.choice(['douala', 'yaounde'], n_rows),
+        'neighborhood': np.char.add('quartier_', rng.integers(0, n_neighborhoods, n_rows).astype(str)),
+        'housing_type': rng.choice(housing_types, n_rows),
+        'year': rng.choice(years, n_rows),
+        'monthly_rent_xaf': rent,
+        'rent_per_sqm': rent / size,
+        'listing_url': np.char.add('https://example.cm/annonce/', np.arange(n_rows).astype(str)),
+    })
+
+
+def legacy_aggregate(df_clean: pd.DataFrame) -> pd.DataFrame:
+    """Previous kernel: lambda quantiles and apply(axis=1) confidence"""
+    aggregated = df_clean.groupby(Aggregator.GROUPBY_COLS).agg({
+        'monthly_rent_xaf': [
+            ('median_monthly_rent_xaf', 'median'),
+            ('p25_monthly_rent_xaf', lambda x: x.quantile(0.25)),
+            ('p75_monthly_rent_xaf', lambda x: x.quantile(0.75)),
+            ('mean_monthly_rent_xaf', 'mean'),
+            ('std_monthly_rent_xaf', 'std'),
+        ],
+        'rent_per_sqm': [
+            ('median_rent_per_sqm', 'median'),
+        ],
+        'listing_url': [
+            ('listing_count', 'count'),
+        ],
+    }).reset_index()
+    aggregated.columns = [col[0] if col[1] == '' else col[1] for col in aggregated.columns]
+    
+    aggregated['rent_volatility_score'] = (
+        aggregated['std_monthly_rent_xaf'] / aggregated['mean_monthly_rent_xaf']
+    ).fillna(0)
+    
+    def confidence(row):
+        if row['listing_count'] >= 10 and row['rent_volatility_score'] < 0.3:
+            return 'high'
+        elif row['listing_count'] >= 5 and row['rent_volatility_score'] < 0.5:
+            return 'medium'
+        return 'low'
+    
+    aggregated['data_confidence'] = aggregated.apply(confidence, axis=1)
+    aggregated = aggregated.drop(columns=['mean_monthly_rent_xaf', 'std_monthly_rent_xaf'])
+    return aggregated.sort_values(['city', 'year', 'neighborhood', 'housing_type'])
+
+
+def per_level_rollups(aggregator: Aggregator, df_clean: pd.DataFrame) -> pd.DataFrame:
+    """Reference: one pandas groupby per rollup level, with the columns of _rollup_frame"""
+    sort_cols = ['city', 'year', 'neighborhood', 'housing_type']
+    frames = []
+    for level, dims in Aggregator.ROLLUP_LEVELS.items():
+        grouped = df_clean.groupby(dims)
+        codes = grouped.ngroup().to_numpy()
+        stats = grouped.agg(
+            mean_monthly_rent_xaf=('monthly_rent_xaf', 'mean'),
+            std_monthly_rent_xaf=('monthly_rent_xaf', 'std'),
+            listing_count=('listing_url', 'count'),
+        )
+        rent_segments = sort_segments(codes, df_clean['monthly_rent_xaf'].to_numpy(dtype=float), grouped.ngroups)
+        rent_quantiles = segment_quantiles(*rent_segments)
+        ci_low, ci_high = aggregator._median_ci(rent_segments)
+        sqm_quantiles = segment_quantiles(
+            *sort_segments(codes, df_clean['rent_per_sqm'].to_numpy(dtype=float), grouped.ngroups),
+            quantiles=(0.5,),
+        )
+        
+        frame = stats.index.to_frame(index=False)
+        for col in Aggregator.GROUPBY_COLS:
+            if col not in dims:
+                frame[col] = Aggregator.ROLLUP_ALL
+        frame = frame[Aggregator.GROUPBY_COLS].astype(object)
+        frame['grouping_level'] = level
+        frame['median_monthly_rent_xaf'] = rent_quantiles[0.5]
+        frame['p25_monthly_rent_xaf'] = rent_quantiles[0.25]
+        frame['p75_monthly_rent_xaf'] = rent_quantiles[0.75]
+        frame['median_ci_low_xaf'] = ci_low
+        frame['median_ci_high_xaf'] = ci_high
+        frame['mean_monthly_rent_xaf'] = stats['mean_monthly_rent_xaf'].to_numpy()
+        frame['std_monthly_rent_xaf'] = stats['std_monthly_rent_xaf'].to_numpy()
+        frame['median_rent_per_sqm'] = sqm_quantiles[0.5]
+        frame['listing_count'] = stats['listing_count'].to_numpy()
+        frames.append(frame.sort_values([col for col in sort_cols if col in dims]))
+    
+    return aggregator._finalize(pd.concat(frames, ignore_index=True), sort=False)
+
+
+def time_call(func, *args, repeat: int = 3) -> float:
+    """Best-of-N wall time in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the aggregation kernel")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--groups', type=int, nargs='+', default=[100, 1_000, 10_000, 50_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--rollups', action='store_true', help="Benchmark grouping-set rollups")
+    parser.add_argument('--dtypes', action='store_true',
+                        help="Object-dtype vs categorical frame: memory and groupby time")
+    args = parser.parse_args()
+    
+    aggregator = Aggregator()
+    
+    if args.rollups:
+        bench_rollups(aggregator, args)
+        return
+    if args.dtypes:
+        bench_dtypes(args)
+        return
+    
+    no_ci = Aggregator(bootstrap_resamples=0)
+    ci_columns = ['median_ci_low_xaf', 'median_ci_high_xaf']
+    
+    print(f"{'groups':>8} {'actual':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8} "
+          f"{'+ median CI (s)':>16}")
+    for n_groups in args.groups:
+        df = make_frame(args.rows, n_groups)
+        
+        expected = legacy_aggregate(df)
+        actual = no_ci._aggregate_frame(df).drop(columns=ci_columns)
+        pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+        
+        legacy = time_call(legacy_aggregate, df, repeat=args.repeat)
+        vectorized = time_call(no_ci._aggregate_frame, df, repeat=args.repeat)
+        with_ci = time_call(aggregator._aggregate_frame, df, repeat=args.repeat)
+        print(f"{n_groups:>8} {len(actual):>8} {legacy:>12.3f} {vectorized:>15.3f} "
+              f"{legacy / vectorized:>7.1f}x {with_ci:>16.3f}")
+
+
+def bench_rollups(aggregator: Aggregator, args):
+    levels = len(Aggregator.ROLLUP_LEVELS)
+    print(f"{'groups':>8} {'finest (s)':>11} {'rollups (s)':>12} {'per-level (s)':>14} "
+          f"{'per-level/rollups':>18} {'rollups/finest':>15}")
+    for n_groups in args.groups:
+        df = make_frame(args.rows, n_groups)
+        
+        expected = per_level_rollups(aggregator, df)
+        actual = aggregator._rollup_frame(df)
+        # Quantiles and counts match exactly; volatility only to rounding,
+        # as bincount and pandas sum the means and deviations in different orders
+        for level in Aggregator.ROLLUP_LEVELS:
+            pd.testing.assert_frame_equal(
+                expected[expected['grouping_level'] == level].reset_index(drop=True),
+                actual[actual['grouping_level'] == level].reset_index(drop=True),
+                check_dtype=False, rtol=1e-12, obj=f"rollup level {level}",
+            )
+        
+        finest = time_call(aggregator._aggregate_frame, df, repeat=args.repeat)
+        rollups = time_call(aggregator._rollup_frame, df, repeat=args.repeat)
+        per_level = time_call(per_level_rollups, aggregator, df, repeat=args.repeat)
+        print(f"{n_groups:>8} {finest:>11.3f} {rollups:>12.3f} {per_level:>14.3f} "
+              f"{per_level / rollups:>17.2f}x {rollups / finest:>14.2f}x  ({levels} levels)")
+
+
+def object_frame(n_rows: int, pool: int = 50_000) -> pd.DataFrame:
+    """Cleaned frame of n_rows listing records with object-dtype string columns (previous path)"""
+    records = cycle([NormalizedListing.from_dict(listing) for listing in normalized_listings(pool)], n_rows)
+    df = pd.DataFrame(record_columns(records))
+    df = df[df['has_price'] & df['has_housing_type'] & df['has_date']].copy()
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(object)
+    return df
+
+
+def bench_dtypes(args):
+    aggregator = Aggregator(bootstrap_resamples=0)
+    legacy = object_frame(args.rows)
+    # float64 years (from None) would make the object path's years floats
+    legacy['year'] = legacy['year'].astype(np.int64)
+    
+    start = time.perf_counter()
+    compact = aggregator._encode(legacy.copy())
+    encode = time.perf_counter() - start
+    
+    expected = aggregator._aggregate_frame(legacy)
+    actual = aggregator._aggregate_frame(compact)
+    pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                  check_dtype=False, check_exact=True)
+    
+    cols = Aggregator.GROUPBY_COLS
+    print(f"{len(legacy):,} cleaned rows, {len(expected):,} groups (encoding took {encode:.3f}s)")
+    print(f"{'frame':<12} {'memory (MB)':>12} {'bytes/row':>10} {'groupby (s)':>12} {'sort (s)':>9} {'kernel (s)':>11}")
+    for label, df in (('object', legacy), ('categorical', compact)):
+        memory = df.memory_usage(deep=True).sum()
+        groupby = time_call(lambda: df.groupby(cols, observed=True)['monthly_rent_xaf'].agg(['mean', 'count']),
+                            repeat=args.repeat)
+        sort = time_call(lambda: df.sort_values(cols), repeat=args.repeat)
+        kernel = time_call(aggregator._aggregate_frame, df, repeat=args.repeat)
+        print(f"{label:<12} {memory / 1e6:>12.1f} {memory / len(df):>10.0f} {groupby:>12.3f} "
+              f"{sort:>9.3f} {kernel:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Startup time of each cli.py subcommand
+
+Runs `python -X importtime cli.py --startup-only <command>` several times per
+subcommand: the CLI parses its arguments, imports the subcommand's modules
+and exits. Reports median wall time, median import time attributable to the
+command (modules not already imported by a bare interpreter), and the
+heaviest top-level imports. Results are appended to a JSON Lines history so
+regressions show up as a diff against the previous run.
+
+Usage:
+    python benchmarks/bench_cli_startup.py [--runs 5] [--commands status export]
+    python cli.py bench
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, 'cli.py')
+
+# Add project root to path
+sys.path.insert(0, ROOT)
+
+from benchmarks.history import resolve, previous_entry, new_entry, append_entry
+
+# Same list as cli.COMMAND_MODULES (without importing cli here)
+DEFAULT_COMMANDS = ['status', 'trace', 'dump', 'archive', 'backfill', 'export', 'aggregate', 'normalize', 'scrape', 'run']
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Top-level module -> cumulative import time in microseconds"""
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level
+        if name.startswith(' ') and not name.startswith('  '):
+            top_level[name.strip()] = int(cumulative)
+    return top_level
+
+
+def measure(args: List[str]) -> Tuple[float, Dict[str, int]]:
+    """Wall time (s) and top-level import times of one interpreter run"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def bench_command(command: str, runs: int, baseline_modules: set) -> Dict[str, object]:
+    walls, imports = [], []
+    heaviest = {}
+    for _ in range(runs):
+        wall, modules = measure([CLI, '--startup-only', command])
+        own = {name: us for name, us in modules.items() if name not in baseline_modules}
+        walls.append(wall)
+        imports.append(sum(own.values()))
+        heaviest = own
+    top = sorted(heaviest.items(), key=lambda item: item[1], reverse=True)[:3]
+    return {
+        'wall_ms': round(statistics.median(walls) * 1000, 1),
+        'import_ms': round(statistics.median(imports) / 1000, 1),
+        'top_imports': {name: round(us / 1000, 1) for name, us in top},
+    }
+
+
+def run_benchmark(commands: List[str] = None, runs: int = 5,
+                  history_path: str = "benchmarks/results/cli_startup.jsonl") -> dict:
+    """
+    Measure every subcommand and append the results to the history file
+    
+    Returns:
+        History entry for this run
+    """
+    commands = commands or DEFAULT_COMMANDS
+    history_path = resolve(history_path)
+    
+    # Modules a bare interpreter already imports (site, encodings, ...)
+    baseline_wall, baseline_modules = measure(['-c', 'pass'])
+    previous = previous_entry(history_path)
+    
+    results = {}
+    print(f"{'command':<10} {'wall (ms)':>10} {'imports (ms)':>13} {'vs last':>9}  heaviest imports")
+    for command in commands:
+        result = bench_command(command, runs, set(baseline_modules))
+        results[command] = result
+        
+        change = ''
+        if previous and command in previous.get('commands', {}):
+            change = f"{result['wall_ms'] - previous['commands'][command]['wall_ms']:+.0f}"
+        top = ', '.join(f"{name} {ms:.0f}" for name, ms in result['top_imports'].items())
+        print(f"{command:<10} {result['wall_ms']:>10.1f} {result['import_ms']:>13.1f} {change:>9}  {top}")
+    print(f"(bare interpreter: {baseline_wall * 1000:.1f} ms)")
+    
+    entry = new_entry(
+        runs=runs,
+        baseline_wall_ms=round(baseline_wall * 1000, 1),
+        commands=results,
+    )
+    append_entry(history_path, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cli.py subcommand startup")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--commands', nargs='+', choices=DEFAULT_COMMANDS)
+    parser.add_argument('--history', default="benchmarks/results/cli_startup.jsonl",
+                        help="JSON Lines file results are appended to ('' to skip)")
+    args = parser.parse_args()
+    
+    run_benchmark(commands=args.commands, runs=args.runs, history_path=args.history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Memory per listing: plain dicts vs slotted listing records
+
+For raw (BaseScraper.build_listing_dict) and normalized
+(Normalizer.normalize_listing) listings, measures with tracemalloc the
+bytes held per listing by a list of --count listings, as plain dicts (the
+previous representation) and as RawListing / NormalizedListing records
+from utils/records.py. Listings are decoded from JSON lines, so every
+listing owns fresh strings as it would when scraped or loaded from a dump;
+records then share one interned copy of each categorical value.
+
+Also reports the container alone (sys.getsizeof) and the pickled size,
+which is what checkpoints and backfill worker results pay per listing.
+Results are appended to a JSON Lines history and compared with the
+previous entry.
+
+Usage:
+    python benchmarks/bench_listing_memory.py [--count 100000]
+"""
+
+import os
+import gc
+import sys
+import json
+import pickle
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.history import resolve, previous_entry, new_entry, append_entry
+from benchmarks.synthetic import Vocabulary, raw_listings, normalized_listings
+from utils.records import RawListing, NormalizedListing
+
+
+def retained_bytes(build: Callable[[], List[Any]]) -> int:
+    """Bytes still allocated once build() has returned its list (temporaries freed)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return current
+
+
+def pickled_bytes(listings: List[Any]) -> float:
+    return len(pickle.dumps(listings, protocol=pickle.HIGHEST_PROTOCOL)) / len(listings)
+
+
+def measure(lines: List[str], record_type) -> Dict[str, Dict[str, float]]:
+    """Per-listing bytes of the JSON lines decoded as dicts and as records"""
+    decoders = {
+        'dict': json.loads,
+        'record': lambda line: record_type.from_dict(json.loads(line)),
+    }
+    results = {}
+    for representation, decode in decoders.items():
+        results[representation] = {
+            'bytes_per_listing': round(retained_bytes(lambda: [decode(line) for line in lines]) / len(lines), 1),
+            'container_bytes': sys.getsizeof(decode(lines[0])),
+            'pickle_bytes': round(pickled_bytes([decode(line) for line in lines[:1000]]), 1),
+        }
+    return results
+
+
+def run_benchmark(count: int = 100000,
+                  history_path: str = "benchmarks/results/bench_listing_memory.jsonl") -> dict:
+    """
+    Measure both listing kinds and append the results to the history file
+    
+    Returns:
+        History entry for this run
+    """
+    history_path = resolve(history_path)
+    previous = previous_entry(history_path)
+    vocabulary = Vocabulary()
+    
+    results = {}
+    print(f"{'listing':<11} {'repr':<7} {'bytes/listing':>14} {'container':>10} {'pickled':>8} {'vs last':>8}")
+    for kind, generate, record_type in (('raw', raw_listings, RawListing),
+                                        ('normalized', normalized_listings, NormalizedListing)):
+        lines = [json.dumps(listing, ensure_ascii=False) for listing in generate(count, vocabulary=vocabulary)]
+        results[kind] = measure(lines, record_type)
+        
+        for representation, result in results[kind].items():
+            change = ''
+            last = (previous or {}).get('results', {}).get(kind, {}).get(representation)
+            if last and last.get('bytes_per_listing'):
+                change = f"{result['bytes_per_listing'] / last['bytes_per_listing']:.2f}x"
+            print(f"{kind:<11} {representation:<7} {result['bytes_per_listing']:>14,.0f} "
+                  f"{result['container_bytes']:>10} {result['pickle_bytes']:>8,.0f} {change:>8}")
+        
+        saved = 1 - results[kind]['record']['bytes_per_listing'] / results[kind]['dict']['bytes_per_listing']
+        print(f"{kind:<11} records hold {saved:.0%} less per listing")
+    
+    entry = new_entry(count=count, results=results)
+    append_entry(history_path, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory per listing, dicts vs slotted records")
+    parser.add_argument('--count', type=int, default=100000, help="Listings held per measurement")
+    parser.add_argument('--history', default="benchmarks/results/bench_listing_memory.jsonl",
+                        help="JSON Lines file results are appended to ('' to skip)")
+    args = parser.parse_args()
+    
+    run_benchmark(count=args.count, history_path=args.history)
+
+
+if __name__ == "__main__":
+    main()
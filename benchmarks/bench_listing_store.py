@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Raw dump access: indent=2 JSON array vs indexed JSON Lines store
+
+Writes --count synthetic raw listings both ways, the JSON array in one
+json.dump at the end of the scrape (the previous batch dump) and the
+ListingStore one batch per (source, city) as they would be scraped, then
+times reading them back: every listing, one (source, city) slice, and
+--lookups random single listings. The array has to be parsed whole for
+each of these; the store decodes only the records asked for.
+
+Results are appended to a JSON Lines history and compared with the
+previous entry.
+
+Usage:
+    python benchmarks/bench_listing_store.py [--count 100000] [--lookups 1000]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.history import resolve, previous_entry, new_entry, append_entry
+from benchmarks.synthetic import raw_listings
+from storage.listing_store import ListingStore
+
+
+def timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_benchmark(count: int = 100000, lookups: int = 1000,
+                  history_path: str = "benchmarks/results/bench_listing_store.jsonl") -> dict:
+    """
+    Time writes and reads of both dump formats and append the results to the history file
+    
+    Returns:
+        History entry for this run
+    """
+    history_path = resolve(history_path)
+    previous = previous_entry(history_path)
+    
+    listings = raw_listings(count)
+    batches = defaultdict(list)
+    for listing in listings:
+        batches[(listing['source_site'], listing['city'])].append(listing)
+    source, city = max(batches, key=lambda key: len(batches[key]))
+    rows = random.Random(42).sample(range(count), min(lookups, count))
+    
+    work_dir = tempfile.mkdtemp(prefix='bench_listing_store_')
+    array_path = os.path.join(work_dir, 'raw_listings.json')
+    store_path = os.path.join(work_dir, 'raw_listings.jsonl')
+    
+    def write_array():
+        with open(array_path, 'w', encoding='utf-8') as f:
+            json.dump(listings, f, indent=2, ensure_ascii=False)
+    
+    def load_array():
+        with open(array_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def write_store():
+        with ListingStore(store_path, mode='a') as store:
+            for batch in batches.values():
+                store.extend(batch)
+    
+    def store_reader(read: Callable[[ListingStore], Any]) -> Callable[[], Any]:
+        def run():
+            with ListingStore(store_path) as store:
+                return read(store)
+        return run
+    
+    try:
+        results: Dict[str, Dict[str, float]] = {
+            'array': {
+                'write_s': timed(write_array),
+                'bytes': os.path.getsize(array_path),
+                'read_all_s': timed(load_array),
+                'read_slice_s': timed(lambda: [
+                    listing for listing in load_array()
+                    if listing['source_site'] == source and listing['city'] == city
+                ]),
+                'lookups_s': timed(lambda: [load_array()[row] for row in rows[:1]]) * len(rows),
+            },
+            'store': {
+                'write_s': timed(write_store),
+                'bytes': sum(os.path.getsize(os.path.join(work_dir, name))
+                             for name in os.listdir(work_dir) if name.startswith('raw_listings.jsonl')),
+                'read_all_s': timed(store_reader(lambda store: store.read())),
+                'read_slice_s': timed(store_reader(lambda store: list(store.iter_slice(source, city)))),
+                'lookups_s': timed(store_reader(lambda store: [store[row] for row in rows])),
+            },
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print(f"{count:,} listings; slice {source}/{city} has {len(batches[(source, city)]):,}; "
+          f"{len(rows):,} lookups (array: one parse each, extrapolated from one)")
+    print(f"{'format':<7} {'MB':>7} {'write s':>8} {'read all s':>11} {'slice s':>8} {'lookups s':>10} {'vs last':>8}")
+    for name, result in results.items():
+        for key, value in result.items():
+            if key.endswith('_s'):
+                result[key] = round(value, 4)
+        change = ''
+        last = (previous or {}).get('results', {}).get(name)
+        if last and last.get('read_slice_s'):
+            change = f"{result['read_slice_s'] / last['read_slice_s']:.2f}x"
+        print(f"{name:<7} {result['bytes'] / 1e6:>7.1f} {result['write_s']:>8.3f} {result['read_all_s']:>11.3f} "
+              f"{result['read_slice_s']:>8.3f} {result['lookups_s']:>10.3f} {change:>8}")
+    
+    entry = new_entry(count=count, lookups=len(rows), results=results)
+    append_entry(history_path, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time raw dump writes and reads, JSON array vs indexed JSON Lines")
+    parser.add_argument('--count', type=int, default=100000, help="Listings in the dump")
+    parser.add_argument('--lookups', type=int, default=1000, help="Random single-listing reads")
+    parser.add_argument('--history', default="benchmarks/results/bench_listing_store.jsonl",
+                        help="JSON Lines file results are appended to ('' to skip)")
+    args = parser.parse_args()
+    
+    run_benchmark(count=args.count, lookups=args.lookups, history_path=args.history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Accuracy of the incremental quantile sketches against exact quantiles
+
+For each group size, draws --trials lognormal rent samples, splits each into
+--batches monthly batches and merges them the way incremental aggregation
+does: one TDigest per batch, merged into the state loaded from its JSON
+form. p25, median and p75 of the merged digest are compared with numpy's
+exact (linear-interpolation, as pandas) quantiles:
+
+    rank error   |fraction of the sample below the estimate - q|
+    value error  |estimate - exact| / exact
+
+The worst of the three quantiles is kept per trial; the table shows the
+maximum and mean over trials. These are the figures quoted in
+pipeline/quantile_sketch.py and the README.
+
+Results are appended to a JSON Lines history and compared with the
+previous entry.
+
+Usage:
+    python benchmarks/bench_quantile_sketch.py [--sizes 500 1000 5000 50000] [--batches 12]
+"""
+
+import os
+import sys
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.history import resolve, previous_entry, new_entry, append_entry
+from pipeline.quantile_sketch import TDigest
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+# Typical monthly rent (XAF) and spread of a group
+RENT_MEDIAN = 150000
+RENT_SIGMA = 0.5
+
+
+def trial_errors(values: np.ndarray, batches: int, compression: float) -> Tuple[float, float]:
+    """Worst rank and value error over QUANTILES for one sample merged in batches"""
+    digest = TDigest(compression)
+    for batch in np.array_split(values, batches):
+        digest = TDigest.from_dict(digest.to_dict(), compression).merge(TDigest(compression).update(batch))
+    
+    ordered = np.sort(values)
+    rank_error = value_error = 0.0
+    for q in QUANTILES:
+        estimate = digest.quantile(q)
+        # Mid-rank, so ties at the estimate count half
+        below = (np.searchsorted(ordered, estimate, 'left') + np.searchsorted(ordered, estimate, 'right')) / 2
+        exact = float(np.quantile(values, q))
+        rank_error = max(rank_error, abs(below / values.size - q))
+        value_error = max(value_error, abs(estimate - exact) / exact)
+    return rank_error, value_error
+
+
+def run_benchmark(sizes: List[int] = None, batches: int = 12, trials: int = 100,
+                  compression: float = 100, seed: int = 1,
+                  history_path: str = "benchmarks/results/bench_quantile_sketch.jsonl") -> dict:
+    """
+    Measure sketch error per group size and append the results to the history file
+    
+    Returns:
+        History entry for this run
+    """
+    sizes = sizes or [500, 1000, 5000, 50000]
+    history_path = resolve(history_path)
+    previous = previous_entry(history_path)
+    rng = np.random.default_rng(seed)
+    
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        # Large groups are slow to sort and rarely vary much between trials
+        runs = max(5, min(trials, trials * 5000 // size))
+        errors = np.array([
+            trial_errors(rng.lognormal(np.log(RENT_MEDIAN), RENT_SIGMA, size), batches, compression)
+            for _ in range(runs)
+        ])
+        results[str(size)] = {
+            'trials': runs,
+            'rank_error_max_pct': round(float(errors[:, 0].max()) * 100, 3),
+            'rank_error_mean_pct': round(float(errors[:, 0].mean()) * 100, 3),
+            'value_error_max_pct': round(float(errors[:, 1].max()) * 100, 3),
+        }
+    
+    print(f"Lognormal rents merged in {batches} batches, compression {compression:g}, "
+          f"worst of p25/p50/p75 per trial")
+    print(f"{'values':>8} {'trials':>7} {'rank max %':>11} {'rank mean %':>12} {'value max %':>12} {'vs last':>8}")
+    for size, result in results.items():
+        change = ''
+        last = (previous or {}).get('results', {}).get(size)
+        if last and last.get('rank_error_max_pct'):
+            change = f"{result['rank_error_max_pct'] / last['rank_error_max_pct']:.2f}x"
+        print(f"{int(size):>8,} {result['trials']:>7} {result['rank_error_max_pct']:>11.3f} "
+              f"{result['rank_error_mean_pct']:>12.3f} {result['value_error_max_pct']:>12.3f} {change:>8}")
+    
+    entry = new_entry(batches=batches, compression=compression, seed=seed, results=results)
+    append_entry(history_path, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank and value error of merged quantile sketches")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 5000, 50000],
+                        help="Values per group")
+    parser.add_argument('--batches', type=int, default=12, help="Monthly batches each group is merged from")
+    parser.add_argument('--trials', type=int, default=100, help="Samples per size (fewer for large sizes)")
+    parser.add_argument('--compression', type=float, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--history', default="benchmarks/results/bench_quantile_sketch.jsonl",
+                        help="JSON Lines file results are appended to ('' to skip)")
+    args = parser.parse_args()
+    
+    run_benchmark(sizes=args.sizes, batches=args.batches, trials=args.trials,
+                  compression=args.compression, seed=args.seed, history_path=args.history)
+
+
+if __name__ == "__main__":
+    main()
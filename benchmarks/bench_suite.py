@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Per-stage pipeline benchmark at increasing scale
+
+Times each stage on synthetic data (benchmarks/synthetic.py) at every scale:
+
+    parse_extract   BeautifulSoup(lxml) + GenericPortalScraper._parse_page, per card
+    parse_profile   the same pages through a compiled CSS extraction profile, per card
+    parse_xpath     the same pages through a compiled XPath profile (lxml tree), per card
+    parse_cached    parse_extract with every card already in the card cache, per card
+    price_parser    PriceParser.parse_price, per price string
+    date_extractor  DateExtractor.extract_date, per date string
+    normalizer      Normalizer.normalize_listing, per raw listing
+    deduplicator    Deduplicator.deduplicate, per normalized listing
+    aggregator      Aggregator.aggregate, per normalized listing
+    rollups         Aggregator.aggregate_rollups, per normalized listing
+    export_csv      Aggregator.export_csv of the aggregate, per listing aggregated
+    export_json     Aggregator.export_json of the aggregate, per listing aggregated
+
+Inputs larger than --pool records repeat a pool of distinct records (by
+reference), so 1M-record runs stay within memory; deduplication then sees
+the repeats as duplicates, as it would re-scraped listings. Scales up to
+100k are timed best of --repeat; larger scales run once. parse_extract is
+skipped above 100k cards (tens of minutes) unless --no-limits is given.
+parse_cached fills a card cache in a temporary directory with one untimed
+run first, so it times the unchanged-card case of a re-scrape.
+
+Results are appended to a JSON Lines history, one entry per run, and each
+stage is compared with the previous entry at the same scale.
+
+Usage:
+    python benchmarks/bench_suite.py [--scales 1000 100000 1000000] [--stages normalizer aggregator]
+    python benchmarks/bench_suite.py --scales 1000 10000 --repeat 5
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from benchmarks.history import resolve, previous_entry, new_entry, append_entry
+from benchmarks.synthetic import Vocabulary, raw_listings, normalized_listings, portal_pages, cycle
+from utils.records import RawListing, NormalizedListing
+
+DEFAULT_SCALES = [1000, 100000, 1000000]
+STAGES = ['parse_extract', 'parse_profile', 'parse_xpath', 'parse_cached', 'price_parser', 'date_extractor',
+          'normalizer', 'deduplicator', 'aggregator', 'rollups', 'export_csv', 'export_json']
+
+# Largest scale each stage runs at by default
+SCALE_LIMITS = {'parse_extract': 100000, 'parse_profile': 100000, 'parse_xpath': 100000, 'parse_cached': 100000}
+
+CARDS_PER_PAGE = 25
+
+# Extraction profiles (sources.yaml `extraction:`) for the synthetic pages
+BENCH_PROFILES = {
+    'parse_profile': {
+        'container': 'section.results > *',
+        'fields': {
+            'title': 'h3.title',
+            'price': 'span.price',
+            'date': 'span.date',
+            'description': 'p.description',
+            'url': {'select': 'a', 'attr': 'href'},
+            'bedrooms': {'select': 'ul.features', 'regex': r'(\d+) chambres'},
+            'size': {'select': 'ul.features', 'regex': r'(\d+) m²'},
+        },
+    },
+    'parse_xpath': {
+        'syntax': 'xpath',
+        'container': '//section[@class="results"]/*',
+        'fields': {
+            'title': './/h3',
+            'price': './/span[@class="price"]',
+            'date': './/span[@class="date"]',
+            'description': './/p',
+            'url': './/a/@href',
+            'bedrooms': {'select': './/ul', 'regex': r'(\d+) chambres'},
+            'size': {'select': './/ul', 'regex': r'(\d+) m²'},
+        },
+    },
+}
+
+# Fixed scrape time, so relative dates resolve identically on every run
+REFERENCE_DATE = datetime(2026, 1, 15)
+
+
+class Corpus:
+    """
+    Distinct synthetic records, generated once and sliced or repeated per scale
+    
+    Listings are RawListing / NormalizedListing records, as the stages receive
+    them from the scrapers and the normalizer.
+    """
+    
+    def __init__(self, pool_size: int, seed: int = 42):
+        self.pool_size = pool_size
+        self.seed = seed
+        self.vocabulary = Vocabulary()
+        self._raw = None
+        self._normalized = None
+        self._pages = None
+    
+    def raw(self, n: int) -> List[Dict[str, Any]]:
+        if self._raw is None:
+            self._raw = [RawListing.from_dict(listing)
+                         for listing in raw_listings(self.pool_size, self.seed, self.vocabulary)]
+        return cycle(self._raw, n)
+    
+    def normalized(self, n: int) -> List[Dict[str, Any]]:
+        if self._normalized is None:
+            self._normalized = [NormalizedListing.from_dict(listing)
+                                for listing in normalized_listings(self.pool_size, self.seed, self.vocabulary)]
+        return cycle(self._normalized, n)
+    
+    def pages(self, n_cards: int, cards_per_page: int) -> List[str]:
+        if self._pages is None:
+            # Parsing dominates this stage; a smaller pool of pages is enough
+            pool = min(self.pool_size, 10000)
+            self._pages = portal_pages(pool, cards_per_page, self.seed, self.vocabulary)
+        return cycle(self._pages, -(-n_cards // cards_per_page))
+
+
+def _consume(iterable):
+    deque(iterable, maxlen=0)
+
+
+def stage_runner(stage: str, corpus: Corpus, n: int, workdir: str) -> Tuple[Callable[[], Any], int]:
+    """
+    Prepare a stage's input outside the timed region
+    
+    Returns:
+        (zero-argument callable running the stage once, records it processes)
+    """
+    if stage in ('parse_extract', 'parse_cached'):
+        from scrapers.generic_scraper import GenericPortalScraper
+        card_cache = None
+        if stage == 'parse_cached':
+            from storage.card_cache import CardCache
+            card_cache = CardCache(os.path.join(workdir, f"card_cache_{n}.sqlite"))
+        scraper = GenericPortalScraper('Bench', 'https://bench.example/', card_cache=card_cache)
+        pages = corpus.pages(n, CARDS_PER_PAGE)
+        
+        def run():
+            for page in pages:
+                scraper._parse_page(BeautifulSoup(page, 'lxml'), 'douala', 'https://bench.example/')
+        if card_cache is not None:
+            # Fill the cache: the timed runs find every card in it
+            run()
+        return run, len(pages) * CARDS_PER_PAGE
+    
+    if stage in BENCH_PROFILES:
+        from scrapers.generic_scraper import GenericPortalScraper
+        scraper = GenericPortalScraper('Bench', 'https://bench.example/', extraction=BENCH_PROFILES[stage])
+        pages = [page.encode('utf-8') for page in corpus.pages(n, CARDS_PER_PAGE)]
+        
+        def run():
+            for page in pages:
+                scraper._parse_page(scraper.make_document(page), 'douala', 'https://bench.example/')
+        return run, len(pages) * CARDS_PER_PAGE
+    
+    if stage == 'price_parser':
+        from utils.price_parser import PriceParser
+        parser = PriceParser()
+        texts = [listing['rent_price_raw'] for listing in corpus.raw(n)]
+        return lambda: _consume(map(parser.parse_price, texts)), n
+    
+    if stage == 'date_extractor':
+        from utils.date_extractor import DateExtractor
+        extractor = DateExtractor()
+        texts = [listing['listing_date'] for listing in corpus.raw(n)]
+        return lambda: _consume(extractor.extract_date(text, reference=REFERENCE_DATE) for text in texts), n
+    
+    if stage == 'normalizer':
+        from pipeline.normalizer import Normalizer
+        normalizer = Normalizer()
+        listings = corpus.raw(n)
+        return lambda: _consume(
+            normalizer.normalize_listing(listing, reference_date=REFERENCE_DATE) for listing in listings
+        ), n
+    
+    if stage == 'deduplicator':
+        from pipeline.deduplicator import Deduplicator
+        deduplicator = Deduplicator()
+        listings = corpus.normalized(n)
+        return lambda: deduplicator.deduplicate(listings), n
+    
+    from pipeline.aggregator import Aggregator
+    aggregator = Aggregator()
+    listings = corpus.normalized(n)
+    
+    if stage == 'aggregator':
+        return lambda: aggregator.aggregate(listings), n
+    
+    if stage == 'rollups':
+        return lambda: aggregator.aggregate_rollups(listings), n
+    
+    # Exporters write the aggregate of n listings
+    aggregated = aggregator.aggregate(listings)
+    if stage == 'export_csv':
+        path = os.path.join(workdir, 'rental_intelligence.csv')
+        return lambda: aggregator.export_csv(aggregated, path), n
+    
+    if stage == 'export_json':
+        path = os.path.join(workdir, 'rental_intelligence.json')
+        return lambda: aggregator.export_json(aggregated, path), n
+    
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def time_stage(run: Callable[[], Any], records: int, repeat: int) -> Dict[str, float]:
+    """Best-of-repeat wall time of one stage run"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        'seconds': round(best, 4),
+        'records': records,
+        'records_per_second': round(records / best, 1) if best else None,
+    }
+
+
+def run_suite(scales: List[int] = None, stages: List[str] = None, repeat: int = 3,
+              pool_size: int = 50000, limits: bool = True,
+              history_path: str = "benchmarks/results/bench_suite.jsonl") -> dict:
+    """
+    Time every stage at every scale and append the results to the history file
+    
+    Returns:
+        History entry for this run
+    """
+    scales = scales or DEFAULT_SCALES
+    stages = stages or STAGES
+    history_path = resolve(history_path)
+    previous = previous_entry(history_path)
+    corpus = Corpus(pool_size)
+    
+    # Stage loggers report per batch / per page; keep them out of the timings
+    logging.disable(logging.WARNING)
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'stage':<15} {'scale':>9} {'seconds':>10} {'records/s':>12} {'vs last':>8}")
+    try:
+        with tempfile.TemporaryDirectory(prefix='bench_suite_') as workdir:
+            for stage in stages:
+                results[stage] = {}
+                for scale in scales:
+                    if limits and scale > SCALE_LIMITS.get(stage, scale):
+                        print(f"{stage:<15} {scale:>9,} {'skipped (--no-limits to run)':>32}")
+                        continue
+                    
+                    run, records = stage_runner(stage, corpus, scale, workdir)
+                    result = time_stage(run, records, repeat if scale <= 100000 else 1)
+                    results[stage][str(scale)] = result
+                    
+                    change = ''
+                    last = (previous or {}).get('stages', {}).get(stage, {}).get(str(scale))
+                    if last and last.get('seconds'):
+                        change = f"{result['seconds'] / last['seconds']:.2f}x"
+                    print(f"{stage:<15} {scale:>9,} {result['seconds']:>10.3f} "
+                          f"{result['records_per_second']:>12,.0f} {change:>8}")
+    finally:
+        logging.disable(logging.NOTSET)
+    
+    entry = new_entry(
+        repeat=repeat,
+        pool_size=pool_size,
+        scales=scales,
+        stages=results,
+    )
+    append_entry(history_path, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on synthetic data")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--stages', nargs='+', choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Runs per measurement at scales up to 100k (best is kept)")
+    parser.add_argument('--pool', type=int, default=50000,
+                        help="Distinct records generated; larger scales repeat them")
+    parser.add_argument('--no-limits', action='store_true',
+                        help="Also run parse_extract above 100k cards")
+    parser.add_argument('--history', default="benchmarks/results/bench_suite.jsonl",
+                        help="JSON Lines file results are appended to ('' to skip)")
+    args = parser.parse_args()
+    
+    run_suite(scales=args.scales, stages=args.stages, repeat=args.repeat,
+              pool_size=args.pool, limits=not args.no_limits, history_path=args.history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+JSON Lines benchmark history
+
+Each benchmark appends one entry per run (timestamp, commit, Python version,
+results), so a run can be compared with the previous one, or any two commits
+diffed, without a database.
+"""
+
+import os
+import json
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def resolve(history_path: str) -> str:
+    """History paths are relative to the project root"""
+    if history_path and not os.path.isabs(history_path):
+        return os.path.join(ROOT, history_path)
+    return history_path
+
+
+def previous_entry(history_path: str) -> Optional[dict]:
+    """Last entry of a history file, or None"""
+    if not history_path or not os.path.exists(history_path):
+        return None
+    last = None
+    with open(history_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                last = line
+    return json.loads(last) if last else None
+
+
+def new_entry(**fields) -> Dict[str, Any]:
+    """Entry with the run's provenance fields filled in"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        **fields,
+    }
+
+
+def append_entry(history_path: str, entry: Dict[str, Any]):
+    if not history_path:
+        return
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load test for the aggregate query service
+
+Starts the service in-process on a free port (or targets --url), replays a
+mix of filtered and range queries drawn from the dataset over keep-alive
+connections, and reports throughput with p50/p90/p99 latency.
+
+Usage:
+    python benchmarks/load_test_query_service.py [--data outputs/rental_intelligence.csv]
+        [--requests 5000] [--concurrency 8] [--url http://127.0.0.1:8765]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.query_server import create_server
+
+
+def build_queries(meta: dict, n: int, seed: int = 7) -> list:
+    """Random mix of point, multi-value and range queries"""
+    rng = random.Random(seed)
+    dims = meta['dimensions']
+    years = meta['years'] or [2026]
+    queries = []
+    
+    for _ in range(n):
+        params = {'city': rng.choice(dims['city'])}
+        kind = rng.random()
+        if kind < 0.4:
+            params['housing_type'] = rng.choice(dims['housing_type'])
+        elif kind < 0.7:
+            params['neighborhood'] = ','.join(rng.sample(dims['neighborhood'], min(2, len(dims['neighborhood']))))
+        else:
+            params['year_min'] = rng.choice(years)
+            params['year_max'] = max(years)
+            params['min_listings'] = rng.choice([1, 3, 5])
+        queries.append('/query?' + urlencode(params))
+    return queries
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_worker(host: str, port: int, paths: list) -> list:
+    """Issue requests sequentially on one keep-alive connection"""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    latencies = []
+    for path in paths:
+        start = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            raise RuntimeError(f"{path} -> HTTP {response.status}")
+    conn.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the aggregate query service")
+    parser.add_argument('--data', default='outputs/rental_intelligence.csv')
+    parser.add_argument('--url', help="Target a running service instead of starting one")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--distinct', type=int, default=500,
+                        help="Distinct queries in the mix (lower = more cache hits)")
+    args = parser.parse_args()
+    
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        server = create_server(args.data, port=0, poll_interval=0)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request('GET', '/meta')
+    meta = json.loads(conn.getresponse().read())
+    conn.close()
+    
+    distinct = build_queries(meta, args.distinct)
+    rng = random.Random(11)
+    paths = [rng.choice(distinct) for _ in range(args.requests)]
+    shards = [paths[i::args.concurrency] for i in range(args.concurrency)]
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda shard: run_worker(host, port, shard), shards))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(latency for shard in results for latency in shard)
+    print(f"Dataset:      {meta['rows']} rows ({meta['version']})")
+    print(f"Requests:     {len(latencies)} ({args.distinct} distinct, concurrency {args.concurrency})")
+    print(f"Throughput:   {len(latencies) / elapsed:,.0f} req/s")
+    print(f"Latency p50:  {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"Latency p90:  {percentile(latencies, 0.90) * 1000:.2f} ms")
+    print(f"Latency p99:  {percentile(latencies, 0.99) * 1000:.2f} ms")
+    
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
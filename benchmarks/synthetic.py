@@ -0,0 +1,237 @@
+"""
+Synthetic corpora for benchmarks
+
+Generates portal search pages whose listing cards match the selectors
+GenericPortalScraper._find_listing_elements tries (div.listing, article.property,
+div[class*="annonce"], ...), and raw / normalized listing dicts with the
+price, date, neighborhood and housing-type spellings the parsers see in real
+dumps. Vocabularies come from config/, so neighborhood and housing-type
+lookups hit the same alias tables as production.
+
+Everything is seeded: the same arguments always produce the same corpus.
+"""
+
+import os
+import random
+import itertools
+from typing import Any, Dict, List, Optional
+
+from utils.config import load_yaml, load_cities
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+
+# (tag, class) of listing cards, one per _find_listing_elements selector
+CARD_SHAPES = [
+    ('div', 'listing'),
+    ('div', 'property'),
+    ('div', 'item'),
+    ('div', 'card'),
+    ('article', 'listing'),
+    ('article', 'property'),
+    ('div', 'listing-card featured'),
+    ('div', 'property-tile'),
+    ('div', 'annonce-box'),
+    ('div', 'ad-tile'),
+]
+
+PRICE_FORMATS = [
+    "{amount:,} FCFA",
+    "{amount:,} FCFA / mois",
+    "{amount_dot} FCFA",
+    "{amount_k}k FCFA/mois",
+    "{amount:,} XAF par mois",
+    "{amount_year:,} FCFA/an",
+    "{amount_eur} €/month",
+    "{amount:,} F CFA",
+    "Prix sur demande",
+]
+
+DATE_FORMATS = [
+    "",
+    "il y a {days} jours",
+    "{weeks} weeks ago",
+    "il y a {months} mois",
+    "{year}-{month:02d}-{day:02d}",
+    "publié le {day} {month_fr} {year}",
+    "{month_en} {year}",
+]
+
+MONTHS_FR = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
+             'septembre', 'octobre', 'novembre', 'décembre']
+MONTHS_EN = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+             'september', 'october', 'november', 'december']
+
+SOURCES = ['Jumia House', 'Mapiole', 'Coin Afrique', 'Cameroon Immo', 'Agence Kmer']
+
+# Rough median monthly rent per housing type (XAF)
+BASE_RENT = {
+    'studio': 60_000, 'one_bedroom': 100_000, 'two_bedroom': 175_000,
+    'three_plus_bedroom': 300_000, 'villa_house': 600_000, 'unknown': 150_000,
+}
+
+
+class Vocabulary:
+    """Cities, neighborhood aliases and housing-type keywords from config/"""
+    
+    def __init__(self, config_dir: str = CONFIG_DIR):
+        neighborhoods = load_yaml(os.path.join(config_dir, 'neighborhoods.yaml'))
+        housing_types = load_yaml(os.path.join(config_dir, 'housing_types.yaml'))
+        
+        self.cities = [city for city in load_cities(config_dir) if neighborhoods.get(city)]
+        # city -> [(canonical, alias)]
+        self.neighborhoods = {
+            city: [(name, alias) for name, aliases in neighborhoods[city].items() for alias in aliases or [name]]
+            for city in self.cities
+        }
+        # housing type -> (keywords, bedrooms)
+        self.housing_types = {
+            name: (spec.get('keywords') or [name], spec.get('bedrooms'))
+            for name, spec in housing_types.items() if isinstance(spec, dict)
+        }
+
+
+def _price_text(rng: random.Random, amount: int) -> str:
+    fmt = rng.choice(PRICE_FORMATS)
+    return fmt.format(
+        amount=amount,
+        amount_dot=f"{amount:,}".replace(',', '.'),
+        amount_k=amount // 1000,
+        amount_year=amount * 12,
+        amount_eur=round(amount / 655.957),
+    ).replace(',', ' ')
+
+
+def _date_text(rng: random.Random) -> str:
+    month = rng.randint(1, 12)
+    return rng.choice(DATE_FORMATS).format(
+        days=rng.randint(1, 29), weeks=rng.randint(1, 7), months=rng.randint(1, 11),
+        year=rng.choice([2023, 2024, 2025, 2026]), month=month, day=rng.randint(1, 28),
+        month_fr=MONTHS_FR[month - 1], month_en=MONTHS_EN[month - 1],
+    )
+
+
+def raw_listings(n: int, seed: int = 42, vocabulary: Optional[Vocabulary] = None) -> List[Dict[str, Any]]:
+    """
+    n distinct raw listings shaped like BaseScraper.build_listing_dict output
+    
+    About 10% have no parseable price, 40% no size and 15% an unknown
+    neighborhood spelling, as in real dumps.
+    """
+    rng = random.Random(seed)
+    vocab = vocabulary or Vocabulary()
+    types = list(vocab.housing_types)
+    listings = []
+    for i in range(n):
+        city = rng.choice(vocab.cities)
+        _, alias = rng.choice(vocab.neighborhoods[city])
+        if rng.random() < 0.15:
+            alias = f"carrefour {rng.randint(1, 500)}"
+        housing_type = rng.choice(types)
+        keywords, bedrooms = vocab.housing_types[housing_type]
+        keyword = rng.choice(keywords)
+        amount = int(BASE_RENT.get(housing_type, 150_000) * rng.lognormvariate(0, 0.35)) // 5000 * 5000 or 5000
+        size = rng.randint(18, 400) if rng.random() < 0.6 else None
+        price = _price_text(rng, amount)
+        
+        description = (
+            f"{keyword.capitalize()} à louer à {alias}, {city}. "
+            f"{'%d m² ' % size if size else ''}{price}. "
+            f"Eau et électricité, gardiennage, parking. Réf {seed}-{i}"
+        )
+        listings.append({
+            'city': city,
+            'neighborhood': alias if rng.random() < 0.7 else '',
+            'housing_type_raw': keyword.title(),
+            'rent_price_raw': price,
+            'currency_raw': 'XAF',
+            'payment_frequency_raw': '',
+            'bedrooms_raw': str(bedrooms) if bedrooms is not None and rng.random() < 0.8 else '',
+            'size_raw': str(size) if size else '',
+            'listing_date': _date_text(rng),
+            'source_site': rng.choice(SOURCES),
+            'listing_url': f"https://bench.example/{city}/annonce-{seed}-{i}",
+            'full_description': description,
+        })
+    return listings
+
+
+def normalized_listings(n: int, seed: int = 42, vocabulary: Optional[Vocabulary] = None) -> List[Dict[str, Any]]:
+    """n distinct listings shaped like Normalizer.normalize_listing output"""
+    rng = random.Random(seed)
+    vocab = vocabulary or Vocabulary()
+    types = list(BASE_RENT)
+    listings = []
+    for i in range(n):
+        city = rng.choice(vocab.cities)
+        neighborhood = rng.choice(vocab.neighborhoods[city])[0] if rng.random() < 0.85 else ''
+        housing_type = rng.choice(types)
+        rent = float(int(BASE_RENT[housing_type] * rng.lognormvariate(0, 0.35)) // 1000 * 1000) if rng.random() < 0.9 else None
+        size = float(rng.randint(18, 400)) if rng.random() < 0.6 else None
+        year = rng.choice([2023, 2024, 2025, 2025, 2026, 2026])
+        listings.append({
+            'city': city,
+            'neighborhood': neighborhood,
+            'housing_type': housing_type,
+            'bedrooms': vocab.housing_types.get(housing_type, ([], None))[1],
+            'size_sqm': size,
+            'monthly_rent_xaf': rent,
+            'rent_per_sqm': rent / size if rent and size else None,
+            'year': year,
+            'month': rng.randint(1, 12),
+            'source_site': rng.choice(SOURCES),
+            'listing_url': f"https://bench.example/{city}/annonce-{seed}-{i}",
+            'has_price': rent is not None,
+            'has_size': size is not None,
+            'has_neighborhood': bool(neighborhood),
+            'has_housing_type': housing_type != 'unknown',
+            'has_date': True,
+        })
+    return listings
+
+
+def portal_page(listings: List[Dict[str, Any]], shape: int = 0, seed: int = 42) -> str:
+    """
+    A search results page rendering raw listings as cards of one CARD_SHAPES shape
+    
+    Cards carry a title, price, date, link and description in the markup the
+    generic extractors look for, between site navigation and a footer.
+    """
+    rng = random.Random(seed)
+    tag, css_class = CARD_SHAPES[shape % len(CARD_SHAPES)]
+    cards = []
+    for listing in listings:
+        path = listing['listing_url'].split('/', 3)[-1]
+        cards.append(
+            f'<{tag} class="{css_class}">'
+            f'<a href="/{path}"><img src="/img/{rng.randint(1, 10 ** 6)}.jpg" alt=""></a>'
+            f'<h3 class="title">{listing["housing_type_raw"]} à louer</h3>'
+            f'<span class="price">{listing["rent_price_raw"]}</span>'
+            f'<span class="date">{listing["listing_date"]}</span>'
+            f'<p class="description">{listing["full_description"]}</p>'
+            f'<ul class="features"><li>{listing["bedrooms_raw"] or "?"} chambres</li>'
+            f'<li>{listing["size_raw"] or "?"} m²</li></ul>'
+            f'</{tag}>'
+        )
+    nav = ''.join(f'<li><a href="/categorie/{i}">Catégorie {i}</a></li>' for i in range(30))
+    return (
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8"><title>Annonces</title>'
+        '<script>window.dataLayer=[];</script></head><body>'
+        f'<header><nav><ul>{nav}</ul></nav></header>'
+        f'<main><section class="results">{"".join(cards)}</section></main>'
+        '<footer><p>© Bench Immo</p></footer></body></html>'
+    )
+
+
+def portal_pages(n_listings: int, cards_per_page: int = 25, seed: int = 42,
+                 vocabulary: Optional[Vocabulary] = None) -> List[str]:
+    """Pages holding n_listings cards in total, cycling through every card shape"""
+    listings = raw_listings(n_listings, seed=seed, vocabulary=vocabulary)
+    return [
+        portal_page(listings[start:start + cards_per_page], shape=page, seed=seed + page)
+        for page, start in enumerate(range(0, n_listings, cards_per_page))
+    ]
+
+
+def cycle(items: List[Any], n: int) -> List[Any]:
+    """n items repeating a smaller pool (references, so large scales stay cheap in memory)"""
+    return list(itertools.islice(itertools.cycle(items), n))
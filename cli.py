@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+StratAxis command-line interface
+
+One entry point for the pipeline stages and housekeeping commands. Each
+subcommand imports only the modules it needs (COMMAND_MODULES), so `status`
+starts without loading pandas, requests or BeautifulSoup, and `export` does
+not load the scrapers.
+
+Usage:
+    python cli.py run [--resume] [--streaming] [--crawl-state PATH] [--card-cache [PATH]]
+    python cli.py scrape [--resume]          # scrape stage only (checkpointed)
+    python cli.py normalize                  # normalize + deduplicate the latest scrape
+    python cli.py aggregate                  # aggregate the latest deduplicated listings
+    python cli.py export                     # export the latest aggregates
+    python cli.py status
+    python cli.py backfill [--workers N]     # rebuild cleaned data + aggregates from all raw dumps
+    python cli.py archive [list|stats|files|restore|add] [SNAPSHOT] [PATHS...]
+    python cli.py trace [FILE...]            # rank sources / URL patterns by wasted fetch time
+    python cli.py dump [FILE] [--source S]   # records per (source, city) of a JSONL dump, or one slice
+    python cli.py bench [--runs 5]           # startup time per subcommand (-X importtime)
+"""
+
+import os
+import sys
+import argparse
+import importlib
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# Modules each subcommand loads before doing any work
+COMMAND_MODULES = {
+    'run': ['main', 'scrapers.generic_scraper', 'pipeline.normalizer', 'pipeline.deduplicator',
+            'pipeline.aggregator'],
+    'scrape': ['main', 'scrapers.generic_scraper'],
+    'normalize': ['main', 'pipeline.normalizer', 'pipeline.deduplicator'],
+    'aggregate': ['main', 'pipeline.aggregator'],
+    'export': ['main', 'pipeline.aggregator'],
+    'status': ['pipeline.checkpoint'],
+    'backfill': ['pipeline.backfill'],
+    'archive': ['storage.archive_store'],
+    'trace': ['utils.fetch_trace'],
+    'dump': ['storage.listing_store'],
+    'bench': ['benchmarks.bench_cli_startup'],
+}
+
+# (first stage, last stage) run by each stage subcommand; earlier stages
+# are loaded from their latest checkpoints
+STAGE_RANGES = {
+    'run': (None, None),
+    'scrape': (None, 'scrape'),
+    'normalize': ('normalize', 'deduplicate'),
+    'aggregate': ('aggregate', 'aggregate'),
+    'export': ('export', None),
+}
+
+
+def run_stages(args):
+    from main import StratAxisRentScraper
+    
+    from_stage, until = STAGE_RANGES[args.command]
+    scraper = StratAxisRentScraper(
+        storage_format=getattr(args, 'storage_format', 'json'),
+        resume=args.resume,
+        from_stage=args.from_stage or from_stage,
+        checkpoint_dir=args.checkpoint_dir,
+        streaming=getattr(args, 'streaming', False),
+        scrape_workers=getattr(args, 'scrape_workers', 4),
+        crawl_state_path=getattr(args, 'crawl_state', None),
+        metrics_dir=args.metrics,
+        metrics_textfile=args.metrics_textfile,
+        profile_dir=args.profile,
+        profile_memory=args.profile_memory,
+        profile_top=args.profile_top,
+        fetch_trace_dir=getattr(args, 'fetch_trace', None),
+        card_cache_path=getattr(args, 'card_cache', None),
+    )
+    scraper.run(until=until)
+
+
+def status(args):
+    """Latest checkpoints, outputs, crawl state and run manifest, without heavy imports"""
+    import glob
+    import json
+    import sqlite3
+    from datetime import datetime
+    from pipeline.checkpoint import CheckpointStore
+    
+    def age(path):
+        seconds = datetime.now().timestamp() - os.path.getmtime(path)
+        if seconds < 3600:
+            return f"{seconds / 60:.0f} min ago"
+        if seconds < 86400:
+            return f"{seconds / 3600:.1f} h ago"
+        return f"{seconds / 86400:.1f} days ago"
+    
+    store = CheckpointStore(args.checkpoint_dir)
+    print("Checkpoints")
+    for stage in ('scrape', 'normalize', 'deduplicate', 'aggregate'):
+        keys = store.keys(stage)
+        if not keys:
+            print(f"  {stage:<12} none")
+            continue
+        path = os.path.join(args.checkpoint_dir, stage, f"{keys[0]}.pkl")
+        print(f"  {stage:<12} {keys[0]}  {os.path.getsize(path) / 1e6:7.1f} MB  {age(path)}"
+              f"  ({len(keys)} kept)")
+    
+    print("\nOutputs")
+    for path in ('outputs/rental_intelligence.csv', 'outputs/rental_intelligence_rollups.csv'):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                rows = sum(1 for _ in f) - 1
+            print(f"  {path:<42} {rows:>7} rows  {age(path)}")
+        else:
+            print(f"  {path:<42} missing")
+    
+    crawl_state = 'data/state/crawl_state.sqlite'
+    if os.path.exists(crawl_state):
+        conn = sqlite3.connect(f"file:{crawl_state}?mode=ro", uri=True)
+        pages, missing = conn.execute(
+            "SELECT COUNT(*), SUM(status IN (404, 410)) FROM pages"
+        ).fetchone()
+        conn.close()
+        print(f"\nCrawl state: {pages} pages ({missing or 0} missing)  {age(crawl_state)}")
+    
+    card_cache = 'data/state/card_cache.sqlite'
+    if os.path.exists(card_cache):
+        conn = sqlite3.connect(f"file:{card_cache}?mode=ro", uri=True)
+        cards = conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        conn.close()
+        print(f"Card cache: {cards} cards  {age(card_cache)}")
+    
+    manifests = glob.glob('outputs/monthly_archives/*/*/run_manifest_*.json')
+    if manifests:
+        latest = max(manifests, key=os.path.basename)
+        with open(latest, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        fetch = manifest.get('fetch', {})
+        print(f"\nLast monthly run: {manifest['target_month']} ({manifest['mode']}), "
+              f"{manifest['duration_seconds']:.0f}s, {fetch.get('requests', 0)} requests, "
+              f"{fetch.get('bytes', 0) / 1e6:.1f} MB")
+
+
+def backfill(args):
+    from pipeline.backfill import Backfill
+    
+    Backfill(
+        raw_dir=args.raw_dir,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        aggregate=not args.no_aggregate,
+    ).run(run_id=args.run_id)
+
+
+def archive(args):
+    """Monthly snapshot archive: list, ratios, file listing, restore, manual add"""
+    import json
+    from storage.archive_store import ArchiveStore
+    
+    if args.action in ('files', 'restore', 'add') and not args.snapshot:
+        raise SystemExit(f"archive {args.action} needs a snapshot id")
+    
+    store = ArchiveStore(args.db)
+    try:
+        if args.action == 'list':
+            for snapshot in store.snapshots():
+                print(f"  {snapshot['snapshot_id']:<12} {snapshot['files']:>4} files "
+                      f"{snapshot['bytes'] / 1e6:8.2f} MB  {snapshot['created_at']}")
+        elif args.action == 'stats':
+            print(json.dumps(store.stats(), indent=2))
+        elif args.action == 'files':
+            for entry in store.files(args.snapshot):
+                print(f"  {entry['path']:<60} {entry['size']:>10} B  {entry['chunk_count']:>4} chunks  {entry['mode']}")
+        elif args.action == 'restore':
+            store.restore(args.snapshot, args.dest, paths=args.paths or None)
+        elif args.action == 'add':
+            print(json.dumps(store.add_snapshot(args.snapshot, args.paths, replace=args.replace), indent=2))
+    finally:
+        store.close()
+
+
+def trace(args):
+    """Summarize fetch traces (default: the latest in data/traces)"""
+    import glob
+    import json
+    from utils.fetch_trace import load_trace, summarize_trace, format_summary
+    
+    paths = args.files
+    if not paths:
+        traces = sorted(glob.glob('data/traces/fetch_trace_*.jsonl'))
+        if not traces:
+            raise SystemExit("No fetch traces in data/traces (run with --fetch-trace)")
+        paths = traces[-1:]
+    
+    summary = summarize_trace(load_trace(paths), top=args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        print(f"Trace: {', '.join(paths)}")
+        print(format_summary(summary), end='')
+
+
+def dump(args):
+    """Records per (source, city) of a JSON Lines dump, or selected records (default: the latest raw dump)"""
+    import glob
+    import json
+    from storage.listing_store import ListingStore
+    
+    path = args.file
+    if not path:
+        dumps = sorted(glob.glob('data/raw/raw_listings_*.jsonl'))
+        if not dumps:
+            raise SystemExit("No JSON Lines dumps in data/raw")
+        path = dumps[-1]
+    
+    with ListingStore(path) as store:
+        if args.rows:
+            records = [store[row] for row in args.rows]
+        elif args.source:
+            records = [store[row] for row in store.slice_rows(args.source, args.city)[:args.limit]]
+        else:
+            print(f"{path}: {len(store)} records")
+            slices = sorted(store.slices().items(), key=lambda item: item[1], reverse=True)
+            width = max([len(source) for (source, _), _ in slices] + [6])
+            print(f"{'source':<{width}} {'city':<15} {'records':>8}")
+            for (source, city), count in slices:
+                print(f"{source:<{width}} {city:<15} {count:>8}")
+            return
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+
+
+def bench(args):
+    from benchmarks.bench_cli_startup import run_benchmark
+    
+    run_benchmark(commands=args.commands, runs=args.runs, history_path=args.history)
+
+
+HANDLERS = {
+    'run': run_stages,
+    'scrape': run_stages,
+    'normalize': run_stages,
+    'aggregate': run_stages,
+    'export': run_stages,
+    'status': status,
+    'backfill': backfill,
+    'archive': archive,
+    'trace': trace,
+    'dump': dump,
+    'bench': bench,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description="StratAxis rent price intelligence")
+    # Import the subcommand's modules and exit (used by the startup benchmark)
+    parser.add_argument('--startup-only', action='store_true', help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    stage_help = {
+        'run': "Full pipeline",
+        'scrape': "Scrape all sources and checkpoint the raw listings",
+        'normalize': "Normalize and deduplicate the latest scrape checkpoint",
+        'aggregate': "Aggregate the latest deduplicated listings",
+        'export': "Export the latest aggregates to CSV/JSON",
+    }
+    for name, help_text in stage_help.items():
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--resume', action='store_true',
+                         help="Reuse stage checkpoints whose inputs, code and config are unchanged")
+        sub.add_argument('--checkpoint-dir', default="data/checkpoints")
+        if name == 'run':
+            sub.add_argument('--from-stage', choices=['scrape', 'normalize', 'deduplicate', 'aggregate', 'export'])
+            sub.add_argument('--streaming', action='store_true')
+            sub.add_argument('--scrape-workers', type=int, default=4)
+        else:
+            sub.set_defaults(from_stage=None)
+        if name in ('run', 'scrape', 'normalize'):
+            sub.add_argument('--storage-format', choices=['json', 'parquet'], default='json',
+                             help="Raw/cleaned listings as indexed JSON Lines dumps or partitioned Parquet")
+        if name in ('run', 'scrape'):
+            sub.add_argument('--crawl-state', help="Delta scrape page state database")
+            sub.add_argument('--fetch-trace', nargs='?', const="data/traces", metavar='DIR',
+                             help="Record every HTTP request to DIR/fetch_trace_<timestamp>.jsonl")
+            sub.add_argument('--card-cache', nargs='?', const="data/state/card_cache.sqlite", metavar='PATH',
+                             help="Reuse the listings extracted from cards seen in earlier runs")
+        sub.add_argument('--metrics', nargs='?', const="data/metrics", metavar='DIR',
+                         help="Record metrics and write run_metrics_<timestamp>.json to DIR")
+        sub.add_argument('--metrics-textfile', metavar='PATH', help="Also write a Prometheus textfile")
+        sub.add_argument('--profile', nargs='?', const="data/profiles", metavar='DIR',
+                         help="cProfile each stage and (source, city) scrape into DIR/<timestamp>/")
+        sub.add_argument('--profile-memory', action='store_true', help="Also record tracemalloc diffs")
+        sub.add_argument('--profile-top', type=int, default=25)
+    
+    sub = subparsers.add_parser('status', help="Checkpoints, outputs and last monthly run")
+    sub.add_argument('--checkpoint-dir', default="data/checkpoints")
+    
+    sub = subparsers.add_parser('backfill', help="Rebuild cleaned listings and aggregates from all raw dumps")
+    sub.add_argument('--raw-dir', default="data/raw")
+    sub.add_argument('--output-dir', default="data/backfill", help="Each run writes to <output-dir>/<run-id>")
+    sub.add_argument('--run-id', help="Output subdirectory (default: current timestamp)")
+    sub.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    sub.add_argument('--no-aggregate', action='store_true', help="Only rebuild the cleaned dataset")
+    
+    sub = subparsers.add_parser('archive', help="Deduplicated monthly snapshot archive")
+    sub.add_argument('action', nargs='?', default='list', choices=['list', 'stats', 'files', 'restore', 'add'])
+    sub.add_argument('snapshot', nargs='?', help="Snapshot id, e.g. 2026-01")
+    sub.add_argument('paths', nargs='*', help="Files to add, or to restore (default: all)")
+    sub.add_argument('--db', default="data/archive/archive.sqlite")
+    sub.add_argument('--dest', default=".", help="Directory restored files are written under")
+    sub.add_argument('--replace', action='store_true', help="Overwrite an existing snapshot on add")
+    
+    sub = subparsers.add_parser('trace', help="Rank sources and URL patterns by wasted fetch time")
+    sub.add_argument('files', nargs='*', help="Trace files (default: the latest in data/traces)")
+    sub.add_argument('--top', type=int, default=20, help="Rows per ranking")
+    sub.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    
+    sub = subparsers.add_parser('dump', help="Inspect an indexed JSON Lines listing dump")
+    sub.add_argument('file', nargs='?', help="Dump file (default: the latest data/raw/raw_listings_*.jsonl)")
+    sub.add_argument('--source', help="Print this source's records")
+    sub.add_argument('--city', help="With --source: only this city")
+    sub.add_argument('--row', dest='rows', type=int, action='append', help="Print the record at this position (repeatable)")
+    sub.add_argument('--limit', type=int, default=20, help="Records printed with --source")
+    
+    sub = subparsers.add_parser('bench', help="Measure startup time per subcommand")
+    sub.add_argument('--runs', type=int, default=5)
+    sub.add_argument('--commands', nargs='+', choices=[name for name in COMMAND_MODULES if name != 'bench'])
+    sub.add_argument('--history', default="benchmarks/results/cli_startup.jsonl",
+                     help="JSON Lines file results are appended to ('' to skip)")
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    for module in COMMAND_MODULES[args.command]:
+        importlib.import_module(module)
+    if args.startup_only:
+        return
+    
+    HANDLERS[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
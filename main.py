@@ -6,8 +6,9 @@ Main orchestration script for scraping, normalizing, and aggregating rental data
 
 import os
 import sys
-import json
-import yaml
+import time
+import argparse
+from collections import Counter
 from datetime import datetime
 from typing import List, Dict, Any
 
@@ -15,23 +16,116 @@ from typing import List, Dict, Any
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from utils.logger import setup_logger
-from scrapers.generic_scraper import GenericPortalScraper
-from pipeline.normalizer import Normalizer
-from pipeline.deduplicator import Deduplicator
-from pipeline.aggregator import Aggregator
+from utils.metrics import get_metrics, enable_metrics
+from utils.profiler import Profiler, NullProfiler
+from utils.fetch_trace import get_fetch_trace, enable_fetch_trace
+from utils.config import load_cities, load_sources, source_cities
+from pipeline.checkpoint import CheckpointStore, fingerprint
+from storage.crawl_state import CrawlState
+from storage.card_cache import CardCache
+from storage.listing_store import ListingStore
+
+# Scrapers (requests, BeautifulSoup, lxml), the normalizer and the aggregator
+# (pandas, NumPy) are imported where they are first used, so commands that
+# only load checkpoints or report status start quickly (see cli.py)
 
 
 class StratAxisRentScraper:
     """Main orchestrator for the rent price intelligence system"""
     
-    def __init__(self):
+    STORAGE_FORMATS = ('json', 'parquet')
+    
+    STAGES = ['scrape', 'normalize', 'deduplicate', 'aggregate', 'export']
+    
+    # Code and config each checkpointed stage depends on
+    STAGE_FILES = {
+        'scrape': [
+            'config/sources.yaml', 'config/cities.yaml',
+            'scrapers/base_scraper.py', 'scrapers/generic_scraper.py', 'scrapers/extraction_profile.py',
+            'utils/records.py',
+        ],
+        'normalize': [
+            'config/neighborhoods.yaml', 'config/housing_types.yaml', 'pipeline/normalizer.py',
+            'utils/price_parser.py', 'utils/date_extractor.py', 'utils/records.py',
+        ],
+        'deduplicate': ['pipeline/deduplicator.py', 'utils/records.py'],
+        'aggregate': [
+            'pipeline/aggregator.py', 'pipeline/kernels.py', 'pipeline/quantile_sketch.py',
+        ],
+    }
+    
+    def __init__(self, sketch_state_path: str = None, batch_id: str = None,
+                 storage_format: str = 'json', resume: bool = False,
+                 from_stage: str = None, checkpoint_dir: str = "data/checkpoints",
+                 streaming: bool = False, scrape_workers: int = 4,
+                 crawl_state_path: str = None, metrics_dir: str = None,
+                 metrics_textfile: str = None, profile_dir: str = None,
+                 profile_memory: bool = False, profile_top: int = 25,
+                 fetch_trace_dir: str = None, card_cache_path: str = None):
         self.logger = setup_logger("main")
-        self.cities = ['douala', 'yaounde']
-        
-        # Initialize components
-        self.normalizer = Normalizer()
-        self.deduplicator = Deduplicator()
-        self.aggregator = Aggregator()
+        self.cities = load_cities()
+        
+        # Instrumentation: off (no-op sink) unless a metrics output is requested.
+        # Enabled before any component is built, since components bind it at init
+        self.metrics_dir = metrics_dir
+        self.metrics_textfile = metrics_textfile
+        self.metrics = enable_metrics() if (metrics_dir or metrics_textfile) else get_metrics()
+        
+        # Profiling: one cProfile (+ tracemalloc) capture per stage and per (source, city)
+        self.profiler = (Profiler(profile_dir, memory=profile_memory, top=profile_top)
+                         if profile_dir else NullProfiler())
+        
+        # Fetch trace: one JSONL record per HTTP request attempt (bound by scrapers at init)
+        self.fetch_trace = (
+            enable_fetch_trace(os.path.join(
+                fetch_trace_dir, f"fetch_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            ))
+            if fetch_trace_dir else get_fetch_trace()
+        )
+        
+        # Components are created on first use
+        self._normalizer = None
+        self._deduplicator = None
+        self._aggregator = None
+        
+        # Incremental aggregation: merge into persisted quantile sketches
+        self.sketch_state_path = sketch_state_path
+        self.batch_id = batch_id
+        
+        # Raw/cleaned listing storage: indexed JSON Lines dumps (ListingStore) or partitioned Parquet
+        if storage_format not in self.STORAGE_FORMATS:
+            raise ValueError(f"Unknown storage format: {storage_format}")
+        self.storage_format = storage_format
+        
+        # Stage checkpoints: --resume reuses valid ones, --from-stage reruns from a stage
+        if from_stage is not None and from_stage not in self.STAGES:
+            raise ValueError(f"Unknown stage: {from_stage}")
+        self.resume = resume
+        self.from_stage = from_stage
+        self.checkpoints = CheckpointStore(checkpoint_dir)
+        self._upstream_key = None
+        self.until = None
+        
+        # Streaming mode: scrape, normalize and deduplicate concurrently
+        if streaming and from_stage in ('normalize', 'deduplicate'):
+            raise ValueError(f"--from-stage {from_stage} needs the batch pipeline (no --streaming)")
+        self.streaming = streaming
+        self.scrape_workers = scrape_workers
+        
+        # Delta scrapes: only fetch pages that may have changed, carry the rest forward
+        self.crawl_state = CrawlState(crawl_state_path) if crawl_state_path else None
+        self._scrapers = []
+        self._listing_stores = []
+        
+        # Card cache: unchanged cards of changed pages are not extracted again
+        # (keyed by the scrape stage's code and config, like its checkpoints)
+        self.card_cache = (
+            CardCache(card_cache_path, extract_version=fingerprint(self.STAGE_FILES['scrape']))
+            if card_cache_path else None
+        )
+        
+        # Per-run figures for the run manifest
+        self.run_stats = {'stages': {}, 'counts': {}}
         
         # Create output directories
         os.makedirs('data/raw', exist_ok=True)
@@ -40,41 +134,248 @@ class StratAxisRentScraper:
         os.makedirs('outputs', exist_ok=True)
         
         # Load sources
-        self.sources = self._load_sources()
+        self.sources = load_sources()
     
-    def _load_sources(self) -> dict:
-        """Load source configurations"""
-        with open('config/sources.yaml', 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+    @property
+    def normalizer(self):
+        if self._normalizer is None:
+            from pipeline.normalizer import Normalizer
+            self._normalizer = Normalizer()
+        return self._normalizer
     
-    def run(self):
-        """Execute the complete pipeline"""
+    @property
+    def deduplicator(self):
+        if self._deduplicator is None:
+            from pipeline.deduplicator import Deduplicator
+            self._deduplicator = Deduplicator()
+        return self._deduplicator
+    
+    @property
+    def aggregator(self):
+        if self._aggregator is None:
+            from pipeline.aggregator import Aggregator
+            self._aggregator = Aggregator()
+        return self._aggregator
+    
+    def run(self, raw_listings: List[Dict[str, Any]] = None, raw_label: str = None,
+            until: str = None):
+        """
+        Execute the complete pipeline
+        
+        Args:
+            raw_listings: Listings scraped elsewhere (e.g. merged shards from
+                sharded_runner.py); the scrape stage is skipped
+            raw_label: Identifies raw_listings in downstream checkpoint keys
+            until: Stop after this stage (its output is checkpointed)
+        """
+        try:
+            self._run_pipeline(raw_listings, raw_label, until)
+        finally:
+            # Also written for failed runs, which is when they are most useful
+            for store in self._listing_stores:
+                store.close()
+            if self.card_cache:
+                self.card_cache.close()
+            if self.crawl_state:
+                self.crawl_state.close()
+            self._write_metrics()
+            self.profiler.finish()
+            if self.fetch_trace.enabled:
+                self.fetch_trace.close()
+                self.logger.info(f"Fetch trace ({self.fetch_trace.records} requests) written to "
+                                 f"{self.fetch_trace.path}; summarize with: python cli.py trace {self.fetch_trace.path}")
+    
+    def _run_pipeline(self, raw_listings: List[Dict[str, Any]], raw_label: str, until: str):
+        if until is not None and until not in self.STAGES:
+            raise ValueError(f"Unknown stage: {until}")
+        if until in ('scrape', 'normalize') and (self.streaming or raw_listings is not None):
+            raise ValueError(f"Cannot stop after {until} in this mode")
+        self.until = until
+        
         self.logger.info("=" * 80)
         self.logger.info("STRATAXIS RENT PRICE INTELLIGENCE SYSTEM")
         self.logger.info("Starting execution...")
         self.logger.info("=" * 80)
         
-        # Step 1: Scrape all sources
-        all_raw_listings = self._scrape_all_sources()
-        
-        # Step 2: Normalize listings
-        normalized_listings = self._normalize_listings(all_raw_listings)
+        if raw_listings is not None:
+            # Downstream checkpoints chain from the batch, not from a local scrape
+            self._upstream_key = self.checkpoints.stage_key(
+                'scrape', None, fingerprint([], {'raw_label': raw_label})
+            )
+            normalized_listings = self._run_stage('normalize', self._normalize_listings, raw_listings)
+            unique_listings = self._run_stage('deduplicate', self._deduplicate_listings, normalized_listings)
+            raw_count = len(raw_listings)
+            normalized_count = len(normalized_listings)
+        elif self.streaming:
+            # Steps 1-3 overlap; only the unique listings are checkpointed
+            for stage in ('scrape', 'normalize'):
+                self._upstream_key = self.checkpoints.stage_key(
+                    stage, self._upstream_key, self._stage_fingerprint(stage)
+                )
+            self.stage_counts = {}
+            unique_listings = self._run_stage('deduplicate', self._stream_listings)
+            raw_count = self.stage_counts.get('scraped')
+            normalized_count = self.stage_counts.get('normalized')
+        else:
+            # Step 1: Scrape all sources
+            all_raw_listings = self._run_stage('scrape', self._scrape_all_sources)
+            if self._stops_after('scrape'):
+                return
+            
+            # Step 2: Normalize listings
+            normalized_listings = self._run_stage('normalize', self._normalize_listings, all_raw_listings)
+            if self._stops_after('normalize'):
+                return
+            
+            # Step 3: Deduplicate
+            unique_listings = self._run_stage('deduplicate', self._deduplicate_listings, normalized_listings)
+            raw_count = len(all_raw_listings) if all_raw_listings is not None else None
+            normalized_count = len(normalized_listings) if normalized_listings is not None else None
         
-        # Step 3: Deduplicate
-        unique_listings = self._deduplicate_listings(normalized_listings)
+        if self._stops_after('deduplicate'):
+            return
         
         # Step 4: Aggregate
-        aggregated_df = self._aggregate_listings(unique_listings)
+        aggregated_df, rollups_df = self._run_stage('aggregate', self._aggregate_all, unique_listings)
+        if self._stops_after('aggregate'):
+            return
         
         # Step 5: Export results
-        self._export_results(aggregated_df)
+        start = time.perf_counter()
+        with self.profiler.profile('stage-export'):
+            self._export_results(aggregated_df, rollups_df)
+        elapsed = time.perf_counter() - start
+        self.run_stats['stages']['export'] = {'seconds': round(elapsed, 3), 'checkpoint': False}
+        self.metrics.observe('stage_seconds', elapsed, stage='export', source='computed')
+        
+        self.run_stats['counts'] = {
+            'raw_listings': raw_count,
+            'normalized_listings': normalized_count,
+            'unique_listings': len(unique_listings),
+            'aggregated_groups': len(aggregated_df),
+        }
+        self.run_stats['fetch'] = self.fetch_stats()
+        if self.card_cache:
+            self.run_stats['card_cache'] = self.card_cache.summary()
+            self.logger.info(f"Card cache: {self.run_stats['card_cache']}")
         
         self.logger.info("=" * 80)
         self.logger.info("PIPELINE COMPLETED SUCCESSFULLY")
         self.logger.info("=" * 80)
         
         # Print summary
-        self._print_summary(all_raw_listings, unique_listings, aggregated_df)
+        self._print_summary(raw_count, normalized_count, unique_listings, aggregated_df)
+    
+    def _stops_after(self, stage: str) -> bool:
+        """True (and logged) if run(until=...) ends at this stage"""
+        if self.until != stage:
+            return False
+        self.logger.info(f"Stopped after {stage}; the next stage can start from its checkpoint")
+        return True
+    
+    def _stage_fingerprint(self, stage: str) -> str:
+        """Fingerprint of a stage's code, config and runtime parameters"""
+        params = {}
+        if stage == 'scrape':
+            # Scrapes are only resumable within the month (or batch) they belong to
+            params = {
+                'cities': self.cities,
+                'period': self.batch_id or datetime.now().strftime("%Y-%m"),
+                'delta': self.crawl_state is not None,
+            }
+        elif stage == 'aggregate':
+            params = {
+                'sketch_state_path': self.sketch_state_path,
+                'batch_id': self.batch_id,
+                'bootstrap_resamples': self.aggregator.bootstrap_resamples,
+                'ci_level': self.aggregator.ci_level,
+                'seed': self.aggregator.seed,
+            }
+        return fingerprint(self.STAGE_FILES[stage], params)
+    
+    def _run_stage(self, stage: str, func, *args):
+        """
+        Run a stage, or load its checkpoint, recording its wall time
+        
+        Stages before --from-stage are loaded from their newest checkpoint
+        (a warning is logged if its inputs have changed since). With --resume,
+        a stage is loaded only if a checkpoint exists for its exact key.
+        Every computed stage output is checkpointed.
+        """
+        key = self.checkpoints.stage_key(stage, self._upstream_key, self._stage_fingerprint(stage))
+        start = time.perf_counter()
+        with self.profiler.profile(f"stage-{stage}"):
+            result = self._load_or_run_stage(stage, key, func, *args)
+        elapsed = time.perf_counter() - start
+        self.run_stats['stages'][stage] = {
+            'seconds': round(elapsed, 3),
+            'checkpoint': not self._stage_computed,
+        }
+        self.metrics.observe('stage_seconds', elapsed, stage=stage,
+                             source='computed' if self._stage_computed else 'checkpoint')
+        return result
+    
+    def _write_metrics(self):
+        """Write the run's metrics as JSON and/or a Prometheus textfile"""
+        if not self.metrics.enabled:
+            return
+        if self.metrics_dir:
+            timestamp = self.metrics.started_at.strftime("%Y%m%d_%H%M%S")
+            path = self.metrics.write_json(os.path.join(self.metrics_dir, f"run_metrics_{timestamp}.json"))
+            self.logger.info(f"Metrics written to {path}")
+        if self.metrics_textfile:
+            self.metrics.write_prometheus(self.metrics_textfile)
+            self.logger.info(f"Prometheus textfile written to {self.metrics_textfile}")
+    
+    def _load_or_run_stage(self, stage: str, key: str, func, *args):
+        self._stage_computed = False
+        if self.from_stage and self.STAGES.index(stage) < self.STAGES.index(self.from_stage):
+            load_key = key if self.checkpoints.exists(stage, key) else self.checkpoints.latest(stage)
+            if load_key is None:
+                raise RuntimeError(
+                    f"--from-stage {self.from_stage} needs a {stage} checkpoint, but none exists"
+                )
+            if load_key != key:
+                self.logger.warning(
+                    f"{stage} checkpoint {load_key} predates code/config changes; reusing it as requested"
+                )
+            self._upstream_key = load_key
+            if stage in ('scrape', 'normalize') and self.STAGES.index(stage) + 1 < self.STAGES.index(self.from_stage):
+                # Only the key is needed to chain to later checkpoints
+                return None
+            return self.checkpoints.load(stage, load_key)
+        
+        if self.resume and not self.from_stage and self.checkpoints.exists(stage, key):
+            self.logger.info(f"Resuming: {stage} unchanged since last run")
+            self._upstream_key = key
+            return self.checkpoints.load(stage, key)
+        
+        result = func(*args)
+        self._stage_computed = True
+        self.checkpoints.save(stage, key, result)
+        self._upstream_key = key
+        return result
+    
+    def _build_scraper(self, source: Dict[str, Any]):
+        from scrapers.generic_scraper import GenericPortalScraper
+        
+        scraper = GenericPortalScraper(
+            source_name=source['name'],
+            base_url=source['url'],
+            city_paths=source.get('search_params', {}),
+            page_state=self.crawl_state,
+            extraction=source.get('extraction'),
+            card_cache=self.card_cache,
+        )
+        self._scrapers.append(scraper)
+        return scraper
+    
+    def fetch_stats(self) -> Dict[str, int]:
+        """Requests, bytes and page outcomes summed over this run's scrapers"""
+        total = Counter()
+        for scraper in self._scrapers:
+            total.update(scraper.fetch_stats)
+        return dict(total)
     
     def _scrape_all_sources(self) -> List[Dict[str, Any]]:
         """Scrape all configured sources"""
@@ -84,69 +385,122 @@ class StratAxisRentScraper:
         
         all_listings = []
         
-        # Scrape portals
-        for portal in self.sources.get('portals', []):
-            try:
-                scraper = GenericPortalScraper(
-                    source_name=portal['name'],
-                    base_url=portal['url'],
-                    city_paths=portal.get('search_params', {})
-                )
-                
-                for city in self.cities:
-                    listings = scraper.scrape(city)
-                    all_listings.extend(listings)
-                    
-                    self.logger.info(f"✓ {portal['name']} ({city}): {len(listings)} listings")
-                    
-            except Exception as e:
-                self.logger.error(f"✗ Failed to scrape {portal['name']}: {e}")
+        # JSON dumps are appended per (source, city) as it finishes, so a
+        # failed run keeps everything scraped before the failure
+        raw_store = self._open_listing_store('raw') if self.storage_format == 'json' else None
         
-        # Scrape classifieds
-        for classified in self.sources.get('classifieds', []):
+        # Scrape portals, classifieds and agencies
+        for source in self.sources:
             try:
-                scraper = GenericPortalScraper(
-                    source_name=classified['name'],
-                    base_url=classified['url']
-                )
+                scraper = self._build_scraper(source)
                 
-                for city in self.cities:
-                    listings = scraper.scrape(city)
+                for city in source_cities(source, self.cities):
+                    with self.profiler.profile(f"scrape-{source['name']}-{city}"):
+                        listings = scraper.scrape(city)
                     all_listings.extend(listings)
+                    if raw_store is not None:
+                        raw_store.extend(listings)
                     
-                    self.logger.info(f"✓ {classified['name']} ({city}): {len(listings)} listings")
+                    self.logger.info(f"✓ {source['name']} ({city}): {len(listings)} listings")
                     
             except Exception as e:
-                self.logger.error(f"✗ Failed to scrape {classified['name']}: {e}")
-        
-        # Scrape agencies
-        for agency in self.sources.get('agencies', []):
-            try:
-                scraper = GenericPortalScraper(
-                    source_name=agency['name'],
-                    base_url=agency['url']
-                )
-                
-                for city in self.cities:
-                    listings = scraper.scrape(city)
-                    all_listings.extend(listings)
-                    
-                    self.logger.info(f"✓ {agency['name']} ({city}): {len(listings)} listings")
-                    
-            except Exception as e:
-                self.logger.error(f"✗ Failed to scrape {agency['name']}: {e}")
+                self.logger.error(f"✗ Failed to scrape {source['name']}: {e}")
         
         # Save raw data
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        raw_file = f"data/raw/raw_listings_{timestamp}.json"
-        with open(raw_file, 'w', encoding='utf-8') as f:
-            json.dump(all_listings, f, indent=2, ensure_ascii=False)
+        if raw_store is not None:
+            raw_store.close()
+            raw_file = raw_store.path
+        else:
+            raw_file = self._save_listings(all_listings, 'raw')
         
         self.logger.info(f"\nTotal raw listings scraped: {len(all_listings)}")
         self.logger.info(f"Raw data saved to: {raw_file}")
         
         return all_listings
     
+    def _save_listings(self, listings: List[Dict[str, Any]], kind: str) -> str:
+        """
+        Persist raw or cleaned listings in the configured storage format
+        
+        Returns:
+            Path of the written file or dataset directory
+        """
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        
+        if self.storage_format == 'parquet':
+            from storage.columnar_store import ColumnarListingStore
+            
+            dataset_dir = f"data/{kind}/parquet"
+            store = ColumnarListingStore(dataset_dir, kind=kind)
+            store.write(listings, run_id=timestamp, scraped_at=now)
+            return dataset_dir
+        
+        with self._open_listing_store(kind) as store:
+            store.extend(listings)
+        return store.path
+    
+    def _open_listing_store(self, kind: str) -> ListingStore:
+        """New indexed JSON Lines dump for this run's raw or cleaned listings (closed when the run ends)"""
+        prefix = 'raw_listings' if kind == 'raw' else 'normalized_listings'
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        store = ListingStore(f"data/{kind}/{prefix}_{timestamp}.jsonl", mode='a')
+        self._listing_stores.append(store)
+        return store
+    
+    def _stream_listings(self) -> List[Dict[str, Any]]:
+        """Scrape, normalize and deduplicate concurrently through bounded queues"""
+        self.logger.info("\n" + "=" * 80)
+        self.logger.info("PHASES 1-3: STREAMING SCRAPE / NORMALIZATION / DEDUPLICATION")
+        self.logger.info("=" * 80)
+        
+        def source_job(source: Dict[str, Any]):
+            scraper = self._build_scraper(source)
+            for city in source_cities(source, self.cities):
+                # Runs in the source's scrape thread (cProfile is per thread)
+                with self.profiler.profile(f"scrape-{source['name']}-{city}"):
+                    yield from scraper.iter_listings(city)
+        
+        jobs = [(source['name'], lambda source=source: source_job(source))
+                for source in self.sources]
+        
+        from pipeline.streaming import StreamingPipeline
+        
+        pipeline = StreamingPipeline(
+            self.normalizer, self.deduplicator,
+            scrape_workers=self.scrape_workers,
+            raw_sink=self._listing_sink('raw'),
+            normalized_sink=self._listing_sink('cleaned'),
+        )
+        unique = pipeline.run(jobs)
+        self.stage_counts = dict(pipeline.stats)
+        
+        return unique
+    
+    def _listing_sink(self, kind: str):
+        """
+        Batch writer for streamed raw or cleaned listings
+        
+        JSON storage appends to one indexed JSON Lines dump per run; Parquet
+        storage writes one part file per batch into the partitioned dataset.
+        """
+        if self.storage_format == 'json':
+            return self._open_listing_store(kind).extend
+        
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        batch_number = [0]
+        
+        from storage.columnar_store import ColumnarListingStore
+        
+        store = ColumnarListingStore(f"data/{kind}/parquet", kind=kind)
+        
+        def write_parquet(batch: List[Dict[str, Any]]):
+            store.write(batch, run_id=f"{timestamp}-{batch_number[0]:04d}", scraped_at=now)
+            batch_number[0] += 1
+        
+        return write_parquet
+    
     def _normalize_listings(self, raw_listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Normalize all listings"""
         self.logger.info("\n" + "=" * 80)
@@ -161,10 +515,7 @@ class StratAxisRentScraper:
                 normalized.append(norm_listing)
         
         # Save normalized data
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        normalized_file = f"data/cleaned/normalized_listings_{timestamp}.json"
-        with open(normalized_file, 'w', encoding='utf-8') as f:
-            json.dump(normalized, f, indent=2, ensure_ascii=False)
+        normalized_file = self._save_listings(normalized, 'cleaned')
         
         self.logger.info(f"Normalized: {len(normalized)} / {len(raw_listings)} listings")
         self.logger.info(f"Normalized data saved to: {normalized_file}")
@@ -187,11 +538,29 @@ class StratAxisRentScraper:
         self.logger.info("PHASE 4: AGGREGATION")
         self.logger.info("=" * 80)
         
-        aggregated = self.aggregator.aggregate(unique_listings)
+        if self.sketch_state_path:
+            aggregated = self.aggregator.aggregate_incremental(
+                unique_listings, self.sketch_state_path, batch_id=self.batch_id
+            )
+        else:
+            aggregated = self.aggregator.aggregate(unique_listings)
         
         return aggregated
     
-    def _export_results(self, aggregated_df):
+    def _aggregate_all(self, unique_listings: List[Dict[str, Any]]):
+        """Aggregate plus rollups, checkpointed together"""
+        return self._aggregate_listings(unique_listings), self._aggregate_rollups(unique_listings)
+    
+    def _aggregate_rollups(self, unique_listings: List[Dict[str, Any]]):
+        """City x type, city x year and city-wide rollups (full runs only)"""
+        if self.sketch_state_path:
+            # Rollups need every listing; an incremental batch holds only this month's
+            self.logger.info("Skipping rollups in incremental mode")
+            return None
+        
+        return self.aggregator.aggregate_rollups(unique_listings)
+    
+    def _export_results(self, aggregated_df, rollups_df=None):
         """Export final results"""
         self.logger.info("\n" + "=" * 80)
         self.logger.info("PHASE 5: EXPORT")
@@ -208,14 +577,21 @@ class StratAxisRentScraper:
         self.logger.info(f"\n✓ Final outputs generated:")
         self.logger.info(f"  • CSV: {csv_path}")
         self.logger.info(f"  • JSON: {json_path}")
+        
+        if rollups_df is not None and not rollups_df.empty:
+            rollups_csv = 'outputs/rental_intelligence_rollups.csv'
+            rollups_json = 'outputs/rental_intelligence_rollups.json'
+            self.aggregator.export_csv(rollups_df, rollups_csv)
+            self.aggregator.export_json(rollups_df, rollups_json)
+            self.logger.info(f"  • Rollups: {rollups_csv}, {rollups_json}")
     
-    def _print_summary(self, raw_listings, unique_listings, aggregated_df):
-        """Print execution summary"""
+    def _print_summary(self, raw_count, normalized_count, unique_listings, aggregated_df):
+        """Print execution summary (counts are None when loaded from a checkpoint)"""
         print("\n" + "=" * 80)
         print("EXECUTION SUMMARY")
         print("=" * 80)
-        print(f"Raw listings scraped:        {len(raw_listings)}")
-        print(f"After normalization:         {len([l for l in raw_listings if l])}")
+        print(f"Raw listings scraped:        {raw_count if raw_count is not None else 'n/a (checkpoint)'}")
+        print(f"After normalization:         {normalized_count if normalized_count is not None else 'n/a (checkpoint)'}")
         print(f"After deduplication:         {len(unique_listings)}")
         print(f"Aggregated groups:           {len(aggregated_df)}")
         
@@ -281,7 +657,45 @@ class StratAxisRentScraper:
 
 def main():
     """Main entry point"""
-    scraper = StratAxisRentScraper()
+    parser = argparse.ArgumentParser(description="StratAxis rent price intelligence pipeline")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reuse stage checkpoints whose inputs, code and config are unchanged")
+    parser.add_argument('--from-stage', choices=StratAxisRentScraper.STAGES,
+                        help="Load earlier stages from their latest checkpoints and rerun from this one")
+    parser.add_argument('--checkpoint-dir', default="data/checkpoints")
+    parser.add_argument('--storage-format', choices=StratAxisRentScraper.STORAGE_FORMATS, default='json',
+                        help="Raw/cleaned listings as indexed JSON Lines dumps or a partitioned Parquet dataset")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Normalize and deduplicate listings while sources are still being scraped")
+    parser.add_argument('--scrape-workers', type=int, default=4,
+                        help="Sources scraped concurrently in streaming mode")
+    parser.add_argument('--crawl-state',
+                        help="Delta scrape: page state database (e.g. data/state/crawl_state.sqlite)")
+    parser.add_argument('--card-cache', nargs='?', const="data/state/card_cache.sqlite", metavar='PATH',
+                        help="Reuse the listings extracted from cards seen in earlier runs "
+                             "(default data/state/card_cache.sqlite)")
+    parser.add_argument('--metrics', nargs='?', const="data/metrics", metavar='DIR',
+                        help="Record metrics and write run_metrics_<timestamp>.json to DIR (default data/metrics)")
+    parser.add_argument('--metrics-textfile', metavar='PATH',
+                        help="Also write the metrics in Prometheus text format (node_exporter textfile collector)")
+    parser.add_argument('--profile', nargs='?', const="data/profiles", metavar='DIR',
+                        help="cProfile each stage and (source, city) scrape into DIR/<timestamp>/ (default data/profiles)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="With --profile, also record tracemalloc allocation diffs (slower)")
+    parser.add_argument('--profile-top', type=int, default=25, help="Rows per profile summary table")
+    parser.add_argument('--fetch-trace', nargs='?', const="data/traces", metavar='DIR',
+                        help="Record every HTTP request to DIR/fetch_trace_<timestamp>.jsonl (default data/traces)")
+    args = parser.parse_args()
+    
+    scraper = StratAxisRentScraper(
+        storage_format=args.storage_format,
+        resume=args.resume, from_stage=args.from_stage, checkpoint_dir=args.checkpoint_dir,
+        streaming=args.streaming, scrape_workers=args.scrape_workers,
+        crawl_state_path=args.crawl_state, metrics_dir=args.metrics,
+        metrics_textfile=args.metrics_textfile, profile_dir=args.profile,
+        profile_memory=args.profile_memory, profile_top=args.profile_top,
+        fetch_trace_dir=args.fetch_trace, card_cache_path=args.card_cache,
+    )
     scraper.run()
 
 
@@ -6,7 +6,10 @@ Runs the scraper and organizes outputs by month/year
 
 import os
 import sys
+import json
+import time
 import shutil
+import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -14,15 +17,47 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from main import StratAxisRentScraper
+from storage.timeseries_cube import RentTimeSeriesCube
+from storage.archive_store import ArchiveStore
+from storage.listing_store import is_sidecar, sidecar_paths
 from utils.logger import setup_logger
 
 
 class MonthlyScraperScheduler:
     """Wrapper to run scraper with monthly organization"""
     
-    def __init__(self):
+    SKETCH_STATE_PATH = "data/aggregated/quantile_sketches.json"
+    CRAWL_STATE_PATH = "data/state/crawl_state.sqlite"
+    CARD_CACHE_PATH = "data/state/card_cache.sqlite"
+    ARCHIVE_PATH = "data/archive/archive.sqlite"
+    
+    # Outputs stored in each month's archive snapshot (with the run's raw/cleaned
+    # dumps) when this run wrote them: incremental runs write no rollups
+    ARCHIVED_OUTPUTS = (
+        "outputs/rental_intelligence.csv", "outputs/rental_intelligence.json",
+        "outputs/rental_intelligence_rollups.csv", "outputs/rental_intelligence_rollups.json",
+    )
+    
+    # Page outcomes reported by delta scrapes (see BaseScraper.iter_page_listings)
+    PAGE_OUTCOMES = (
+        'pages_changed', 'pages_unchanged', 'pages_not_modified', 'pages_skipped_stable',
+        'pages_skipped_missing', 'pages_missing', 'pages_failed',
+    )
+    
+    def __init__(self, incremental: bool = False, resume: bool = False, delta: bool = False,
+                 prune_dumps: bool = False, metrics_textfile: str = None, storage_format: str = 'json'):
         self.logger = setup_logger("monthly_scheduler")
         self.base_dir = Path(__file__).parent
+        self.incremental = incremental
+        self.resume = resume
+        self.delta = delta
+        self.prune_dumps = prune_dumps
+        self.metrics_textfile = metrics_textfile
+        self.storage_format = storage_format
+        
+        if incremental and delta:
+            # Carried-forward listings would be merged into the cumulative sketches again
+            raise ValueError("--delta carries last month's listings forward and cannot be combined with --incremental")
         
     def get_previous_month_info(self):
         """Get previous month's year and month"""
@@ -43,6 +78,134 @@ class MonthlyScraperScheduler:
         monthly_dir.mkdir(parents=True, exist_ok=True)
         return monthly_dir
     
+    def find_previous_manifest(self, year: int, month: int):
+        """Latest run manifest archived for a month before the target month"""
+        archive_root = self.base_dir / "outputs" / "monthly_archives"
+        current = f"{year}_{month:02d}"
+        candidates = [
+            path for path in archive_root.glob("*/*/run_manifest_*.json")
+            if path.name[len("run_manifest_"):len("run_manifest_") + 7] < current
+        ]
+        return max(candidates, key=lambda path: path.name, default=None)
+    
+    def build_run_manifest(self, scraper: StratAxisRentScraper, year: int, month: int,
+                           started_at: datetime, duration: float, outputs: dict,
+                           previous_path=None) -> dict:
+        """Machine-readable record of a run: mode, stage timings, counts, bytes and churn"""
+        fetch = scraper.run_stats.get('fetch', {})
+        pages_total = sum(fetch.get(outcome, 0) for outcome in self.PAGE_OUTCOMES)
+        
+        manifest = {
+            'target_month': f"{year}-{month:02d}",
+            'mode': 'delta' if self.delta else 'full',
+            'incremental': self.incremental,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'duration_seconds': round(duration, 3),
+            'stages': scraper.run_stats['stages'],
+            'counts': scraper.run_stats['counts'],
+            'fetch': fetch,
+            'card_cache': scraper.run_stats.get('card_cache'),
+            'churn': {
+                'pages_total': pages_total,
+                'pages_changed': fetch.get('pages_changed', 0),
+                'changed_fraction': round(fetch.get('pages_changed', 0) / pages_total, 4) if pages_total else None,
+            },
+            'outputs': outputs,
+            'previous_manifest': None,
+        }
+        
+        if previous_path is not None:
+            with open(previous_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            manifest['previous_manifest'] = str(previous_path)
+            manifest['vs_previous'] = {
+                'duration_ratio': self._ratio(duration, previous.get('duration_seconds')),
+                'bytes_ratio': self._ratio(fetch.get('bytes', 0), previous.get('fetch', {}).get('bytes')),
+                'requests_ratio': self._ratio(fetch.get('requests', 0), previous.get('fetch', {}).get('requests')),
+            }
+        
+        return manifest
+    
+    @staticmethod
+    def _ratio(current, previous):
+        return round(current / previous, 4) if previous else None
+    
+    def run_dumps(self, started_at: datetime):
+        """Raw and cleaned JSON dumps written since the run started"""
+        dumps = []
+        for kind in ('raw', 'cleaned'):
+            for path in sorted((self.base_dir / "data" / kind).glob("*.json*")):
+                # Index sidecars of JSON Lines dumps are rebuilt from the dump when missing
+                if is_sidecar(path.name):
+                    continue
+                if datetime.fromtimestamp(path.stat().st_mtime) >= started_at:
+                    dumps.append(path)
+        return dumps
+    
+    def run_outputs(self, started_at: datetime):
+        """ARCHIVED_OUTPUTS written since the run started (not left over from earlier runs)"""
+        outputs = []
+        for name in self.ARCHIVED_OUTPUTS:
+            path = self.base_dir / name
+            if path.exists() and datetime.fromtimestamp(path.stat().st_mtime) >= started_at:
+                outputs.append(path)
+        return outputs
+    
+    def archive_month(self, year: int, month: int, started_at: datetime) -> dict:
+        """
+        Store this month's outputs and dumps as a deduplicated archive snapshot
+        
+        Returns:
+            Snapshot figures plus the archive-wide ratios, for the run manifest
+        """
+        snapshot_id = f"{year}-{month:02d}"
+        outputs = self.run_outputs(started_at)
+        dumps = self.run_dumps(started_at)
+        
+        archive = ArchiveStore(str(self.base_dir / self.ARCHIVE_PATH))
+        try:
+            # A rerun of the same month (--resume) replaces its snapshot
+            result = archive.add_snapshot(snapshot_id, outputs + dumps, base_dir=str(self.base_dir), replace=True)
+            stats = archive.stats()
+            
+            if self.prune_dumps:
+                for path in dumps:
+                    # read_file verifies the checksum before the original goes
+                    archive.read_file(snapshot_id, path.relative_to(self.base_dir).as_posix())
+                    path.unlink()
+                    for sidecar in sidecar_paths(str(path)):
+                        Path(sidecar).unlink(missing_ok=True)
+                self.logger.info(f"✓ Pruned {len(dumps)} archived dumps from data/raw and data/cleaned")
+        finally:
+            archive.close()
+        
+        self.logger.info(
+            f"✓ Archive snapshot {snapshot_id}: {result['new_chunks']}/{result['chunks']} new chunks; "
+            f"archive {stats['stored_bytes'] / 1e6:.1f} MB for {stats['logical_bytes'] / 1e6:.1f} MB of files "
+            f"(dedup x{stats['dedup_ratio']}, compression x{stats['compression_ratio']})"
+        )
+        return {
+            **result,
+            'pruned_dumps': len(dumps) if self.prune_dumps else 0,
+            'dedup_ratio': stats['dedup_ratio'],
+            'compression_ratio': stats['compression_ratio'],
+            'total_ratio': stats['total_ratio'],
+            'archive_stored_bytes': stats['stored_bytes'],
+        }
+    
+    def update_timeseries_cube(self):
+        """Ingest newly archived months into the rent time-series cube"""
+        try:
+            cube = RentTimeSeriesCube(str(self.base_dir / "data" / "aggregated" / "rent_timeseries.sqlite"))
+            try:
+                cube.ingest_archive(str(self.base_dir / "outputs" / "monthly_archives"))
+            finally:
+                cube.close()
+        except Exception as e:
+            # The archive itself is already written; the cube can be rebuilt later
+            self.logger.warning(f"Time-series cube update failed: {e}")
+    
     def run_monthly_scrape(self):
         """Execute the scraper and organize outputs by month"""
         year, month, month_name = self.get_previous_month_info()
@@ -54,29 +217,63 @@ class MonthlyScraperScheduler:
         self.logger.info(f"Scrape Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         self.logger.info("=" * 80)
         
+        started_at = datetime.now()
+        start = time.perf_counter()
+        previous_manifest = self.find_previous_manifest(year, month)
+        
+        # Delta mode: only pages that may have changed are fetched; the rest
+        # of last month's listings are carried forward from the crawl state,
+        # and unchanged cards of changed pages are reused from the card cache
+        crawl_state_path = card_cache_path = None
+        if self.delta:
+            crawl_state_path = str(self.base_dir / self.CRAWL_STATE_PATH)
+            card_cache_path = str(self.base_dir / self.CARD_CACHE_PATH)
+            if not os.path.exists(crawl_state_path):
+                self.logger.info("No crawl state yet: fetching every page to build the delta baseline")
+            elif previous_manifest is not None:
+                self.logger.info(f"Previous run: {previous_manifest}")
+        
+        # Scheduled runs always keep their metrics (data/metrics/run_metrics_*.json)
+        metrics = {
+            'metrics_dir': str(self.base_dir / "data" / "metrics"),
+            'metrics_textfile': self.metrics_textfile,
+        }
+        
         # Run the main scraper
         try:
-            scraper = StratAxisRentScraper()
+            if self.incremental:
+                # Merge this month into the persisted sketches instead of
+                # recomputing aggregates from this month's rows alone
+                scraper = StratAxisRentScraper(
+                    sketch_state_path=str(self.base_dir / self.SKETCH_STATE_PATH),
+                    batch_id=f"{year}-{month:02d}",
+                    resume=self.resume,
+                    crawl_state_path=crawl_state_path,
+                    card_cache_path=card_cache_path,
+                    storage_format=self.storage_format,
+                    **metrics,
+                )
+            else:
+                scraper = StratAxisRentScraper(resume=self.resume, crawl_state_path=crawl_state_path,
+                                               card_cache_path=card_cache_path,
+                                               storage_format=self.storage_format, **metrics)
             scraper.run()
             
             # Create monthly archive directory
             monthly_dir = self.create_monthly_directory(year, month_name)
             
-            # Copy outputs to monthly archive
+            # The aggregated CSV is copied (the time-series cube reads it);
+            # JSON outputs and the run's dumps go to the deduplicated archive
             source_csv = self.base_dir / "outputs" / "rental_intelligence.csv"
-            source_json = self.base_dir / "outputs" / "rental_intelligence.json"
             
             timestamp = datetime.now().strftime("%Y%m%d")
             dest_csv = monthly_dir / f"rental_intelligence_{year}_{month:02d}_{month_name}_{timestamp}.csv"
-            dest_json = monthly_dir / f"rental_intelligence_{year}_{month:02d}_{month_name}_{timestamp}.json"
             
             if source_csv.exists():
                 shutil.copy2(source_csv, dest_csv)
                 self.logger.info(f"✓ Archived CSV to: {dest_csv}")
             
-            if source_json.exists():
-                shutil.copy2(source_json, dest_json)
-                self.logger.info(f"✓ Archived JSON to: {dest_json}")
+            archive = self.archive_month(year, month, started_at)
             
             # Create a summary file
             summary_file = monthly_dir / f"scrape_summary_{timestamp}.txt"
@@ -86,11 +283,33 @@ class MonthlyScraperScheduler:
                 f.write(f"Target Month: {month_name} {year}\n")
                 f.write(f"Scrape Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"CSV Output: {dest_csv.name}\n")
-                f.write(f"JSON Output: {dest_json.name}\n")
+                f.write(f"Archive Snapshot: {archive['snapshot_id']} ({archive['files']} files)\n")
+                f.write(f"Mode: {'delta' if self.delta else 'full'}\n")
                 f.write(f"\nStatus: SUCCESS\n")
             
             self.logger.info(f"✓ Created summary: {summary_file}")
             
+            # Machine-readable run manifest (also the baseline for next month's comparison)
+            manifest = self.build_run_manifest(
+                scraper, year, month, started_at, time.perf_counter() - start,
+                outputs={'csv': dest_csv.name, 'archive_snapshot': archive['snapshot_id']},
+                previous_path=previous_manifest,
+            )
+            manifest['archive'] = archive
+            manifest_file = monthly_dir / f"run_manifest_{year}_{month:02d}_{timestamp}.json"
+            with open(manifest_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            
+            self.logger.info(f"✓ Run manifest: {manifest_file}")
+            fetch = manifest['fetch']
+            self.logger.info(
+                f"  {manifest['mode']} run: {fetch.get('requests', 0)} requests, "
+                f"{fetch.get('bytes', 0) / 1e6:.1f} MB fetched, {manifest['duration_seconds']:.0f}s"
+            )
+            
+            # Fold the new month into the time-series cube
+            self.update_timeseries_cube()
+            
             self.logger.info("=" * 80)
             self.logger.info("MONTHLY SCRAPE COMPLETED SUCCESSFULLY")
             self.logger.info(f"Data archived to: {monthly_dir}")
@@ -103,7 +322,26 @@ class MonthlyScraperScheduler:
 
 def main():
     """Main entry point for scheduled monthly scraping"""
-    scheduler = MonthlyScraperScheduler()
+    parser = argparse.ArgumentParser(description="Run the monthly scrape and archive outputs")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Merge the month into persisted quantile sketches (cumulative aggregates)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Retry a failed run, reusing this month's valid stage checkpoints")
+    parser.add_argument('--delta', action='store_true',
+                        help="Only fetch pages that may have changed; carry the rest forward and "
+                             "reuse unchanged listing cards (data/state/card_cache.sqlite)")
+    parser.add_argument('--prune-dumps', action='store_true',
+                        help="Delete the run's raw/cleaned JSON dumps once archived (restore with cli.py archive restore)")
+    parser.add_argument('--metrics-textfile', metavar='PATH',
+                        help="Also write run metrics in Prometheus text format (node_exporter textfile collector)")
+    parser.add_argument('--storage-format', choices=['json', 'parquet'], default='json',
+                        help="Raw/cleaned listings as indexed JSON Lines dumps or a partitioned Parquet dataset "
+                             "(data/<kind>/parquet; only JSON dumps are archived)")
+    args = parser.parse_args()
+    
+    scheduler = MonthlyScraperScheduler(incremental=args.incremental, resume=args.resume, delta=args.delta,
+                                        prune_dumps=args.prune_dumps, metrics_textfile=args.metrics_textfile,
+                                        storage_format=args.storage_format)
     scheduler.run_monthly_scrape()
 
 
@@ -1,32 +1,364 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Union
 from utils.logger import setup_logger
+from utils.metrics import get_metrics
+from utils.config import load_yaml, load_cities, load_sources
+from pipeline.kernels import (
+    sort_segments, segment_median, segment_quantiles, iter_level_segments, bootstrap_median_ci,
+)
+from pipeline.json_exporter import HierarchicalJSONExporter
+from pipeline.quantile_sketch import GroupSketch, SketchStore
+from utils.records import record_columns
 
 class Aggregator:
     """Aggregate listings by city, neighborhood, housing type, and year"""
     
-    def __init__(self):
+    GROUPBY_COLS = ['city', 'neighborhood', 'housing_type', 'year']
+    
+    # Columns aggregate() reads; columnar readers can load just these
+    INPUT_COLUMNS = GROUPBY_COLS + [
+        'monthly_rent_xaf', 'rent_per_sqm', 'listing_url',
+        'has_price', 'has_housing_type', 'has_date',
+    ]
+    
+    # Grouping sets computed by aggregate_rollups(), finest first
+    ROLLUP_LEVELS = {
+        'city_neighborhood_type_year': ['city', 'neighborhood', 'housing_type', 'year'],
+        'city_type_year': ['city', 'housing_type', 'year'],
+        'city_type': ['city', 'housing_type'],
+        'city_year': ['city', 'year'],
+        'city': ['city'],
+    }
+    ROLLUP_ALL = 'ALL'
+    
+    # Encoded as categoricals whose categories are the config vocabulary plus
+    # any other observed value, sorted: grouping and sorting run on the codes
+    CATEGORICAL_COLS = ['city', 'neighborhood', 'housing_type', 'source_site']
+    # Downcast to the smallest integer dtype holding their values
+    INTEGER_COLS = ['year', 'month', 'bedrooms']
+    
+    def __init__(self, sketch_compression: float = 100, bootstrap_resamples: int = 500,
+                 ci_level: float = 0.95, seed: int = 42, config_dir: str = "config"):
+        """
+        Args:
+            sketch_compression: t-digest compression for incremental aggregation
+            bootstrap_resamples: Replicates for the median confidence interval
+                (0 disables it)
+            ci_level: Coverage of the median confidence interval
+            seed: Bootstrap RNG seed, so reruns give identical intervals
+            config_dir: Cities, neighborhoods, housing types and sources used
+                as the categories of the key columns
+        """
         self.logger = setup_logger("aggregator")
+        self.metrics = get_metrics()
+        self.sketch_compression = sketch_compression
+        self.bootstrap_resamples = bootstrap_resamples
+        self.ci_level = ci_level
+        self.seed = seed
+        self.config_dir = config_dir
+        self._vocabulary = None
     
-    def aggregate(self, listings: List[Dict[str, Any]]) -> pd.DataFrame:
+    def aggregate(self, listings: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
         """
         Aggregate listings to investor-grade metrics
         
         Args:
-            listings: List of normalized, deduplicated listings
+            listings: List of normalized, deduplicated listings, or a DataFrame
+                with at least INPUT_COLUMNS (e.g. read from columnar storage)
             
         Returns:
             DataFrame with aggregated metrics
         """
-        if not listings:
+        if len(listings) == 0:
             self.logger.warning("No listings to aggregate")
             return pd.DataFrame()
         
         self.logger.info(f"Aggregating {len(listings)} listings...")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(listings)
+        with self.metrics.timer('aggregate_seconds', step='prepare'):
+            df_clean = self._prepare(listings)
+        if df_clean.empty:
+            return pd.DataFrame()
+        
+        with self.metrics.timer('aggregate_seconds', step='groups'):
+            aggregated = self._aggregate_frame(df_clean)
+        self.metrics.inc('aggregate_rows_total', len(df_clean), output='groups')
+        self.metrics.inc('aggregate_groups_total', len(aggregated), output='groups')
+        
+        self.logger.info(f"Aggregated to {len(aggregated)} unique (city, neighborhood, type, year) groups")
+        
+        return aggregated
+    
+    def _aggregate_frame(self, df_clean: pd.DataFrame) -> pd.DataFrame:
+        """Compute group metrics from cleaned listing rows"""
+        # Aggregate metrics: mean/std/count on pandas' built-in reductions,
+        # all quantiles from one sorted-segment pass
+        grouped = df_clean.groupby(self.GROUPBY_COLS, observed=True)
+        codes = grouped.ngroup().to_numpy()
+        
+        stats = grouped.agg(
+            mean_monthly_rent_xaf=('monthly_rent_xaf', 'mean'),
+            std_monthly_rent_xaf=('monthly_rent_xaf', 'std'),
+            listing_count=('listing_url', 'count'),
+        )
+        rent_segments = sort_segments(
+            codes, df_clean['monthly_rent_xaf'].to_numpy(dtype=float), grouped.ngroups
+        )
+        rent_quantiles = segment_quantiles(*rent_segments)
+        ci_low, ci_high = self._median_ci(rent_segments)
+        sqm_quantiles = segment_quantiles(
+            *sort_segments(codes, df_clean['rent_per_sqm'].to_numpy(dtype=float), grouped.ngroups),
+            quantiles=(0.5,),
+        )
+        
+        aggregated = stats.index.to_frame(index=False)
+        aggregated['median_monthly_rent_xaf'] = rent_quantiles[0.5]
+        aggregated['p25_monthly_rent_xaf'] = rent_quantiles[0.25]
+        aggregated['p75_monthly_rent_xaf'] = rent_quantiles[0.75]
+        aggregated['median_ci_low_xaf'] = ci_low
+        aggregated['median_ci_high_xaf'] = ci_high
+        aggregated['mean_monthly_rent_xaf'] = stats['mean_monthly_rent_xaf'].to_numpy()
+        aggregated['std_monthly_rent_xaf'] = stats['std_monthly_rent_xaf'].to_numpy()
+        aggregated['median_rent_per_sqm'] = sqm_quantiles[0.5]
+        aggregated['listing_count'] = stats['listing_count'].to_numpy()
+        
+        # Sorted on the codes, then keys back to plain values for the exporters
+        return self._decode_keys(self._finalize(aggregated))
+    
+    def aggregate_rollups(self, listings: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Aggregate listings at every ROLLUP_LEVELS grain (like SQL GROUPING SETS)
+        
+        All levels are computed from the listing rows, not from finer-level
+        medians. Values are sorted once and each level only re-sorts its
+        integer group codes (see kernels.iter_level_segments); mean, std
+        and count come from bincount reductions. Listings with a missing
+        dimension value are left out of the levels that group on it.
+        
+        Args:
+            listings: List of normalized, deduplicated listings, or a DataFrame
+            
+        Returns:
+            DataFrame with the aggregate() columns plus 'grouping_level';
+            dimensions a level aggregates over are set to ROLLUP_ALL
+        """
+        if len(listings) == 0:
+            self.logger.warning("No listings to aggregate")
+            return pd.DataFrame()
+        
+        with self.metrics.timer('aggregate_seconds', step='prepare'):
+            df_clean = self._prepare(listings)
+        if df_clean.empty:
+            return pd.DataFrame()
+        
+        with self.metrics.timer('aggregate_seconds', step='rollups'):
+            rollups = self._rollup_frame(df_clean)
+        self.metrics.inc('aggregate_rows_total', len(df_clean), output='rollups')
+        self.metrics.inc('aggregate_groups_total', len(rollups), output='rollups')
+        
+        self.logger.info(f"Aggregated to {len(rollups)} groups across {len(self.ROLLUP_LEVELS)} rollup levels")
+        
+        return rollups
+    
+    def _rollup_frame(self, df_clean: pd.DataFrame) -> pd.DataFrame:
+        """Compute all grouping sets from cleaned listing rows in one pass"""
+        n_rows = len(df_clean)
+        
+        # Sorted factorization: code order == value order, NaN -> -1
+        dim_codes = {}
+        dim_values = {}
+        for col in self.GROUPBY_COLS:
+            codes, uniques = pd.factorize(df_clean[col], sort=True)
+            dim_codes[col] = codes.astype(np.int64)
+            dim_values[col] = np.asarray(uniques, dtype=object)
+        
+        level_codes = []
+        level_sizes = []
+        level_keys = []
+        for level, dims in self.ROLLUP_LEVELS.items():
+            valid = np.logical_and.reduce([dim_codes[col] >= 0 for col in dims])
+            
+            # Mixed-radix key over the level's dimensions
+            key = np.zeros(n_rows, dtype=np.int64)
+            key_space = 1
+            for col in dims:
+                key = key * len(dim_values[col]) + dim_codes[col]
+                key_space *= len(dim_values[col])
+            
+            # Dense key space: map observed keys to group codes without sorting
+            if key_space <= max(4 * n_rows, 1 << 20):
+                present = np.bincount(key[valid], minlength=key_space) > 0
+                uniq = np.flatnonzero(present)
+                inverse = (np.cumsum(present) - 1)[key[valid]]
+            else:
+                uniq, inverse = np.unique(key[valid], return_inverse=True)
+            codes = np.full(n_rows, -1, dtype=np.int64)
+            codes[valid] = inverse
+            level_codes.append(codes)
+            level_sizes.append(len(uniq))
+            
+            # Decode group keys back to per-dimension codes (-1 = ALL)
+            decoded = {col: np.full(len(uniq), -1, dtype=np.int64) for col in self.GROUPBY_COLS}
+            rest = uniq
+            for col in reversed(dims):
+                rest, decoded[col] = np.divmod(rest, len(dim_values[col]))
+            decoded['level'] = np.full(len(uniq), len(level_keys), dtype=np.int64)
+            level_keys.append(decoded)
+        
+        n_groups = sum(level_sizes)
+        rent_quantiles = {q: [] for q in (0.25, 0.5, 0.75)}
+        ci_bounds = ([], [])
+        for segments in iter_level_segments(
+            level_codes, level_sizes, df_clean['monthly_rent_xaf'].to_numpy(dtype=float)
+        ):
+            for q, values in segment_quantiles(*segments).items():
+                rent_quantiles[q].append(values)
+            for bound, values in zip(ci_bounds, self._median_ci(segments)):
+                bound.append(values)
+        rent_quantiles = {q: np.concatenate(parts) for q, parts in rent_quantiles.items()}
+        sqm_medians = np.concatenate([
+            segment_median(*segments) for segments in iter_level_segments(
+                level_codes, level_sizes, df_clean['rent_per_sqm'].to_numpy(dtype=float)
+            )
+        ])
+        
+        # Stack levels into one code space for the bincount reductions
+        offsets = np.cumsum(level_sizes) - np.array(level_sizes)
+        codes = np.concatenate([
+            np.where(codes >= 0, codes + offset, -1) for codes, offset in zip(level_codes, offsets)
+        ])
+        rents = np.tile(df_clean['monthly_rent_xaf'].to_numpy(dtype=float), len(level_codes))
+        has_url = np.tile(df_clean['listing_url'].notna().to_numpy(), len(level_codes))
+        
+        # Mean and sample std (two-pass) over non-null rents
+        in_group = (codes >= 0) & ~np.isnan(rents)
+        group_codes = codes[in_group]
+        values = rents[in_group]
+        counts = np.bincount(group_codes, minlength=n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.bincount(group_codes, weights=values, minlength=n_groups) / counts
+            deviations = (values - means[group_codes]) ** 2
+            stds = np.sqrt(np.bincount(group_codes, weights=deviations, minlength=n_groups) / (counts - 1))
+        stds[counts < 2] = np.nan
+        
+        keys = {
+            col: np.concatenate([decoded[col] for decoded in level_keys])
+            for col in self.GROUPBY_COLS + ['level']
+        }
+        rollups = pd.DataFrame({
+            col: np.where(keys[col] >= 0, dim_values[col][np.maximum(keys[col], 0)], self.ROLLUP_ALL)
+            for col in self.GROUPBY_COLS
+        })
+        rollups['grouping_level'] = np.array(list(self.ROLLUP_LEVELS), dtype=object)[keys['level']]
+        rollups['median_monthly_rent_xaf'] = rent_quantiles[0.5]
+        rollups['p25_monthly_rent_xaf'] = rent_quantiles[0.25]
+        rollups['p75_monthly_rent_xaf'] = rent_quantiles[0.75]
+        rollups['median_ci_low_xaf'] = np.concatenate(ci_bounds[0])
+        rollups['median_ci_high_xaf'] = np.concatenate(ci_bounds[1])
+        rollups['mean_monthly_rent_xaf'] = means
+        rollups['std_monthly_rent_xaf'] = stds
+        rollups['median_rent_per_sqm'] = sqm_medians
+        rollups['listing_count'] = np.bincount(
+            codes[codes >= 0], weights=has_url[codes >= 0], minlength=n_groups
+        ).astype(np.int64)
+        
+        # Level, then the same key order as aggregate(); ALL sorts first
+        order = np.lexsort((keys['housing_type'], keys['neighborhood'], keys['year'],
+                            keys['city'], keys['level']))
+        rollups = rollups.iloc[order].reset_index(drop=True)
+        
+        return self._finalize(rollups, sort=False)
+    
+    def aggregate_incremental(self, listings: List[Dict[str, Any]], state_path: str,
+                              batch_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Merge a batch of listings into persisted group sketches
+        
+        Each group keeps a t-digest plus running count, mean and sum of
+        squared deviations (see pipeline.quantile_sketch for accuracy
+        bounds), so a new month merges in without reloading earlier raw
+        data. Outliers are removed within each batch, before it is merged,
+        so volatility and confidence can differ from a full recomputation.
+        
+        Args:
+            listings: List of normalized, deduplicated listings for this batch
+            state_path: JSON file holding the sketch state between runs
+            batch_id: Optional batch label (e.g. '2026-01'); a batch that was
+                already merged is not merged twice
+            
+        Returns:
+            DataFrame with the same columns as aggregate(), computed from the
+            merged state
+        """
+        store = SketchStore.load(state_path, self.sketch_compression)
+        
+        if store.has_batch(batch_id):
+            self.logger.warning(f"Batch {batch_id} already merged into {state_path}, skipping merge")
+        else:
+            self.logger.info(f"Merging {len(listings)} listings into sketch state...")
+            df_clean = self._prepare(listings) if len(listings) else pd.DataFrame()
+            
+            if not df_clean.empty:
+                for key, group in df_clean.groupby(self.GROUPBY_COLS, observed=True):
+                    city, neighborhood, housing_type, year = key
+                    sketch = GroupSketch(store.compression).update(
+                        group['monthly_rent_xaf'].to_numpy(dtype=float),
+                        group['rent_per_sqm'].to_numpy(dtype=float),
+                        group['listing_url'].count(),
+                    )
+                    store.merge_group((city, neighborhood, housing_type, int(year)), sketch)
+            
+            if batch_id is not None:
+                store.batches.append(batch_id)
+            store.save(state_path)
+            self.logger.info(f"Sketch state saved to {state_path} ({len(store.groups)} groups)")
+        
+        if not store.groups:
+            return pd.DataFrame()
+        
+        rows = []
+        for (city, neighborhood, housing_type, year), sketch in store.groups.items():
+            rows.append({
+                'city': city,
+                'neighborhood': neighborhood,
+                'housing_type': housing_type,
+                'year': year,
+                'median_monthly_rent_xaf': sketch.rent.quantile(0.5),
+                'p25_monthly_rent_xaf': sketch.rent.quantile(0.25),
+                'p75_monthly_rent_xaf': sketch.rent.quantile(0.75),
+                # Sketches keep no resamplable rows, so no bootstrap interval
+                'median_ci_low_xaf': np.nan,
+                'median_ci_high_xaf': np.nan,
+                'median_rent_per_sqm': sketch.rent_per_sqm.quantile(0.5),
+                'listing_count': sketch.listing_count,
+                'mean_monthly_rent_xaf': sketch.mean,
+                'std_monthly_rent_xaf': sketch.std,
+            })
+        
+        aggregated = pd.DataFrame(rows).astype({
+            'median_monthly_rent_xaf': float,
+            'p25_monthly_rent_xaf': float,
+            'p75_monthly_rent_xaf': float,
+            'median_rent_per_sqm': float,
+        })
+        aggregated = self._finalize(aggregated)
+        
+        self.logger.info(f"Aggregated to {len(aggregated)} unique (city, neighborhood, type, year) groups")
+        
+        return aggregated
+    
+    def _median_ci(self, segments) -> tuple:
+        """Bootstrap (low, high) bounds for each segment's median rent"""
+        return bootstrap_median_ci(
+            *segments, n_resamples=self.bootstrap_resamples,
+            confidence=self.ci_level, seed=self.seed,
+        )
+    
+    def _prepare(self, listings: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+        """Keep listings with complete essential data and remove outliers"""
+        df = self._frame(listings)
         
         # Filter out listings without essential data
         df_valid = df[
@@ -38,66 +370,126 @@ class Aggregator:
         self.logger.info(f"{len(df_valid)} listings have complete essential data")
         
         if df_valid.empty:
-            return pd.DataFrame()
+            return df_valid
         
         # Remove outliers using IQR method
-        df_clean = self._remove_outliers(df_valid)
-        
-        # Group by dimensions
-        groupby_cols = ['city', 'neighborhood', 'housing_type', 'year']
-        
-        # Aggregate metrics
-        aggregated = df_clean.groupby(groupby_cols).agg({
-            'monthly_rent_xaf': [
-                ('median_monthly_rent_xaf', 'median'),
-                ('p25_monthly_rent_xaf', lambda x: x.quantile(0.25)),
-                ('p75_monthly_rent_xaf', lambda x: x.quantile(0.75)),
-                ('mean_monthly_rent_xaf', 'mean'),
-                ('std_monthly_rent_xaf', 'std'),
-            ],
-            'rent_per_sqm': [
-                ('median_rent_per_sqm', 'median'),
-            ],
-            'listing_url': [
-                ('listing_count', 'count'),
-            ],
-        }).reset_index()
+        return self._remove_outliers(self._encode(df_valid))
+    
+    def _frame(self, listings: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+        """
+        DataFrame of listings
         
-        # Flatten column names
-        aggregated.columns = [
-            col[0] if col[1] == '' else col[1] 
-            for col in aggregated.columns
-        ]
+        Listing records are read column by column, INPUT_COLUMNS only, with
+        key columns encoded straight from the values: no string column is
+        built only to be encoded, and URLs, which are only counted, stay
+        object dtype.
+        """
+        if isinstance(listings, pd.DataFrame):
+            return listings
+        columns = record_columns(listings, self.INPUT_COLUMNS)
+        if columns is None:
+            return pd.DataFrame(listings)
+        for col in self.CATEGORICAL_COLS:
+            if col in columns:
+                columns[col] = self._categorical(np.array(columns[col], dtype=object), self.vocabulary.get(col, ()))
+        columns['listing_url'] = pd.Series(columns['listing_url'], dtype=object)
+        return pd.DataFrame(columns)
+    
+    @property
+    def vocabulary(self) -> Dict[str, List[str]]:
+        """Known values of each CATEGORICAL_COLS column, from config_dir (loaded once)"""
+        if self._vocabulary is None:
+            try:
+                neighborhoods = load_yaml(os.path.join(self.config_dir, 'neighborhoods.yaml'))
+                housing_types = load_yaml(os.path.join(self.config_dir, 'housing_types.yaml'))
+                self._vocabulary = {
+                    'city': load_cities(self.config_dir) + list(neighborhoods),
+                    'neighborhood': [name for names in neighborhoods.values() for name in names or {}],
+                    # 'unknown' is the normalizer's fallback type
+                    'housing_type': list(housing_types) + ['unknown'],
+                    'source_site': [source['name'] for source in load_sources(self.config_dir) if source.get('name')],
+                }
+            except Exception as e:
+                self.logger.warning(f"No category vocabulary from {self.config_dir} ({e}); using observed values")
+                self._vocabulary = {}
+        return self._vocabulary
+    
+    def _encode(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Categorical key columns and compact integer columns (in place)"""
+        for col in self.CATEGORICAL_COLS:
+            if col in df.columns:
+                df[col] = self._categorical(df[col], self.vocabulary.get(col, ()))
+        for col in self.INTEGER_COLS:
+            if col in df.columns:
+                df[col] = self._compact_integers(df[col])
+        return df
+    
+    @staticmethod
+    def _categorical(values: pd.Series, vocabulary: Iterable[str]) -> pd.Categorical:
+        """
+        Categorical over the sorted union of vocabulary and observed values
         
+        Sorted categories make code order value order, so groupby and
+        sort_values on the codes order rows exactly as on the strings.
+        """
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(uniques, dtype=object)
+        categories = pd.Index(sorted(set(vocabulary).union(uniques)))
+        positions = categories.get_indexer(uniques)
+        codes = np.where(codes >= 0, positions[codes], -1) if len(uniques) else codes
+        return pd.Categorical.from_codes(codes, categories=categories)
+    
+    @staticmethod
+    def _compact_integers(values: pd.Series) -> pd.Series:
+        """Smallest integer dtype (nullable if values are missing); unchanged if not integral"""
+        try:
+            if values.isna().any():
+                values = values.astype('Int64')
+            return pd.to_numeric(values, downcast='integer')
+        except (TypeError, ValueError):
+            return values
+    
+    def _decode_keys(self, aggregated: pd.DataFrame) -> pd.DataFrame:
+        """Key columns of an aggregate back to strings and int64 years"""
+        for col in self.GROUPBY_COLS:
+            values = aggregated[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                aggregated[col] = values.astype(values.cat.categories.dtype)
+            elif col == 'year' and pd.api.types.is_integer_dtype(values.dtype):
+                aggregated[col] = values.astype(np.int64)
+        return aggregated
+    
+    def _finalize(self, aggregated: pd.DataFrame, sort: bool = True) -> pd.DataFrame:
+        """Derive volatility and confidence from mean/std columns, then sort"""
         # Calculate volatility score (coefficient of variation)
         aggregated['rent_volatility_score'] = (
             aggregated['std_monthly_rent_xaf'] / aggregated['mean_monthly_rent_xaf']
         ).fillna(0)
         
         # Calculate data confidence flag
-        aggregated['data_confidence'] = aggregated.apply(
-            self._calculate_confidence, axis=1
+        aggregated['data_confidence'] = self._calculate_confidence(
+            aggregated['listing_count'].to_numpy(),
+            aggregated['rent_volatility_score'].to_numpy(),
         )
         
         # Drop intermediate columns
         aggregated = aggregated.drop(columns=['mean_monthly_rent_xaf', 'std_monthly_rent_xaf'])
         
-        # Sort by city, year, neighborhood
-        aggregated = aggregated.sort_values(['city', 'year', 'neighborhood', 'housing_type'])
-        
-        self.logger.info(f"Aggregated to {len(aggregated)} unique (city, neighborhood, type, year) groups")
+        if not sort:
+            return aggregated
         
-        return aggregated
+        # Sort by city, year, neighborhood
+        return aggregated.sort_values(['city', 'year', 'neighborhood', 'housing_type'])
     
     def _remove_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove outliers using IQR method per housing type"""
-        df_clean = pd.DataFrame()
+        kept = []
         
         for housing_type in df['housing_type'].unique():
-            subset = df[df['housing_type'] == housing_type].copy()
+            subset = df[df['housing_type'] == housing_type]
             
             if len(subset) < 4:  # Need at least 4 data points
-                df_clean = pd.concat([df_clean, subset])
+                kept.append(subset)
                 continue
             
             # Calculate IQR
@@ -119,64 +511,42 @@ class Aggregator:
             if outliers_removed > 0:
                 self.logger.info(f"Removed {outliers_removed} outliers from {housing_type}")
             
-            df_clean = pd.concat([df_clean, subset_clean])
+            kept.append(subset_clean)
         
-        return df_clean
+        # One concat (categorical columns keep their dtype)
+        return pd.concat(kept)
     
-    def _calculate_confidence(self, row) -> str:
+    def _calculate_confidence(self, count: np.ndarray, volatility: np.ndarray) -> np.ndarray:
         """
-        Calculate data confidence flag based on listing count and volatility
+        Calculate data confidence flags based on listing count and volatility
         
-        Returns: 'high', 'medium', 'low'
+        Returns: array of 'high', 'medium', 'low'
         """
-        count = row['listing_count']
-        volatility = row['rent_volatility_score']
-        
-        if count >= 10 and volatility < 0.3:
-            return 'high'
-        elif count >= 5 and volatility < 0.5:
-            return 'medium'
-        else:
-            return 'low'
+        return np.select(
+            [
+                (count >= 10) & (volatility < 0.3),
+                (count >= 5) & (volatility < 0.5),
+            ],
+            ['high', 'medium'],
+            default='low',
+        ).astype(object)
     
     def export_csv(self, df: pd.DataFrame, filepath: str):
         """Export to CSV"""
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         self.logger.info(f"Exported CSV to {filepath}")
     
-    def export_json(self, df: pd.DataFrame, filepath: str):
-        """Export to hierarchical JSON"""
-        # Build hierarchical structure
-        result = {}
+    def export_json(self, df: pd.DataFrame, filepath: str, compact: bool = False, compress: bool = False):
+        """
+        Export to hierarchical JSON
         
-        for _, row in df.iterrows():
-            city = row['city']
-            neighborhood = row['neighborhood']
-            housing_type = row['housing_type']
-            year = int(row['year'])
-            
-            # Initialize nested structure
-            if city not in result:
-                result[city] = {}
-            if neighborhood not in result[city]:
-                result[city][neighborhood] = {}
-            if housing_type not in result[city][neighborhood]:
-                result[city][neighborhood][housing_type] = {}
-            
-            # Add year data
-            result[city][neighborhood][housing_type][year] = {
-                'median_monthly_rent_xaf': float(row['median_monthly_rent_xaf']) if pd.notna(row['median_monthly_rent_xaf']) else None,
-                'p25_monthly_rent_xaf': float(row['p25_monthly_rent_xaf']) if pd.notna(row['p25_monthly_rent_xaf']) else None,
-                'p75_monthly_rent_xaf': float(row['p75_monthly_rent_xaf']) if pd.notna(row['p75_monthly_rent_xaf']) else None,
-                'median_rent_per_sqm': float(row['median_rent_per_sqm']) if pd.notna(row['median_rent_per_sqm']) else None,
-                'listing_count': int(row['listing_count']),
-                'rent_volatility_score': float(row['rent_volatility_score']) if pd.notna(row['rent_volatility_score']) else None,
-                'data_confidence': row['data_confidence'],
-            }
-        
-        # Write to file
-        import json
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        Args:
+            df: Aggregated DataFrame
+            filepath: Output path
+            compact: Write without indentation/whitespace
+            compress: Gzip the output (use a .json.gz path)
+        """
+        exporter = HierarchicalJSONExporter(compact=compact, compress=compress)
+        exporter.export(df, filepath)
         
         self.logger.info(f"Exported JSON to {filepath}")
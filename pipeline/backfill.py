@@ -0,0 +1,244 @@
+"""
+Parallel backfill of historical raw dumps
+
+Rebuilds cleaned listings and aggregates from every raw dump on disk
+(data/raw/raw_listings_*.json[l] and quick_scrape_raw.json), e.g. after the
+normalization rules changed. Dumps are normalized in worker processes, one
+dump per task, with relative and missing listing dates resolved against the
+dump's own scrape time rather than today. Results are consumed oldest dump
+first and deduplicated across dumps, so a listing seen in several months is
+kept once, dated by its first sighting. Only the deduplicated listings are
+written, so the aggregates are computed from the cleaned dataset itself,
+reading just the columns the Aggregator uses.
+
+Each run writes to its own directory, leaving the live dataset untouched:
+
+    data/backfill/<run_id>/cleaned/city=.../year=.../month=.../part-<dump>-<write>-0.parquet
+    data/backfill/<run_id>/rental_intelligence.csv / .json (+ rollups)
+    data/backfill/<run_id>/backfill_summary.json
+"""
+
+import os
+import re
+import json
+import glob
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from utils.logger import setup_logger
+from pipeline.deduplicator import Deduplicator
+from storage.listing_store import ListingStore
+
+
+DUMP_PATTERNS = ('raw_listings_*.json', 'raw_listings_*.jsonl', 'quick_scrape_raw.json')
+
+# raw_listings_20260129_171338.json -> 2026-01-29 17:13:38
+_TIMESTAMP_RE = re.compile(r'(\d{8}_\d{6})')
+
+
+def dump_timestamp(path: str) -> datetime:
+    """Scrape time of a dump: from its file name, else its modification time"""
+    match = _TIMESTAMP_RE.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    return datetime.fromtimestamp(os.path.getmtime(path)).replace(microsecond=0)
+
+
+def discover_dumps(raw_dir: str = "data/raw") -> List[Dict[str, Any]]:
+    """
+    Raw dumps in a directory, oldest first
+    
+    Returns:
+        Dicts with 'path', 'label' (file name without extension), 'scraped_at' and 'bytes'
+    """
+    paths = set()
+    for pattern in DUMP_PATTERNS:
+        paths.update(glob.glob(os.path.join(raw_dir, pattern)))
+    
+    dumps = [
+        {
+            'path': path,
+            'label': os.path.splitext(os.path.basename(path))[0],
+            'scraped_at': dump_timestamp(path),
+            'bytes': os.path.getsize(path),
+        }
+        for path in paths
+    ]
+    dumps.sort(key=lambda dump: (dump['scraped_at'], dump['path']))
+    return dumps
+
+
+def load_dump(path: str) -> List[Dict[str, Any]]:
+    """Raw listings of a JSON array dump or a JSON Lines dump (a crashed run's partial last record is skipped)"""
+    if path.endswith('.jsonl'):
+        with ListingStore(path) as store:
+            return store.read()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Per-process normalizer, created by _init_worker
+_normalizer = None
+
+
+def _init_worker(config_dir: str):
+    global _normalizer
+    from pipeline.normalizer import Normalizer
+    _normalizer = Normalizer(config_dir)
+
+
+def _normalize_dump(path: str, scraped_at: datetime) -> Tuple[int, List[Dict[str, Any]], float]:
+    """Worker task: (raw count, normalized listings, seconds) for one dump"""
+    start = time.perf_counter()
+    raw_listings = load_dump(path)
+    normalized = []
+    for raw_listing in raw_listings:
+        listing = _normalizer.normalize_listing(raw_listing, reference_date=scraped_at)
+        if listing:
+            normalized.append(listing)
+    return len(raw_listings), normalized, time.perf_counter() - start
+
+
+class Backfill:
+    """Rebuild cleaned listings and aggregates from all raw dumps"""
+    
+    def __init__(self, raw_dir: str = "data/raw", output_dir: str = "data/backfill",
+                 workers: Optional[int] = None, config_dir: str = "config",
+                 aggregate: bool = True):
+        """
+        Args:
+            raw_dir: Directory searched for raw dumps
+            output_dir: Each run writes to <output_dir>/<run_id>
+            workers: Worker processes (default: one per CPU)
+            config_dir: Normalization config used by the workers
+            aggregate: Also aggregate and export the rebuilt listings
+        """
+        self.logger = setup_logger("backfill")
+        self.raw_dir = raw_dir
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.config_dir = config_dir
+        self.aggregate = aggregate
+        self.deduplicator = Deduplicator()
+    
+    def run(self, run_id: str = None) -> Dict[str, Any]:
+        """
+        Normalize every dump in parallel, deduplicate across dumps and write the results
+        
+        Args:
+            run_id: Output subdirectory (default: current timestamp)
+        
+        Returns:
+            Run summary (per-dump counts, totals and throughput)
+        """
+        # Imported here: pyarrow is only needed once there is something to write
+        from storage.columnar_store import ColumnarListingStore
+        
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_dir = os.path.join(self.output_dir, run_id)
+        dumps = discover_dumps(self.raw_dir)
+        if not dumps:
+            raise FileNotFoundError(f"No raw dumps found in {self.raw_dir}")
+        
+        os.makedirs(run_dir, exist_ok=True)
+        store = ColumnarListingStore(os.path.join(run_dir, 'cleaned'), kind='cleaned')
+        total_bytes = sum(dump['bytes'] for dump in dumps)
+        self.logger.info(
+            f"Backfill {run_id}: {len(dumps)} dumps ({total_bytes / 1e6:.1f} MB) "
+            f"from {dumps[0]['scraped_at']:%Y-%m-%d} to {dumps[-1]['scraped_at']:%Y-%m-%d}, "
+            f"{self.workers} workers"
+        )
+        
+        seen_signatures = set()
+        files = []
+        totals = {'raw': 0, 'normalized': 0, 'unique': 0}
+        start = time.perf_counter()
+        
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.config_dir,)) as executor:
+            # map() yields in submission order (oldest dump first) while later
+            # dumps are already being normalized
+            results = executor.map(
+                _normalize_dump,
+                [dump['path'] for dump in dumps],
+                [dump['scraped_at'] for dump in dumps],
+            )
+            for index, (dump, (raw_count, normalized, seconds)) in enumerate(zip(dumps, results), 1):
+                fresh = list(self.deduplicator.filter_stream(normalized, seen_signatures))
+                store.write(fresh, run_id=dump['label'], scraped_at=dump['scraped_at'])
+                
+                totals['raw'] += raw_count
+                totals['normalized'] += len(normalized)
+                totals['unique'] += len(fresh)
+                files.append({
+                    'path': dump['path'],
+                    'scraped_at': dump['scraped_at'].isoformat(),
+                    'raw': raw_count,
+                    'normalized': len(normalized),
+                    'unique': len(fresh),
+                    'worker_seconds': round(seconds, 3),
+                })
+                
+                elapsed = time.perf_counter() - start
+                eta = elapsed / index * (len(dumps) - index)
+                self.logger.info(
+                    f"[{index}/{len(dumps)}] {dump['label']}: {raw_count} raw -> "
+                    f"{len(normalized)} normalized, {len(fresh)} new | "
+                    f"{index / elapsed:.1f} files/s, {totals['raw'] / elapsed:,.0f} listings/s, "
+                    f"ETA {eta:.0f}s"
+                )
+        
+        elapsed = time.perf_counter() - start
+        summary = {
+            'run_id': run_id,
+            'raw_dir': self.raw_dir,
+            'workers': self.workers,
+            'dumps': len(dumps),
+            'bytes': total_bytes,
+            **totals,
+            'duplicates': totals['normalized'] - totals['unique'],
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(len(dumps) / elapsed, 2),
+            'listings_per_second': round(totals['raw'] / elapsed, 1),
+            'mb_per_second': round(total_bytes / 1e6 / elapsed, 2),
+            'outputs': {'cleaned': os.path.join(run_dir, 'cleaned')},
+            'files': files,
+        }
+        
+        if self.aggregate:
+            summary['outputs'].update(self._aggregate(store, run_dir))
+        
+        with open(os.path.join(run_dir, 'backfill_summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        
+        self.logger.info(
+            f"✓ Backfill {run_id}: {totals['raw']} raw -> {totals['unique']} unique listings "
+            f"in {elapsed:.1f}s ({summary['listings_per_second']:,.0f} listings/s, "
+            f"{summary['mb_per_second']:.1f} MB/s)"
+        )
+        self.logger.info(f"  Output: {run_dir}")
+        return summary
+    
+    def _aggregate(self, store, run_dir: str) -> Dict[str, str]:
+        """Aggregate the rebuilt dataset and export like the export stage, into the run directory"""
+        from pipeline.aggregator import Aggregator
+        
+        aggregator = Aggregator()
+        outputs = {}
+        
+        unique_listings = store.read_frame(columns=Aggregator.INPUT_COLUMNS)
+        aggregated = aggregator.aggregate(unique_listings)
+        outputs['csv'] = os.path.join(run_dir, 'rental_intelligence.csv')
+        outputs['json'] = os.path.join(run_dir, 'rental_intelligence.json')
+        aggregator.export_csv(aggregated, outputs['csv'])
+        aggregator.export_json(aggregated, outputs['json'])
+        
+        rollups = aggregator.aggregate_rollups(unique_listings)
+        if rollups is not None and not rollups.empty:
+            outputs['rollups_csv'] = os.path.join(run_dir, 'rental_intelligence_rollups.csv')
+            outputs['rollups_json'] = os.path.join(run_dir, 'rental_intelligence_rollups.json')
+            aggregator.export_csv(rollups, outputs['rollups_csv'])
+            aggregator.export_json(rollups, outputs['rollups_json'])
+        
+        return outputs
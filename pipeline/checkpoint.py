@@ -0,0 +1,116 @@
+"""
+Stage checkpoints for the scrape -> normalize -> deduplicate -> aggregate pipeline
+
+Each stage's output is pickled under data/checkpoints/<stage>/<key>.pkl. The
+key hashes the upstream stage's key, the contents of the code and config
+files the stage depends on, and its runtime parameters, so a checkpoint is
+only reused while everything that produced it is unchanged. Keys are
+chained: editing the normalizer invalidates normalize and every later stage,
+but not the scrape.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+from utils.logger import setup_logger
+
+
+def fingerprint(paths: Sequence[str], params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash the contents of files plus a parameter dict
+    
+    Args:
+        paths: Code/config files (missing files hash as absent)
+        params: JSON-serializable runtime parameters
+    
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8') + b'\0')
+        try:
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except FileNotFoundError:
+            digest.update(b'<missing>')
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """Pickled stage outputs keyed by a hash of their inputs"""
+    
+    def __init__(self, root: str = "data/checkpoints", keep: int = 3):
+        """
+        Args:
+            root: Checkpoint directory
+            keep: Checkpoints kept per stage (older ones are pruned on save)
+        """
+        self.logger = setup_logger("checkpoint")
+        self.root = root
+        self.keep = keep
+    
+    def stage_key(self, stage: str, upstream_key: Optional[str], stage_fingerprint: str) -> str:
+        """Chain the upstream key with this stage's code/config fingerprint"""
+        digest = hashlib.sha256(f"{stage}|{upstream_key or ''}|{stage_fingerprint}".encode('utf-8'))
+        return digest.hexdigest()[:24]
+    
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.pkl")
+    
+    def exists(self, stage: str, key: str) -> bool:
+        return os.path.exists(self._path(stage, key))
+    
+    def load(self, stage: str, key: str) -> Any:
+        """Load a checkpoint (raises FileNotFoundError if absent)"""
+        path = self._path(stage, key)
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        self.logger.info(f"Loaded {stage} checkpoint {key} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        return payload
+    
+    def save(self, stage: str, key: str, payload: Any) -> str:
+        """
+        Write a checkpoint atomically and prune old ones for the stage
+        
+        Returns:
+            Checkpoint path
+        """
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        
+        self.logger.info(f"Saved {stage} checkpoint {key} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        self._prune(stage)
+        return path
+    
+    def keys(self, stage: str) -> List[str]:
+        """Checkpoint keys for a stage, newest first"""
+        stage_dir = os.path.join(self.root, stage)
+        if not os.path.isdir(stage_dir):
+            return []
+        paths = [
+            os.path.join(stage_dir, name) for name in os.listdir(stage_dir)
+            if name.endswith('.pkl')
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        return [os.path.basename(path)[:-len('.pkl')] for path in paths]
+    
+    def latest(self, stage: str) -> Optional[str]:
+        """Most recently written checkpoint key for a stage"""
+        keys = self.keys(stage)
+        return keys[0] if keys else None
+    
+    def _prune(self, stage: str):
+        for key in self.keys(stage)[self.keep:]:
+            try:
+                os.remove(self._path(stage, key))
+            except OSError as e:
+                self.logger.warning(f"Could not prune {stage} checkpoint {key}: {e}")
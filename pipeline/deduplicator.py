@@ -1,11 +1,13 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set
 from utils.logger import setup_logger
+from utils.metrics import get_metrics
 
 class Deduplicator:
     """Remove duplicate listings"""
     
     def __init__(self, similarity_threshold: float = 0.9):
         self.logger = setup_logger("deduplicator")
+        self.metrics = get_metrics()
         self.similarity_threshold = similarity_threshold
     
     def deduplicate(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -23,21 +25,46 @@ class Deduplicator:
         
         self.logger.info(f"Deduplicating {len(listings)} listings...")
         
-        unique_listings = []
-        seen_signatures = set()
-        
-        for listing in listings:
-            signature = self._create_signature(listing)
-            
-            if signature not in seen_signatures:
-                unique_listings.append(listing)
-                seen_signatures.add(signature)
+        with self.metrics.timer('dedup_seconds'):
+            unique_listings = list(self.filter_stream(listings))
         
         duplicates_removed = len(listings) - len(unique_listings)
         self.logger.info(f"Removed {duplicates_removed} duplicates. {len(unique_listings)} unique listings remain.")
         
         return unique_listings
     
+    def filter_stream(self, listings: Iterable[Dict[str, Any]],
+                      seen_signatures: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield listings whose signature has not been seen yet, as they arrive
+        
+        Args:
+            listings: Any iterable of normalized listings (e.g. a queue consumer)
+            seen_signatures: Signatures already seen; pass the same set to
+                deduplicate across several calls (it is updated in place)
+            
+        Yields:
+            First listing seen for each signature
+        """
+        if seen_signatures is None:
+            seen_signatures = set()
+        
+        unique = duplicates = 0
+        try:
+            for listing in listings:
+                signature = self._create_signature(listing)
+                
+                if signature not in seen_signatures:
+                    seen_signatures.add(signature)
+                    unique += 1
+                    yield listing
+                else:
+                    duplicates += 1
+        finally:
+            # Counted once per stream, not per listing
+            self.metrics.inc('dedup_listings_total', unique, result='unique')
+            self.metrics.inc('dedup_listings_total', duplicates, result='duplicate')
+    
     def _create_signature(self, listing: Dict[str, Any]) -> str:
         """
         Create a signature for duplicate detection
@@ -0,0 +1,208 @@
+"""
+Streaming hierarchical JSON export
+
+Writes the city -> neighborhood -> housing_type -> year tree straight to disk
+from grouped column arrays. Rows are ordered once with a stable lexsort on
+first-appearance codes (so key order matches building a nested dict from the
+frame), metric columns are encoded to JSON tokens column by column, and the
+output is flushed in chunks instead of being held as one nested structure.
+
+The default (indent=2) output is byte-identical to
+json.dump(tree, f, indent=2, ensure_ascii=False).
+"""
+
+import gzip
+import json
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+
+class HierarchicalJSONExporter:
+    """Export aggregated rows as nested JSON, streamed in chunks"""
+    
+    KEY_COLS = ['city', 'neighborhood', 'housing_type', 'year']
+    
+    # (column, kind) in output order
+    METRIC_COLS = [
+        ('median_monthly_rent_xaf', 'float'),
+        ('p25_monthly_rent_xaf', 'float'),
+        ('p75_monthly_rent_xaf', 'float'),
+        ('median_ci_low_xaf', 'float'),
+        ('median_ci_high_xaf', 'float'),
+        ('median_rent_per_sqm', 'float'),
+        ('listing_count', 'int'),
+        ('rent_volatility_score', 'float'),
+        ('data_confidence', 'str'),
+    ]
+    
+    def __init__(self, compact: bool = False, compress: bool = False,
+                 indent: int = 2, chunk_rows: int = 50_000):
+        """
+        Args:
+            compact: Write without whitespace (separators ',' and ':')
+            compress: Write gzip-compressed output
+            indent: Indentation width for the pretty (non-compact) layout
+            chunk_rows: Rows encoded and written per chunk
+        """
+        self.compact = compact
+        self.compress = compress
+        self.indent = indent
+        self.chunk_rows = chunk_rows
+    
+    def export(self, df: pd.DataFrame, filepath: str):
+        """Write df to filepath"""
+        opener = gzip.open if self.compress else open
+        with opener(filepath, 'wt', encoding='utf-8') as f:
+            if df.empty:
+                f.write('{}')
+                return
+            
+            order = self._tree_order(df)
+            columns = self._metric_columns(df)
+            arrays = {col: df[col].to_numpy(dtype=object) for col in self.KEY_COLS}
+            arrays.update({col: df[col].to_numpy() for col, _ in columns})
+            
+            f.write('{')
+            prev = None
+            for start in range(0, len(order), self.chunk_rows):
+                idx = order[start:start + self.chunk_rows]
+                prev = self._write_chunk(f, arrays, idx, columns, prev)
+            f.write(self._close(3) + self._close(2) + self._close(1) + self._newline(0) + '}')
+    
+    def _tree_order(self, df: pd.DataFrame) -> np.ndarray:
+        """Row order grouping each subtree contiguously, keys in first-appearance order"""
+        city_codes = df.groupby(['city'], sort=False, dropna=False).ngroup().to_numpy()
+        neighborhood_codes = df.groupby(
+            ['city', 'neighborhood'], sort=False, dropna=False
+        ).ngroup().to_numpy()
+        type_codes = df.groupby(
+            ['city', 'neighborhood', 'housing_type'], sort=False, dropna=False
+        ).ngroup().to_numpy()
+        
+        # lexsort is stable, so years keep their row order within a subtree
+        return np.lexsort((type_codes, neighborhood_codes, city_codes))
+    
+    def _metric_columns(self, df: pd.DataFrame) -> List[Tuple[str, str]]:
+        """Metric columns present in df (extra columns are exported as floats)"""
+        known = {col for col, _ in self.METRIC_COLS}
+        columns = [(col, kind) for col, kind in self.METRIC_COLS if col in df.columns]
+        columns += [
+            (col, 'float') for col in df.columns
+            if col not in known and col not in self.KEY_COLS
+            and pd.api.types.is_numeric_dtype(df[col])
+        ]
+        return columns
+    
+    def _write_chunk(self, f, arrays: Dict[str, np.ndarray], idx: np.ndarray,
+                     columns: List[Tuple[str, str]], prev):
+        """Write one chunk of rows, returning the last (city, neighborhood, type) seen"""
+        cities = arrays['city'][idx].tolist()
+        neighborhoods = arrays['neighborhood'][idx].tolist()
+        housing_types = arrays['housing_type'][idx].tolist()
+        years = self._encode_years(arrays['year'][idx])
+        leaves = self._encode_leaves(arrays, idx, columns)
+        
+        key_cache = {}
+        
+        def key(value) -> str:
+            token = key_cache.get(value)
+            if token is None:
+                token = key_cache[value] = json.dumps(str(value), ensure_ascii=False)
+            return token
+        
+        kv = ':' if self.compact else ': '
+        buf = []
+        
+        for city, neighborhood, housing_type, year, leaf in zip(
+            cities, neighborhoods, housing_types, years, leaves
+        ):
+            if prev is None:
+                buf.append(self._open(1, key(city), kv) + self._open(2, key(neighborhood), kv)
+                           + self._open(3, key(housing_type), kv))
+            elif city != prev[0]:
+                buf.append(self._close(3) + self._close(2) + self._close(1) + ','
+                           + self._open(1, key(city), kv) + self._open(2, key(neighborhood), kv)
+                           + self._open(3, key(housing_type), kv))
+            elif neighborhood != prev[1]:
+                buf.append(self._close(3) + self._close(2) + ','
+                           + self._open(2, key(neighborhood), kv) + self._open(3, key(housing_type), kv))
+            elif housing_type != prev[2]:
+                buf.append(self._close(3) + ',' + self._open(3, key(housing_type), kv))
+            else:
+                buf.append(',')
+            
+            buf.append(self._newline(4) + year + kv + '{' + leaf + self._close(4))
+            prev = (city, neighborhood, housing_type)
+        
+        f.write(''.join(buf))
+        return prev
+    
+    def _encode_years(self, years: np.ndarray) -> List[str]:
+        """JSON keys for the year level (ints as in the dict-based export)"""
+        tokens = []
+        cache = {}
+        for year in years.tolist():
+            token = cache.get(year)
+            if token is None:
+                if isinstance(year, (int, float)) and not (isinstance(year, float) and math.isnan(year)):
+                    token = json.dumps(str(int(year)))
+                else:
+                    token = json.dumps(str(year), ensure_ascii=False)
+                cache[year] = token
+            tokens.append(token)
+        return tokens
+    
+    def _encode_leaves(self, arrays: Dict[str, np.ndarray], idx: np.ndarray,
+                       columns: List[Tuple[str, str]]) -> List[str]:
+        """Leaf object bodies, encoded column by column"""
+        kv = ':' if self.compact else ': '
+        token_lists = []
+        template_parts = []
+        
+        for i, (col, kind) in enumerate(columns):
+            values = arrays[col][idx]
+            if kind == 'float':
+                tokens = self._encode_floats(values)
+            elif kind == 'int':
+                tokens = list(map(str, values.astype(np.int64).tolist()))
+            else:
+                cache = {}
+                tokens = [
+                    cache[v] if v in cache else cache.setdefault(v, json.dumps(v, ensure_ascii=False))
+                    for v in values.tolist()
+                ]
+            token_lists.append(tokens)
+            prefix = '' if i == 0 else ','
+            template_parts.append(prefix + self._newline(5) + json.dumps(col) + kv + '{}')
+        
+        if not token_lists:
+            return [''] * len(idx)
+        
+        template = ''.join(template_parts)
+        return list(map(template.format, *token_lists))
+    
+    def _encode_floats(self, values: np.ndarray) -> List[str]:
+        """JSON tokens for a float column (NaN becomes null)"""
+        values = np.asarray(values, dtype=float)
+        tokens = list(map(float.__repr__, values.tolist()))
+        
+        for i in np.flatnonzero(~np.isfinite(values)).tolist():
+            value = values[i]
+            if np.isnan(value):
+                tokens[i] = 'null'
+            else:
+                tokens[i] = 'Infinity' if value > 0 else '-Infinity'
+        return tokens
+    
+    def _newline(self, level: int) -> str:
+        if self.compact:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+    
+    def _open(self, level: int, key_token: str, kv: str) -> str:
+        return self._newline(level) + key_token + kv + '{'
+    
+    def _close(self, level: int) -> str:
+        return self._newline(level) + '}'
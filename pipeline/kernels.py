@@ -0,0 +1,224 @@
+"""
+Vectorized group kernels
+
+Quantiles are computed with sorted NumPy segment arithmetic: rows are sorted
+once by (group code, value), every group becomes a contiguous segment, and
+each quantile is a gather at computed offsets. Results are bit-identical to
+pandas' groupby median and Series.quantile (linear interpolation).
+"""
+
+import numpy as np
+from typing import Dict, Iterator, Sequence, Tuple
+
+
+def sort_segments(codes: np.ndarray, values: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sort values by (group code, value), dropping NaN values and negative codes
+    
+    Returns:
+        Tuple of (sorted_values, segment_starts, segment_counts)
+    """
+    codes = np.asarray(codes)
+    values = np.asarray(values, dtype=float)
+    
+    keep = (codes >= 0) & ~np.isnan(values)
+    # groupby.ngroup() is float with NaN for rows whose key has a missing value
+    codes = codes[keep].astype(np.int64)
+    values = values[keep]
+    
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    
+    return sorted_values, starts, counts
+
+
+def segment_median(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of each segment (mean of the two middle values for even sizes)"""
+    result = np.full(len(counts), np.nan)
+    has_data = counts > 0
+    
+    starts = starts[has_data]
+    counts = counts[has_data]
+    lower = sorted_values[starts + (counts - 1) // 2]
+    upper = sorted_values[starts + counts // 2]
+    result[has_data] = (lower + upper) / 2
+    
+    return result
+
+
+def segment_quantile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """q-th quantile of each segment, matching numpy's 'linear' method"""
+    result = np.full(len(counts), np.nan)
+    has_data = counts > 0
+    
+    starts = starts[has_data]
+    n = counts[has_data].astype(float)
+    
+    # Same virtual index and interpolation as np.percentile(method='linear')
+    virtual = n * q + (1 - q) - 1
+    previous = np.floor(virtual)
+    gamma = virtual - previous
+    previous = previous.astype(np.int64)
+    following = np.minimum(previous + 1, counts[has_data] - 1)
+    
+    a = sorted_values[starts + previous]
+    b = sorted_values[starts + following]
+    diff = b - a
+    lerp = a + diff * gamma
+    np.subtract(b, diff * (1 - gamma), out=lerp, where=gamma >= 0.5)
+    result[has_data] = lerp
+    
+    return result
+
+
+def segment_quantiles(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                      quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> Dict[float, np.ndarray]:
+    """Several quantiles of each segment; 0.5 uses the median definition"""
+    result = {}
+    for q in quantiles:
+        if q == 0.5:
+            result[q] = segment_median(sorted_values, starts, counts)
+        else:
+            result[q] = segment_quantile(sorted_values, starts, counts, q)
+    return result
+
+
+def group_quantiles(codes: np.ndarray, values: np.ndarray, n_groups: int,
+                    quantiles: Sequence[float] = (0.25, 0.5, 0.75)) -> Dict[float, np.ndarray]:
+    """
+    Compute several quantiles per group with a single sort
+    
+    Args:
+        codes: Group code per row (negative codes are ignored)
+        values: Value per row (NaN values are ignored)
+        n_groups: Number of groups
+        quantiles: Quantiles to compute; 0.5 uses the median definition
+    
+    Returns:
+        Dict mapping each quantile to an array of length n_groups
+    """
+    return segment_quantiles(*sort_segments(codes, values, n_groups), quantiles)
+
+
+def iter_level_segments(level_codes: Sequence[np.ndarray], level_sizes: Sequence[int],
+                        values: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    sort_segments() for several groupings of the same rows (SQL GROUPING SETS)
+    
+    Values are sorted once. Each level then only needs a stable sort of its
+    own group codes in value order, which is a radix sort when the level has
+    at most 65536 groups, so extra levels cost far less than re-sorting.
+    
+    Args:
+        level_codes: Per level, a level-local group code per row (negative = excluded)
+        level_sizes: Number of groups in each level
+        values: Value per row (NaN values are ignored)
+    
+    Yields:
+        (sorted_values, segment_starts, segment_counts) per level
+    """
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    order = np.argsort(values[keep], kind='stable')
+    value_sorted = values[keep][order]
+    
+    for codes, n_groups in zip(level_codes, level_sizes):
+        codes = np.asarray(codes)[keep][order]
+        in_level = codes >= 0
+        codes = codes[in_level]
+        
+        code_dtype = np.uint16 if n_groups <= 65536 else np.int64
+        segment_order = np.argsort(codes.astype(code_dtype), kind='stable')
+        
+        counts = np.bincount(codes, minlength=n_groups)
+        starts = np.cumsum(counts) - counts
+        yield value_sorted[in_level][segment_order], starts, counts
+
+
+def bootstrap_median_ci(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                        n_resamples: int = 500, confidence: float = 0.95, seed: int = 42,
+                        batch_size: int = 1 << 22) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Percentile bootstrap confidence interval for the median of each segment
+    
+    The median of a with-replacement resample of a sorted segment depends
+    only on the middle order statistics of the resampled indices, so those
+    are drawn directly instead of drawing n indices and sorting them: the
+    k-th smallest of n uniform draws is Beta(k, n - k + 1), and the next
+    smallest is that plus the minimum of the other n - k draws over the rest
+    of the interval (Beta(1, n - k) scaled). floor(u * n) maps a uniform
+    order statistic to the resampled index, so the bootstrap distribution is
+    exact.
+    
+    Resampled index positions depend only on the segment size, so segments
+    of equal size share one (n_resamples,) draw of index pairs; medians for
+    even-sized segments are then gathered as batched (n_resamples, segments)
+    arrays. Each segment's interval is still a bootstrap of its own values.
+    
+    Args:
+        sorted_values, starts, counts: Segments from sort_segments()
+        n_resamples: Bootstrap replicates per segment
+        confidence: Interval coverage, e.g. 0.95
+        seed: Seed for the random generator (results are reproducible)
+        batch_size: Upper bound on replicate x segment values held at once
+    
+    Returns:
+        Tuple of (low, high) arrays; NaN for segments with fewer than 2 values
+    """
+    low = np.full(len(counts), np.nan)
+    high = np.full(len(counts), np.nan)
+    
+    groups = np.flatnonzero(counts >= 2)
+    if len(groups) == 0 or n_resamples <= 0:
+        return low, high
+    
+    rng = np.random.default_rng(seed)
+    tail = (1 - confidence) / 2
+    
+    # Index pairs per distinct segment size
+    sizes, size_index = np.unique(counts[groups], return_inverse=True)
+    rank = (sizes - 1) // 2 + 1  # 1-based rank of the lower middle value
+    u_lower = rng.beta(rank, sizes - rank + 1, size=(n_resamples, len(sizes)))
+    lower = np.minimum((u_lower * sizes).astype(np.int64), sizes - 1)
+    upper = lower.copy()
+    
+    even = np.flatnonzero(sizes % 2 == 0)
+    if len(even):
+        gap = rng.beta(1, sizes[even] - rank[even], size=(n_resamples, len(even)))
+        u_upper = u_lower[:, even] + (1 - u_lower[:, even]) * gap
+        upper[:, even] = np.minimum((u_upper * sizes[even]).astype(np.int64), sizes[even] - 1)
+    
+    # Odd sizes: the resampled median is sorted_values[start + lower], which is
+    # monotone in lower, so its percentiles follow from the sorted shared draws
+    odd = sizes[size_index] % 2 == 1
+    if odd.any():
+        segment = groups[odd]
+        columns = size_index[odd]
+        ranked = np.sort(lower, axis=0)
+        for bound, q in ((low, tail), (high, 1 - tail)):
+            position = q * (n_resamples - 1)
+            below = int(np.floor(position))
+            above = min(below + 1, n_resamples - 1)
+            a = sorted_values[starts[segment] + ranked[below, columns]]
+            b = sorted_values[starts[segment] + ranked[above, columns]]
+            bound[segment] = a + (b - a) * (position - below)
+    
+    # Even sizes: average of two order statistics, percentiles per segment
+    even_groups = groups[~odd]
+    even_columns = size_index[~odd]
+    groups_per_batch = max(1, batch_size // n_resamples)
+    for batch_start in range(0, len(even_groups), groups_per_batch):
+        batch = slice(batch_start, batch_start + groups_per_batch)
+        segment = even_groups[batch]
+        columns = even_columns[batch]
+        seg_starts = starts[segment]
+        
+        medians = sorted_values[seg_starts + lower[:, columns]]
+        medians += sorted_values[seg_starts + upper[:, columns]]
+        medians /= 2
+        low[segment], high[segment] = np.quantile(medians, [tail, 1 - tail], axis=0)
+    
+    return low, high
@@ -1,15 +1,22 @@
 import yaml
 import re
+from datetime import datetime
 from typing import Dict, Any, Optional
 from utils.logger import setup_logger
+from utils.metrics import get_metrics
 from utils.price_parser import PriceParser
 from utils.date_extractor import DateExtractor
+from utils.records import NormalizedListing
 
 class Normalizer:
     """Normalize raw listing data to standardized format"""
     
+    # Quality flags counted as normalize_missing_total{field=...} when False
+    QUALITY_FLAGS = ('has_price', 'has_size', 'has_neighborhood', 'has_housing_type')
+    
     def __init__(self, config_dir: str = "config"):
         self.logger = setup_logger("normalizer")
+        self.metrics = get_metrics()
         self.price_parser = PriceParser()
         self.date_extractor = DateExtractor()
         
@@ -26,16 +33,32 @@ class Normalizer:
             self.logger.error(f"Failed to load {filepath}: {e}")
             return {}
     
-    def normalize_listing(self, raw_listing: Dict[str, Any]) -> Dict[str, Any]:
+    def normalize_listing(self, raw_listing: Dict[str, Any],
+                          reference_date: Optional[datetime] = None) -> Optional[NormalizedListing]:
         """
         Normalize a single listing
         
         Args:
-            raw_listing: Raw listing dictionary
+            raw_listing: Raw listing record or dictionary
+            reference_date: When the listing was scraped; relative and missing
+                listing dates resolve against it (default: now)
             
         Returns:
-            Normalized listing dictionary
+            Normalized listing record (reads like a dict), or None on error
         """
+        with self.metrics.timer('normalize_seconds'):
+            normalized = self._normalize(raw_listing, reference_date)
+        
+        if self.metrics.enabled:
+            self.metrics.inc('normalize_listings_total', result='ok' if normalized else 'error')
+            if normalized:
+                for flag in self.QUALITY_FLAGS:
+                    if not normalized[flag]:
+                        self.metrics.inc('normalize_missing_total', field=flag[len('has_'):])
+        
+        return normalized
+    
+    def _normalize(self, raw_listing: Dict[str, Any], reference_date: Optional[datetime]) -> Optional[NormalizedListing]:
         try:
             # Parse price
             monthly_rent, currency, frequency = self.price_parser.parse_price(
@@ -44,7 +67,7 @@ class Normalizer:
             
             # Extract date
             year, month = self.date_extractor.extract_date(
-                raw_listing.get('listing_date', '')
+                raw_listing.get('listing_date', ''), reference=reference_date
             )
             
             # Normalize housing type
@@ -64,41 +87,29 @@ class Normalizer:
             # Parse size
             size_sqm = self._parse_size(raw_listing.get('size_raw', ''))
             
-            # Compute rent per sqm
-            rent_per_sqm = None
-            if monthly_rent and size_sqm:
-                rent_per_sqm = monthly_rent / size_sqm
-            
-            # Build normalized listing
-            normalized = {
+            # Build normalized listing; rent per sqm and the quality flags
+            # (has_price, has_size, ...) are derived from these fields
+            normalized = NormalizedListing(
                 # Location
-                'city': city,
-                'neighborhood': neighborhood,
+                city=city,
+                neighborhood=neighborhood,
                 
                 # Property type
-                'housing_type': housing_type,
-                'bedrooms': self._parse_bedrooms(raw_listing.get('bedrooms_raw', '')),
-                'size_sqm': size_sqm,
+                housing_type=housing_type,
+                bedrooms=self._parse_bedrooms(raw_listing.get('bedrooms_raw', '')),
+                size_sqm=size_sqm,
                 
                 # Price
-                'monthly_rent_xaf': monthly_rent,
-                'rent_per_sqm': rent_per_sqm,
+                monthly_rent_xaf=monthly_rent,
                 
                 # Time
-                'year': year,
-                'month': month,
+                year=year,
+                month=month,
                 
                 # Metadata
-                'source_site': raw_listing.get('source_site', ''),
-                'listing_url': raw_listing.get('listing_url', ''),
-                
-                # Quality flags
-                'has_price': monthly_rent is not None,
-                'has_size': size_sqm is not None,
-                'has_neighborhood': bool(neighborhood),
-                'has_housing_type': bool(housing_type),
-                'has_date': year is not None,
-            }
+                source_site=raw_listing.get('source_site', ''),
+                listing_url=raw_listing.get('listing_url', ''),
+            )
             
             return normalized
             
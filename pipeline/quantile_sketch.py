@@ -0,0 +1,312 @@
+"""
+Mergeable quantile sketches for incremental aggregation
+
+Each (city, neighborhood, housing_type, year) group keeps a t-digest of its
+monthly rents (and one of its rent per sqm) plus the running count, mean
+and sum of squared deviations of its rents. Sketches from a new batch of listings merge into the stored
+state without touching earlier raw data.
+
+Accuracy against exact computation (pandas median / quantile):
+    - Groups holding at most `compression` values (100 by default) are kept
+      as singleton centroids, so median, p25 and p75 are exact and identical
+      to pandas' linear-interpolation quantiles.
+    - Larger groups are compressed with the k1 (arcsine) scale function.
+      A centroid covering quantile q spans at most
+      2 * pi * sqrt(q * (1 - q)) / compression of the group, so the rank
+      error of an estimate is bounded by about half of that: ~1.6% of the
+      group size for the median and ~1.4% for p25/p75 at compression 100.
+      Measured on lognormal rent samples merged in 12 monthly batches
+      (benchmarks/bench_quantile_sketch.py, worst of p25/p50/p75, max over
+      100 trials; 10 at 50,000 values):
+          values   rank error   value error
+             500     <= 1.0%     <= 1.0%
+           1,000     <= 0.6%     <= 0.9%
+           5,000     <= 0.4%     <= 0.9%
+          50,000     <= 0.1%     <= 0.14%
+      Mean rank errors are about half of these maxima.
+    - Count, mean and sample standard deviation are exact for the rows
+      that were merged, up to floating point rounding: each batch's mean
+      and sum of squared deviations (M2) are computed two-pass and merged
+      with Chan et al.'s pairwise update, which avoids the cancellation of
+      sum-of-squares minus squared sum at XAF rent magnitudes. The merged
+      rows are not those of a full recomputation, though: outliers are
+      removed within each batch before it is merged, while a full run
+      removes them over all rows at once. `rent_volatility_score` and
+      `data_confidence` can therefore differ from a full recomputation,
+      most for small groups and for batches whose rent levels differ.
+"""
+
+import json
+import math
+import os
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class TDigest:
+    """Merging t-digest over float values"""
+    
+    def __init__(self, compression: float = 100,
+                 means: Optional[np.ndarray] = None,
+                 weights: Optional[np.ndarray] = None,
+                 min_value: Optional[float] = None,
+                 max_value: Optional[float] = None):
+        self.compression = compression
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+        self.min_value = min_value
+        self.max_value = max_value
+    
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+    
+    def update(self, values) -> 'TDigest':
+        """Add raw values (NaN values are ignored)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        
+        return self.merge(TDigest(
+            self.compression,
+            means=values,
+            weights=np.ones(values.size),
+            min_value=float(values.min()),
+            max_value=float(values.max()),
+        ))
+    
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Merge another digest into this one"""
+        if other.means.size == 0:
+            return self
+        
+        self.means = np.concatenate([self.means, other.means])
+        self.weights = np.concatenate([self.weights, other.weights])
+        self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        
+        order = np.argsort(self.means, kind='stable')
+        self.means = self.means[order]
+        self.weights = self.weights[order]
+        
+        if self.means.size > self.compression:
+            self._compress()
+        
+        return self
+    
+    def _scale(self, q: float) -> float:
+        """k1 scale function: small centroids at the tails, large in the middle"""
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+    
+    def _compress(self):
+        """Greedily merge adjacent centroids while they fit in one k-unit"""
+        total = self.weights.sum()
+        means = self.means.tolist()
+        weights = self.weights.tolist()
+        
+        new_means = []
+        new_weights = []
+        cur_mean, cur_weight = means[0], weights[0]
+        weight_so_far = 0.0
+        k_lower = self._scale(0.0)
+        
+        for mean, weight in zip(means[1:], weights[1:]):
+            q_upper = (weight_so_far + cur_weight + weight) / total
+            if self._scale(q_upper) - k_lower <= 1:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                new_means.append(cur_mean)
+                new_weights.append(cur_weight)
+                weight_so_far += cur_weight
+                k_lower = self._scale(weight_so_far / total)
+                cur_mean, cur_weight = mean, weight
+        
+        new_means.append(cur_mean)
+        new_weights.append(cur_weight)
+        
+        self.means = np.array(new_means)
+        self.weights = np.array(new_weights)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th quantile
+        
+        Uses the same linear interpolation between order statistics as
+        pandas, treating each centroid as sitting at the centre of the
+        rank range it covers.
+        """
+        if self.means.size == 0:
+            return None
+        
+        # Exact path: nothing has been merged yet
+        if np.all(self.weights == 1):
+            if q == 0.5:
+                return float(np.median(self.means))
+            return float(np.quantile(self.means, q))
+        
+        n = self.weights.sum()
+        target = q * (n - 1)
+        centers = np.cumsum(self.weights) - self.weights + (self.weights - 1) / 2
+        xp = np.concatenate([[0.0], centers, [n - 1]])
+        fp = np.concatenate([[self.min_value], self.means, [self.max_value]])
+        return float(np.interp(target, xp, fp))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'min': self.min_value,
+            'max': self.max_value,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], compression: float = 100) -> 'TDigest':
+        return cls(
+            compression,
+            means=np.array(data.get('means', []), dtype=float),
+            weights=np.array(data.get('weights', []), dtype=float),
+            min_value=data.get('min'),
+            max_value=data.get('max'),
+        )
+
+
+class GroupSketch:
+    """Mergeable summary of one aggregation group"""
+    
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.count = 0
+        self.mean = float('nan')
+        self.m2 = 0.0
+        self.listing_count = 0
+        self.rent = TDigest(compression)
+        self.rent_per_sqm = TDigest(compression)
+    
+    def update(self, rents, rents_per_sqm, listing_count: int) -> 'GroupSketch':
+        """Add a batch of listings belonging to this group"""
+        rents = np.asarray(rents, dtype=float)
+        rents = rents[~np.isnan(rents)]
+        
+        if rents.size:
+            mean = float(rents.mean())
+            self._merge_moments(int(rents.size), mean, float(np.square(rents - mean).sum()))
+        self.listing_count += int(listing_count)
+        self.rent.update(rents)
+        self.rent_per_sqm.update(rents_per_sqm)
+        return self
+    
+    def merge(self, other: 'GroupSketch') -> 'GroupSketch':
+        if other.count:
+            self._merge_moments(other.count, other.mean, other.m2)
+        self.listing_count += other.listing_count
+        self.rent.merge(other.rent)
+        self.rent_per_sqm.merge(other.rent_per_sqm)
+        return self
+    
+    def _merge_moments(self, count: int, mean: float, m2: float):
+        """Combine (count, mean, M2) of another set of rents into this group's (Chan et al.)"""
+        if not self.count:
+            self.count, self.mean, self.m2 = count, mean, m2
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+    
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1, as pandas)"""
+        if self.count < 2:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'm2': self.m2,
+            'listing_count': self.listing_count,
+            'rent': self.rent.to_dict(),
+            'rent_per_sqm': self.rent_per_sqm.to_dict(),
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], compression: float = 100) -> 'GroupSketch':
+        sketch = cls(compression)
+        sketch.count = data.get('count', 0)
+        if 'm2' in data:
+            sketch.mean = data['mean'] if sketch.count else float('nan')
+            sketch.m2 = data['m2']
+        elif sketch.count:
+            # Version 1 state kept running sum and sum of squares
+            total, total_sq = data.get('sum', 0.0), data.get('sum_sq', 0.0)
+            sketch.mean = total / sketch.count
+            sketch.m2 = max(total_sq - total * total / sketch.count, 0.0)
+        sketch.listing_count = data.get('listing_count', 0)
+        sketch.rent = TDigest.from_dict(data.get('rent', {}), compression)
+        sketch.rent_per_sqm = TDigest.from_dict(data.get('rent_per_sqm', {}), compression)
+        return sketch
+
+
+GroupKey = Tuple[str, str, str, int]
+
+
+class SketchStore:
+    """Persisted group sketches keyed by (city, neighborhood, housing_type, year)"""
+    
+    # 2: count / mean / M2 moments instead of count / sum / sum of squares
+    VERSION = 2
+    
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.groups: Dict[GroupKey, GroupSketch] = {}
+        self.batches: List[str] = []
+    
+    def has_batch(self, batch_id: Optional[str]) -> bool:
+        return batch_id is not None and batch_id in self.batches
+    
+    def merge_group(self, key: GroupKey, sketch: GroupSketch):
+        if key in self.groups:
+            self.groups[key].merge(sketch)
+        else:
+            self.groups[key] = sketch
+    
+    @classmethod
+    def load(cls, filepath: str, compression: float = 100) -> 'SketchStore':
+        """Load state from disk, or return an empty store if none exists"""
+        if not os.path.exists(filepath):
+            return cls(compression)
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        store = cls(data.get('compression', compression))
+        store.batches = data.get('batches', [])
+        for group in data.get('groups', []):
+            city, neighborhood, housing_type, year = group['key']
+            store.groups[(city, neighborhood, housing_type, int(year))] = GroupSketch.from_dict(
+                group, store.compression
+            )
+        return store
+    
+    def save(self, filepath: str):
+        """Write state atomically"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        data = {
+            'version': self.VERSION,
+            'compression': self.compression,
+            'batches': self.batches,
+            'groups': [
+                {'key': list(key), **sketch.to_dict()}
+                for key, sketch in self.groups.items()
+            ],
+        }
+        
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, filepath)
@@ -0,0 +1,234 @@
+"""
+Streaming scrape -> normalize -> deduplicate pipeline
+
+Scraper threads (one per source, so each site still sees one request at a
+time) push raw listings into a bounded queue as pages are parsed.
+Normalizer threads consume it and pass (raw, normalized) pairs to a second
+bounded queue, drained by a single collector that deduplicates, flushes raw
+and normalized rows to storage in batches, and keeps the unique listings for
+aggregation. Normalization overlaps with network waits, and memory held
+between stages is bounded by the queue sizes and the flush batch size.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.logger import setup_logger
+from pipeline.normalizer import Normalizer
+from pipeline.deduplicator import Deduplicator
+
+
+# Marks the end of a stage's output on a queue
+_DONE = object()
+
+ScrapeJob = Tuple[str, Callable[[], Iterable[Dict[str, Any]]]]
+BatchSink = Callable[[List[Dict[str, Any]]], None]
+
+
+class StreamingPipeline:
+    """Bounded-queue producer/consumer pipeline from scrapers to unique listings"""
+    
+    def __init__(self, normalizer: Normalizer, deduplicator: Deduplicator,
+                 scrape_workers: int = 4, normalize_workers: int = 2,
+                 queue_size: int = 1000, flush_rows: int = 5000,
+                 progress_interval: float = 10.0,
+                 raw_sink: Optional[BatchSink] = None,
+                 normalized_sink: Optional[BatchSink] = None):
+        """
+        Args:
+            normalizer: Normalizer used by the worker threads
+            deduplicator: Deduplicator whose signatures define uniqueness
+            scrape_workers: Sources scraped concurrently
+            normalize_workers: Normalizer threads
+            queue_size: Capacity of each inter-stage queue (backpressure bound)
+            flush_rows: Rows buffered before each sink call
+            progress_interval: Seconds between progress log lines (0 disables)
+            raw_sink: Called with batches of raw listings
+            normalized_sink: Called with batches of normalized listings
+        """
+        self.logger = setup_logger("streaming")
+        self.normalizer = normalizer
+        self.deduplicator = deduplicator
+        self.scrape_workers = scrape_workers
+        self.normalize_workers = normalize_workers
+        self.queue_size = queue_size
+        self.flush_rows = flush_rows
+        self.progress_interval = progress_interval
+        self.raw_sink = raw_sink
+        self.normalized_sink = normalized_sink
+        
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.failed_sources: List[str] = []
+    
+    def run(self, jobs: List[ScrapeJob]) -> List[Dict[str, Any]]:
+        """
+        Run the scrape jobs through normalization and deduplication
+        
+        Args:
+            jobs: (label, factory) pairs; each factory returns an iterable of
+                raw listings (typically a generator over scraper.iter_listings)
+        
+        Returns:
+            Unique normalized listings, in arrival order
+        """
+        self.stats = {
+            'sources_total': len(jobs), 'sources_done': 0, 'scraped': 0,
+            'normalized': 0, 'rejected': 0, 'duplicates': 0, 'unique': 0,
+        }
+        self.failed_sources = []
+        
+        raw_queue = queue.Queue(maxsize=self.queue_size)
+        normalized_queue = queue.Queue(maxsize=self.queue_size)
+        unique: List[Dict[str, Any]] = []
+        errors: List[BaseException] = []
+        start = time.perf_counter()
+        
+        normalizers = [
+            threading.Thread(target=self._normalize_worker, args=(raw_queue, normalized_queue, errors),
+                             name=f"normalize-{i}", daemon=True)
+            for i in range(self.normalize_workers)
+        ]
+        collector = threading.Thread(target=self._collect, args=(normalized_queue, unique, errors),
+                                     name="collector", daemon=True)
+        for thread in normalizers + [collector]:
+            thread.start()
+        
+        stop_progress = threading.Event()
+        reporter = threading.Thread(target=self._report_progress,
+                                    args=(stop_progress, raw_queue, normalized_queue), daemon=True)
+        if self.progress_interval > 0:
+            reporter.start()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.scrape_workers, thread_name_prefix='scrape') as pool:
+                for label, factory in jobs:
+                    pool.submit(self._scrape_job, label, factory, raw_queue)
+        finally:
+            for _ in normalizers:
+                raw_queue.put(_DONE)
+            for thread in normalizers:
+                thread.join()
+            collector.join()
+            stop_progress.set()
+        
+        if errors:
+            raise errors[0]
+        
+        elapsed = time.perf_counter() - start
+        self.logger.info(
+            f"Streaming pipeline finished in {elapsed:.1f}s: {self._progress_line()}"
+        )
+        if self.failed_sources:
+            self.logger.warning(f"Failed sources: {', '.join(self.failed_sources)}")
+        return unique
+    
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+    
+    def _scrape_job(self, label: str, factory: Callable[[], Iterable[Dict[str, Any]]],
+                    raw_queue: queue.Queue):
+        """Producer: push one source's listings as they are scraped"""
+        count = 0
+        try:
+            for listing in factory():
+                raw_queue.put(listing)
+                count += 1
+                self._count('scraped')
+            self.logger.info(f"✓ {label}: {count} listings")
+        except Exception as e:
+            with self._lock:
+                self.failed_sources.append(label)
+            self.logger.error(f"✗ Failed to scrape {label} after {count} listings: {e}")
+        finally:
+            self._count('sources_done')
+    
+    def _normalize_worker(self, raw_queue: queue.Queue, normalized_queue: queue.Queue,
+                          errors: List[BaseException]):
+        """Consumer/producer: raw listing -> (raw, normalized or None)"""
+        try:
+            while True:
+                raw = raw_queue.get()
+                if raw is _DONE:
+                    break
+                normalized_queue.put((raw, self.normalizer.normalize_listing(raw)))
+        except BaseException as e:
+            errors.append(e)
+            # Keep draining so producers never block on a full queue
+            while raw_queue.get() is not _DONE:
+                pass
+        finally:
+            normalized_queue.put(_DONE)
+    
+    def _collect(self, normalized_queue: queue.Queue, unique: List[Dict[str, Any]],
+                 errors: List[BaseException]):
+        """Single consumer: sink raw/normalized rows, deduplicate, keep unique"""
+        raw_batch: List[Dict[str, Any]] = []
+        normalized_batch: List[Dict[str, Any]] = []
+        # Normalizer threads whose _DONE marker has been taken off the queue
+        finished = [0]
+        
+        def normalized_stream() -> Iterator[Dict[str, Any]]:
+            while finished[0] < self.normalize_workers:
+                item = normalized_queue.get()
+                if item is _DONE:
+                    finished[0] += 1
+                    continue
+                
+                raw, normalized = item
+                raw_batch.append(raw)
+                if normalized is None:
+                    self._count('rejected')
+                else:
+                    normalized_batch.append(normalized)
+                    self._count('normalized')
+                    yield normalized
+                
+                if len(raw_batch) >= self.flush_rows:
+                    self._flush(raw_batch, normalized_batch)
+        
+        try:
+            for listing in self.deduplicator.filter_stream(normalized_stream()):
+                unique.append(listing)
+                self._count('unique')
+            self._flush(raw_batch, normalized_batch)
+        except BaseException as e:
+            errors.append(e)
+            # Unblock normalizer threads still putting into the queue; markers
+            # already consumed (e.g. a sink failing in the final flush) are not waited for
+            while finished[0] < self.normalize_workers:
+                if normalized_queue.get() is _DONE:
+                    finished[0] += 1
+        
+        with self._lock:
+            self.stats['duplicates'] = self.stats['normalized'] - self.stats['unique']
+    
+    def _flush(self, raw_batch: List[Dict[str, Any]], normalized_batch: List[Dict[str, Any]]):
+        if self.raw_sink and raw_batch:
+            self.raw_sink(list(raw_batch))
+        if self.normalized_sink and normalized_batch:
+            self.normalized_sink(list(normalized_batch))
+        raw_batch.clear()
+        normalized_batch.clear()
+    
+    def _progress_line(self) -> str:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['duplicates'] = stats['normalized'] - stats['unique']
+        return (
+            f"sources {stats['sources_done']}/{stats['sources_total']} | "
+            f"scraped {stats['scraped']} | normalized {stats['normalized']} "
+            f"(rejected {stats['rejected']}) | unique {stats['unique']} "
+            f"(duplicates {stats['duplicates']})"
+        )
+    
+    def _report_progress(self, stop: threading.Event, raw_queue: queue.Queue,
+                         normalized_queue: queue.Queue):
+        while not stop.wait(self.progress_interval):
+            self.logger.info(
+                f"Progress: {self._progress_line()} | queued raw {raw_queue.qsize()}/{self.queue_size}, "
+                f"normalized {normalized_queue.qsize()}/{self.queue_size}"
+            )
@@ -11,6 +11,8 @@ from pipeline.normalizer import Normalizer
 from pipeline.deduplicator import Deduplicator
 from pipeline.aggregator import Aggregator
 from utils.logger import setup_logger
+from utils.config import load_cities
+from utils.records import json_default
 
 def quick_scrape():
     """Quick scrape of most productive sources"""
@@ -20,7 +22,7 @@ def quick_scrape():
     logger.info("QUICK SCRAPE - Top Sources Only")
     logger.info("="*80)
     
-    cities = ['douala', 'yaounde']
+    cities = load_cities()
     all_listings = []
     
     # Top sources that work
@@ -46,7 +48,7 @@ def quick_scrape():
     # Save raw data
     os.makedirs('data/raw', exist_ok=True)
     with open('data/raw/quick_scrape_raw.json', 'w', encoding='utf-8') as f:
-        json.dump(all_listings, f, indent=2, ensure_ascii=False)
+        json.dump(all_listings, f, indent=2, ensure_ascii=False, default=json_default)
     logger.info(f"Saved raw data: data/raw/quick_scrape_raw.json")
     
     # Normalize
@@ -1,23 +1,62 @@
 import requests
 import time
 import random
+from collections import Counter
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from bs4 import BeautifulSoup, Tag
+from typing import List, Dict, Any, Callable, Iterator, Optional
 from fake_useragent import UserAgent
-from utils.logger import setup_logger
+from utils.logger import setup_logger, LogSampler
+from utils.metrics import get_metrics
+from utils.fetch_trace import get_fetch_trace, url_pattern, to_ms
+from utils.records import RawListing
+from scrapers.http_timing import TracingAdapter, start_timing, stop_timing
+from storage.crawl_state import CrawlState, MISSING_STATUSES, content_hash
+from storage.card_cache import CardCache
+
+def card_signature(card: Tag) -> str:
+    """
+    Tags, attributes and text of a listing card, for the card cache
+    
+    Several times cheaper than serializing the card (str(card)). Every node
+    refers to its parent's position, so the tree shape is part of it.
+    """
+    positions = {id(card): 0}
+    parts = [f"<{card.name} {card.attrs}>"]
+    for node in card.descendants:
+        parent = positions[id(node.parent)]
+        if isinstance(node, Tag):
+            positions[id(node)] = len(parts)
+            parts.append(f"{parent}<{node.name} {node.attrs}>")
+        else:
+            parts.append(f"{parent}:{node}")
+    return '\n'.join(parts)
 
 class BaseScraper(ABC):
     """Abstract base class for all scrapers"""
     
-    def __init__(self, source_name: str, base_url: str, delay_range: tuple = (1, 2)):
+    def __init__(self, source_name: str, base_url: str, delay_range: tuple = (1, 2),
+                 page_state: Optional[CrawlState] = None, card_cache: Optional[CardCache] = None):
         self.source_name = source_name
         self.base_url = base_url
         self.delay_range = delay_range
         self.logger = setup_logger(f"scraper.{source_name}")
+        # Per-element extraction errors repeat across every card of a page
+        self.sampled_log = LogSampler(self.logger)
+        self.metrics = get_metrics()
+        self.trace = get_fetch_trace()
+        self._open_trace = None
+        self._trace_city = None
         self.ua = UserAgent()
         self.session = self._create_session()
         
+        # Delta mode: conditional requests and carried-forward pages
+        self.page_state = page_state
+        self.fetch_stats = Counter()
+        
+        # Cards seen in earlier runs are not extracted again
+        self.card_cache = card_cache
+        
     def _create_session(self):
         """Create requests session with headers"""
         session = requests.Session()
@@ -28,38 +67,274 @@ class BaseScraper(ABC):
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         })
+        if self.trace.enabled:
+            # New connections report DNS / connect / TLS time to the trace
+            adapter = TracingAdapter()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
         return session
     
-    def fetch_page(self, url: str, max_retries: int = 2) -> BeautifulSoup:
-        """Fetch and parse HTML page with retries"""
+    def fetch(self, url: str, headers: Dict[str, str] = None,
+              max_retries: int = 2) -> Optional[requests.Response]:
+        """
+        GET a URL with retries
+        
+        Returns:
+            The response for 2xx, 304 and 404/410 (not retried), or None
+            once retries are exhausted
+        """
+        source = self.source_name
+        self._finish_trace()
         for attempt in range(max_retries):
+            record = self._new_trace(url, attempt) if self.trace.enabled else None
+            start = None
             try:
                 self.logger.debug(f"Fetching: {url} (attempt {attempt + 1}/{max_retries})")
+                if attempt:
+                    self.metrics.inc('http_retries_total', source=source)
                 
                 # Random delay to be respectful
-                time.sleep(random.uniform(*self.delay_range))
+                delay = random.uniform(*self.delay_range)
+                self._sleep(delay)
                 
-                response = self.session.get(url, timeout=15)
-                response.raise_for_status()
+                timing = start_timing() if record is not None else None
+                start = time.perf_counter()
+                response = self.session.get(url, timeout=15, headers=headers)
+                elapsed = time.perf_counter() - start
+                self.metrics.observe('http_request_seconds', elapsed, source=source)
+                self.fetch_stats['requests'] += 1
+                # Content-Length is the on-the-wire (compressed) size when present
+                size = int(response.headers.get('Content-Length') or len(response.content))
+                self.fetch_stats['bytes'] += size
+                self.metrics.inc('http_requests_total', source=source, status=response.status_code)
+                self.metrics.observe('http_response_bytes', size, source=source)
+                if record is not None:
+                    self._trace_response(record, response, elapsed, size, delay, timing)
                 
-                return BeautifulSoup(response.content, 'lxml')
+                # Gone pages are returned on the first answer, not retried:
+                # the caller (crawl state) records them as missing
+                if response.status_code in MISSING_STATUSES or response.status_code == 304:
+                    return response
+                response.raise_for_status()
+                return response
                 
             except requests.RequestException as e:
                 self.logger.warning(f"Failed to fetch {url}: {e}")
+                self.metrics.inc('http_errors_total', source=source, error=type(e).__name__)
+                if record is not None:
+                    record['error'] = type(e).__name__
+                    if 'total_ms' not in record and start is not None:
+                        record['total_ms'] = to_ms(time.perf_counter() - start)
                 if attempt == max_retries - 1:
                     self.logger.error(f"Max retries reached for {url}")
+                    self.metrics.inc('http_gave_up_total', source=source)
+                    self._finish_trace(gave_up=True)
                     return None
-                time.sleep(5 * (attempt + 1))  # Exponential backoff
+                backoff = 5 * (attempt + 1)
+                self._sleep(backoff)  # Exponential backoff
+                if record is not None:
+                    record['backoff_ms'] = to_ms(backoff)
+                self._finish_trace()
+            finally:
+                stop_timing()
         
         return None
     
+    def _new_trace(self, url: str, attempt: int) -> Dict[str, Any]:
+        """Open the trace record of a request attempt (written by _finish_trace)"""
+        self._open_trace = {
+            'ts': round(time.time(), 3),
+            'source': self.source_name,
+            'city': self._trace_city,
+            'url': url,
+            'pattern': url_pattern(url, self.base_url, self._trace_city),
+            'attempt': attempt + 1,
+        }
+        return self._open_trace
+    
+    def _trace_response(self, record: Dict[str, Any], response: requests.Response, elapsed: float,
+                        size: int, delay: float, timing: Dict[str, Optional[float]]):
+        connection_ms = sum(value or 0 for value in timing.values())
+        record.update(timing)
+        record.update({
+            'reused': timing['dns_ms'] is None,
+            'sleep_ms': to_ms(delay),
+            # requests' elapsed ends once the headers are parsed; the body is read after
+            'ttfb_ms': round(to_ms(response.elapsed.total_seconds()) - connection_ms, 2),
+            'total_ms': to_ms(elapsed),
+            'status': response.status_code,
+            'bytes': size,
+        })
+    
+    def _finish_trace(self, **fields):
+        """Write the open trace record, if any"""
+        record, self._open_trace = self._open_trace, None
+        if record is not None:
+            record.update(fields)
+            self.trace.write(record)
+    
+    def _sleep(self, seconds: float):
+        """Politeness delay / backoff, counted separately from network time"""
+        time.sleep(seconds)
+        self.metrics.inc('scrape_sleep_seconds_total', seconds, source=self.source_name)
+    
+    def parse_html(self, content: bytes) -> BeautifulSoup:
+        """Parse a response body with lxml (into the tree make_document() builds)"""
+        start = time.perf_counter()
+        soup = self.make_document(content)
+        elapsed = time.perf_counter() - start
+        self.metrics.observe('html_parse_seconds', elapsed, source=self.source_name)
+        if self._open_trace is not None:
+            self._open_trace['parse_ms'] = to_ms(elapsed)
+        return soup
+    
+    def make_document(self, content: bytes) -> BeautifulSoup:
+        """Tree page extractors receive; override for extractors that need another one"""
+        return BeautifulSoup(content, 'lxml')
+    
+    def extract_page(self, parse: Callable[[BeautifulSoup, str, str], List[Dict[str, Any]]],
+                     soup: BeautifulSoup, city: str, url: str) -> List[Dict[str, Any]]:
+        """Run a page extractor, timing it and counting the listings it finds"""
+        start = time.perf_counter()
+        listings = parse(soup, city, url)
+        elapsed = time.perf_counter() - start
+        self.metrics.observe('extract_seconds', elapsed, source=self.source_name)
+        self.metrics.inc('listings_extracted_total', len(listings), source=self.source_name)
+        if self._open_trace is not None:
+            self._finish_trace(extract_ms=to_ms(elapsed), listings=len(listings))
+        return listings
+    
+    def extract_cards(self, cards: List[Any], city: str, url: str,
+                      extract: Callable[[Any], Optional[RawListing]],
+                      signature: Callable[[Any], str] = card_signature) -> List[RawListing]:
+        """
+        Listings of a page's cards, reusing the result of cards seen before
+        
+        Without card_cache every card is extracted. With it, each card is
+        fingerprinted and only cards the cache has not seen (new or edited
+        listings) are passed to extract; the others reuse the stored result.
+        
+        Args:
+            cards: Listing card nodes of the page
+            city: City the page belongs to
+            url: Page URL
+            extract: card -> listing, or None for a card that yields none
+            signature: card -> the text its fingerprint is computed from
+        """
+        cache = self.card_cache
+        if cache is None:
+            results = [extract(card) for card in cards]
+        else:
+            fingerprints = [cache.card_fingerprint(self.source_name, city, signature(card)) for card in cards]
+            known = cache.get_cards(fingerprints)
+            fresh = {}
+            results = []
+            for card, fp in zip(cards, fingerprints):
+                if fp in known:
+                    results.append(known[fp])
+                    continue
+                if fp not in fresh:
+                    fresh[fp] = extract(card)
+                results.append(fresh[fp])
+            cache.put_cards(fresh)
+            
+            reused = len(cards) - len(fresh)
+            self.fetch_stats['cards_reused'] += reused
+            self.fetch_stats['cards_extracted'] += len(fresh)
+            self.metrics.inc('cards_total', reused, source=self.source_name, result='reused')
+            self.metrics.inc('cards_total', len(fresh), source=self.source_name, result='extracted')
+        return [listing for listing in results if listing is not None]
+    
+    def fetch_page(self, url: str, max_retries: int = 2) -> BeautifulSoup:
+        """Fetch and parse HTML page with retries"""
+        response = self.fetch(url, max_retries=max_retries)
+        if response is None or not 200 <= response.status_code < 300:
+            return None
+        return self.parse_html(response.content)
+    
+    def iter_page_listings(self, url: str, city: str,
+                           parse: Callable[[BeautifulSoup, str, str], List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """
+        Listings of one search page, fetched only if it may have changed
+        
+        Without page_state this is fetch_page() + parse(). With it, the page
+        may be skipped (recent 404, or stable and recently checked) or
+        answered by a 304 / identical body; the page's last known listings
+        are then yielded instead of re-parsing.
+        
+        Args:
+            url: Search page URL
+            city: City the page belongs to
+            parse: (soup, city, url) -> listings
+        """
+        self._trace_city = city
+        try:
+            yield from self._iter_page_listings(url, city, parse)
+        finally:
+            # Pages that were not parsed (missing, not modified, failed)
+            self._finish_trace()
+    
+    def _iter_page_listings(self, url: str, city: str,
+                            parse: Callable[[BeautifulSoup, str, str], List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        state = self.page_state
+        if state is None:
+            soup = self.fetch_page(url)
+            if soup is not None:
+                yield from self.extract_page(parse, soup, city, url)
+            return
+        
+        page = state.get(self.source_name, city, url)
+        plan = state.plan(page)
+        if plan == CrawlState.SKIP_MISSING:
+            self.fetch_stats['pages_skipped_missing'] += 1
+            return
+        if plan == CrawlState.CARRY:
+            yield from self._carry_forward(page, 'pages_skipped_stable')
+            return
+        
+        response = self.fetch(url, headers=state.conditional_headers(page))
+        if response is None:
+            yield from self._carry_forward(page, 'pages_failed')
+            return
+        
+        status = response.status_code
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        if status in MISSING_STATUSES:
+            state.record_missing(self.source_name, city, url, status)
+            self.fetch_stats['pages_missing'] += 1
+            return
+        
+        body_hash = content_hash(response.content) if status != 304 else None
+        if status == 304 or (page and page['content_hash'] == body_hash):
+            state.record_unchanged(self.source_name, city, url, etag, last_modified)
+            yield from self._carry_forward(page, 'pages_not_modified', verified=True)
+            return
+        
+        listings = self.extract_page(parse, self.parse_html(response.content), city, url)
+        changed = state.record_fetched(self.source_name, city, url, body_hash, listings, etag, last_modified)
+        self.fetch_stats['pages_changed' if changed else 'pages_unchanged'] += 1
+        self.fetch_stats['listings_fresh'] += len(listings)
+        yield from listings
+    
+    def _carry_forward(self, page: Optional[Dict[str, Any]], outcome: str,
+                       verified: bool = False) -> List[Dict[str, Any]]:
+        listings = [RawListing.from_dict(listing)
+                    for listing in self.page_state.carried_listings(page, verified=verified)]
+        if self._open_trace is not None:
+            self._open_trace['carried'] = len(listings)
+        self.fetch_stats[outcome] += 1
+        self.fetch_stats['listings_carried'] += len(listings)
+        return listings
+    
     def extract_text(self, element, selector: str, default: str = "") -> str:
         """Safely extract text from BeautifulSoup element"""
         try:
             found = element.select_one(selector)
             return found.get_text(strip=True) if found else default
         except Exception as e:
-            self.logger.debug(f"Error extracting text with selector '{selector}': {e}")
+            self.sampled_log.debug('extract_text', "Error extracting text with selector '%s': %s", selector, e)
             return default
     
     def extract_attr(self, element, selector: str, attr: str, default: str = "") -> str:
@@ -68,7 +343,7 @@ class BaseScraper(ABC):
             found = element.select_one(selector)
             return found.get(attr, default) if found else default
         except Exception as e:
-            self.logger.debug(f"Error extracting attr '{attr}' with selector '{selector}': {e}")
+            self.sampled_log.debug('extract_attr', "Error extracting attr '%s' with selector '%s': %s", attr, selector, e)
             return default
     
     @abstractmethod
@@ -77,26 +352,35 @@ class BaseScraper(ABC):
         Scrape listings for a given city
         
         Args:
-            city: 'douala' or 'yaounde'
+            city: City slug from config/cities.yaml, e.g. 'douala'
             
         Returns:
             List of dictionaries with raw listing data
         """
         pass
     
-    def build_listing_dict(self, **kwargs) -> Dict[str, Any]:
-        """Build standardized listing dictionary"""
-        return {
-            'city': kwargs.get('city', ''),
-            'neighborhood': kwargs.get('neighborhood', ''),
-            'housing_type_raw': kwargs.get('housing_type_raw', ''),
-            'rent_price_raw': kwargs.get('rent_price_raw', ''),
-            'currency_raw': kwargs.get('currency_raw', 'XAF'),
-            'payment_frequency_raw': kwargs.get('payment_frequency_raw', ''),
-            'bedrooms_raw': kwargs.get('bedrooms_raw', ''),
-            'size_raw': kwargs.get('size_raw', ''),
-            'listing_date': kwargs.get('listing_date', ''),
-            'source_site': self.source_name,
-            'listing_url': kwargs.get('listing_url', ''),
-            'full_description': kwargs.get('full_description', ''),
-        }
+    def iter_listings(self, city: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield listings for a city as they are scraped
+        
+        Scrapers that can produce listings page by page should override this;
+        the default yields the result of scrape() once it completes.
+        """
+        yield from self.scrape(city)
+    
+    def build_listing_dict(self, **kwargs) -> RawListing:
+        """Build standardized listing record (reads like a dict; to_dict() for a plain one)"""
+        return RawListing(
+            city=kwargs.get('city', ''),
+            neighborhood=kwargs.get('neighborhood', ''),
+            housing_type_raw=kwargs.get('housing_type_raw', ''),
+            rent_price_raw=kwargs.get('rent_price_raw', ''),
+            currency_raw=kwargs.get('currency_raw', 'XAF'),
+            payment_frequency_raw=kwargs.get('payment_frequency_raw', ''),
+            bedrooms_raw=kwargs.get('bedrooms_raw', ''),
+            size_raw=kwargs.get('size_raw', ''),
+            listing_date=kwargs.get('listing_date', ''),
+            source_site=self.source_name,
+            listing_url=kwargs.get('listing_url', ''),
+            full_description=kwargs.get('full_description', ''),
+        )
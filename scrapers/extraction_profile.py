@@ -0,0 +1,256 @@
+import re
+import json
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup, UnicodeDammit
+
+
+# Profile field -> RawListing field it fills
+FIELD_TARGETS = {
+    'title': 'housing_type_raw',
+    'price': 'rent_price_raw',
+    'currency': 'currency_raw',
+    'payment_frequency': 'payment_frequency_raw',
+    'bedrooms': 'bedrooms_raw',
+    'size': 'size_raw',
+    'neighborhood': 'neighborhood',
+    'date': 'listing_date',
+    'url': 'listing_url',
+    'description': 'full_description',
+}
+
+SYNTAXES = ('css', 'xpath')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _regex_value(pattern: re.Pattern, text: str) -> str:
+    """First group of a match (the whole match if the pattern has none), '' if no match"""
+    match = pattern.search(text)
+    if not match:
+        return ''
+    return _clean(match.group(1) if pattern.groups else match.group(0))
+
+
+class FieldRule:
+    """
+    One compiled field: a selector (CSS or XPath) and/or a regex
+    
+    The selector picks the first matching node inside the card and takes its
+    text, or an attribute with attr. A regex is applied to that text, or to
+    the whole card text when the rule has no selector.
+    """
+    
+    __slots__ = ('name', 'select', 'attr', 'regex', 'xpath')
+    
+    def __init__(self, name: str, spec: Any, syntax: str):
+        if isinstance(spec, str):
+            spec = {'select': spec}
+        if not isinstance(spec, dict) or not set(spec) <= {'select', 'attr', 'regex'} or not spec:
+            raise ValueError(f"Field '{name}': expected a selector or a mapping of select / attr / regex")
+        self.name = name
+        self.xpath = syntax == 'xpath'
+        self.select = _compile_selector(spec['select'], syntax) if spec.get('select') else None
+        self.attr = spec.get('attr')
+        self.regex = re.compile(spec['regex'], re.IGNORECASE) if spec.get('regex') else None
+    
+    def value(self, card, card_text: str) -> str:
+        if self.select is None:
+            text = card_text
+        else:
+            node = _first(self.select, card, self.xpath)
+            if node is None:
+                return ''
+            text = _node_value(node, self.attr, self.xpath)
+        return _regex_value(self.regex, text) if self.regex is not None else text
+
+
+def _compile_selector(selector: str, syntax: str):
+    if syntax == 'xpath':
+        from lxml import etree
+        try:
+            return etree.XPath(selector)
+        except etree.XPathSyntaxError as e:
+            raise ValueError(f"Invalid XPath '{selector}': {e}") from e
+    try:
+        return soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"Invalid CSS selector '{selector}': {e}") from e
+
+
+def _first(select, node, xpath: bool):
+    if xpath:
+        found = select(node)
+        if not isinstance(found, list):
+            # string(), count() and the like
+            return str(found)
+        return found[0] if found else None
+    return select.select_one(node)
+
+
+def _node_value(node, attr: Optional[str], xpath: bool) -> str:
+    """Text or attribute of a matched node (XPath may also return strings, e.g. @href or text())"""
+    if isinstance(node, str):
+        return _clean(node)
+    if attr:
+        value = node.get(attr) or ''
+        return _clean(' '.join(value) if isinstance(value, list) else value)
+    if xpath:
+        return _clean(node.text_content())
+    return _clean(node.get_text(' '))
+
+
+class ExtractionProfile:
+    """
+    A source's declarative card extraction rules, compiled once
+    
+    Built from the source's `extraction:` block in sources.yaml:
+    
+        extraction:
+          syntax: css                      # or xpath (selectors are then XPath expressions)
+          container: "div.annonce-card"    # one node per listing card
+          fields:                          # title, price, currency, payment_frequency,
+            title: "h2.card-title"         # bedrooms, size, neighborhood, date, url, description
+            url: {select: "a.card-link", attr: href}
+            bedrooms: {regex: '([0-9]+) *chambres?'}  # regex alone: over the card text
+          price_regex: '[0-9][0-9 .]* *FCFA(?: */ *(?:mois|an))?'  # over the price text (or card text)
+          id_regex: '/annonce/([0-9]+)'    # cards whose URL has no id are skipped
+          url_template: "https://site.cm/annonce/{id}"
+          pagination: "a.next"             # link to the next results page
+          max_pages: 5
+    
+    Fields without a rule are left empty, except url (the page URL) and
+    description (the card text).
+    """
+    
+    def __init__(self, source_name: str, config: Dict[str, Any]):
+        """
+        Args:
+            source_name: Source the profile belongs to (for error messages)
+            config: The source's `extraction:` mapping
+        
+        Raises:
+            ValueError: Unknown keys or fields, or a selector or regex that does not compile
+        """
+        unknown = set(config) - {'syntax', 'container', 'fields', 'price_regex', 'id_regex',
+                                 'url_template', 'pagination', 'max_pages'}
+        if unknown:
+            raise ValueError(f"{source_name}: unknown extraction keys: {', '.join(sorted(unknown))}")
+        
+        self.source_name = source_name
+        self.syntax = config.get('syntax', 'css')
+        if self.syntax not in SYNTAXES:
+            raise ValueError(f"{source_name}: extraction syntax must be one of {SYNTAXES}")
+        if not config.get('container'):
+            raise ValueError(f"{source_name}: extraction profile needs a container selector")
+        
+        fields = config.get('fields') or {}
+        unknown = set(fields) - set(FIELD_TARGETS)
+        if unknown:
+            raise ValueError(f"{source_name}: unknown extraction fields: {', '.join(sorted(unknown))}")
+        
+        try:
+            self.container = _compile_selector(config['container'], self.syntax)
+            self.fields = [FieldRule(name, spec, self.syntax) for name, spec in fields.items()]
+            self.price_regex = re.compile(config['price_regex'], re.IGNORECASE) if config.get('price_regex') else None
+            self.id_regex = re.compile(config['id_regex']) if config.get('id_regex') else None
+            self.pagination = (FieldRule('pagination', {'select': config['pagination'], 'attr': 'href'}, self.syntax)
+                               if config.get('pagination') else None)
+        except (ValueError, re.error) as e:
+            raise ValueError(f"{source_name}: {e}") from e
+        
+        self.url_template = config.get('url_template')
+        self.max_pages = int(config.get('max_pages', 5))
+        # Card text is only needed by regex-only rules, price_regex and the default description
+        self._needs_text = (any(rule.select is None for rule in self.fields)
+                            or self.price_regex is not None
+                            or 'description' not in {rule.name for rule in self.fields})
+    
+    @property
+    def uses_xpath(self) -> bool:
+        return self.syntax == 'xpath'
+    
+    def document(self, content: bytes):
+        """Parsed page in the form the selectors run on (lxml tree for XPath, else BeautifulSoup)"""
+        if self.uses_xpath:
+            import lxml.html
+            # Same encoding detection as BeautifulSoup (lxml alone falls back to Latin-1)
+            return lxml.html.fromstring(UnicodeDammit(content, is_html=True).unicode_markup)
+        return BeautifulSoup(content, 'lxml')
+    
+    def cards(self, document) -> List[Any]:
+        if self.uses_xpath:
+            return [node for node in self.container(document) if not isinstance(node, str)]
+        return self.container.select(document)
+    
+    def extract(self, card, page_url: str) -> Optional[Dict[str, str]]:
+        """
+        RawListing fields of one card (build_listing_dict keyword arguments)
+        
+        Returns:
+            The fields, or None for a card id_regex rejects
+        """
+        card_text = self._card_text(card) if self._needs_text else ''
+        values = {FIELD_TARGETS[rule.name]: rule.value(card, card_text) for rule in self.fields}
+        
+        if self.price_regex is not None:
+            values['rent_price_raw'] = _regex_value(self.price_regex, values.get('rent_price_raw') or card_text)
+        
+        url = values.get('listing_url')
+        url = urljoin(page_url, url) if url else page_url
+        if self.id_regex is not None:
+            match = self.id_regex.search(url)
+            if not match:
+                return None
+            listing_id = match.group(1) if self.id_regex.groups else match.group(0)
+            if self.url_template:
+                url = self.url_template.format(id=listing_id)
+        values['listing_url'] = url
+        
+        if 'full_description' not in values:
+            values['full_description'] = card_text
+        if not values.get('currency_raw'):
+            # Leave the default (XAF) to build_listing_dict
+            values.pop('currency_raw', None)
+        return values
+    
+    def next_page(self, document, page_url: str) -> Optional[str]:
+        """Absolute URL of the next results page, if the profile paginates and the page links one"""
+        if self.pagination is None:
+            return None
+        href = self.pagination.value(document, '')
+        return urljoin(page_url, href) if href else None
+    
+    def signature(self, card) -> str:
+        """Text the card cache fingerprints a card by (its serialized markup for lxml trees)"""
+        if self.uses_xpath:
+            import lxml.html
+            return lxml.html.tostring(card, encoding='unicode')
+        from scrapers.base_scraper import card_signature
+        return card_signature(card)
+    
+    def _card_text(self, card) -> str:
+        if self.uses_xpath:
+            return _clean(card.text_content())
+        return _clean(card.get_text(' '))
+
+
+# source name -> (config JSON, compiled profile); sharded workers build a scraper per unit
+_compiled: Dict[str, Any] = {}
+
+
+def compile_profile(source_name: str, config: Optional[Dict[str, Any]]) -> Optional[ExtractionProfile]:
+    """Compiled profile of a source's `extraction:` block (None without one), cached per source"""
+    if not config:
+        return None
+    key = json.dumps(config, sort_keys=True)
+    cached = _compiled.get(source_name)
+    if cached is None or cached[0] != key:
+        cached = _compiled[source_name] = (key, ExtractionProfile(source_name, config))
+    return cached[1]
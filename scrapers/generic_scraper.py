@@ -1,45 +1,107 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Set
 from scrapers.base_scraper import BaseScraper
+from scrapers.extraction_profile import compile_profile
+from storage.crawl_state import CrawlState
+from storage.card_cache import CardCache
 
 class GenericPortalScraper(BaseScraper):
     """
     Generic scraper for property portals
-    Attempts to find common patterns across different sites
+    Attempts to find common patterns across different sites, unless the
+    source has an extraction profile (sources.yaml `extraction:`), whose
+    compiled selectors then replace the heuristics
     """
     
     RENTAL_KEYWORDS = ['location', 'louer', 'rent', 'rental', 'à louer']
     EXCLUDE_KEYWORDS = ['vente', 'sale', 'à vendre', 'terrain', 'land']
     
-    def __init__(self, source_name: str, base_url: str, city_paths: Dict[str, str] = None):
-        super().__init__(source_name, base_url)
+    def __init__(self, source_name: str, base_url: str, city_paths: Dict[str, str] = None,
+                 page_state: CrawlState = None, extraction: Dict[str, Any] = None,
+                 card_cache: CardCache = None):
+        super().__init__(source_name, base_url, page_state=page_state, card_cache=card_cache)
         self.city_paths = city_paths or {}
+        self.profile = compile_profile(source_name, extraction)
+        # Next results page found by the last profiled page parse
+        self._next_page = None
     
     def scrape(self, city: str) -> List[Dict[str, Any]]:
         """Scrape listings for a given city"""
-        self.logger.info(f"Starting scrape for {city} on {self.source_name}")
+        listings = list(self.iter_listings(city))
         
-        listings = []
+        self.logger.info(f"Scraped {len(listings)} rental listings for {city} from {self.source_name}")
+        return listings
+    
+    def iter_listings(self, city: str) -> Iterator[Dict[str, Any]]:
+        """Yield rental listings for a city page by page, as each page is parsed"""
+        self.logger.info(f"Starting scrape for {city} on {self.source_name}")
         
         # Build search URLs
         search_urls = self._build_search_urls(city)
         
+        if self.profile is None:
+            for url in search_urls:
+                yield from self.iter_page_listings(url, city, self._parse_page)
+            return
+        
+        visited = set()
         for url in search_urls:
-            soup = self.fetch_page(url)
-            if not soup:
-                continue
-            
-            # Try to find listing containers using common patterns
-            listing_elements = self._find_listing_elements(soup)
-            
-            self.logger.info(f"Found {len(listing_elements)} potential listings on {url}")
-            
-            for element in listing_elements:
-                listing = self._extract_listing_data(element, city, url)
-                if listing and self._is_rental(listing):
-                    listings.append(listing)
+            yield from self._iter_paginated(url, city, visited)
+        if self.page_state is not None and self.profile.pagination is not None:
+            # Pages carried forward were not parsed, so their next links were not
+            # followed this run: revisit every results page seen before
+            for url in self.page_state.page_urls(self.source_name, city):
+                yield from self._iter_paginated(url, city, visited)
+    
+    def _iter_paginated(self, url: Optional[str], city: str, visited: Set[str]) -> Iterator[Dict[str, Any]]:
+        """Listings of a results page and the pages its pagination links lead to"""
+        for _ in range(self.profile.max_pages):
+            if not url or url in visited:
+                return
+            visited.add(url)
+            self._next_page = None
+            yield from self.iter_page_listings(url, city, self._parse_page)
+            url = self._next_page
+    
+    def make_document(self, content: bytes):
+        if self.profile is not None:
+            return self.profile.document(content)
+        return super().make_document(content)
+    
+    def _parse_page(self, soup, city: str, url: str) -> List[Dict[str, Any]]:
+        """Rental listings on one search page"""
+        if self.profile is not None:
+            return self._parse_profiled_page(soup, city, url)
         
-        self.logger.info(f"Scraped {len(listings)} rental listings for {city} from {self.source_name}")
+        # Try to find listing containers using common patterns
+        listing_elements = self._find_listing_elements(soup)
+        
+        self.logger.info(f"Found {len(listing_elements)} potential listings on {url}")
+        
+        def extract(element):
+            listing = self._extract_listing_data(element, city, url)
+            return listing if listing and self._is_rental(listing) else None
+        
+        return self.extract_cards(listing_elements, city, url, extract)
+    
+    def _parse_profiled_page(self, document, city: str, url: str) -> List[Dict[str, Any]]:
+        """Rental listings on one search page, extracted with the source's profile"""
+        cards = self.profile.cards(document)
+        self.logger.info(f"Found {len(cards)} listing cards on {url}")
+        
+        def extract(card):
+            try:
+                fields = self.profile.extract(card, url)
+            except Exception as e:
+                self.sampled_log.debug('extract_listing', "Error extracting listing: %s", e)
+                return None
+            if fields is None:
+                return None
+            listing = self.build_listing_dict(city=city, **fields)
+            return listing if self._is_rental(listing) else None
+        
+        listings = self.extract_cards(cards, city, url, extract, signature=self.profile.signature)
+        self._next_page = self.profile.next_page(document, url)
         return listings
     
     def _build_search_urls(self, city: str) -> List[str]:
@@ -112,7 +174,7 @@ class GenericPortalScraper(BaseScraper):
                 full_description=description,
             )
         except Exception as e:
-            self.logger.debug(f"Error extracting listing: {e}")
+            self.sampled_log.debug('extract_listing', "Error extracting listing: %s", e)
             return None
     
     def _extract_title(self, element) -> str:
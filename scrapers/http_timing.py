@@ -0,0 +1,94 @@
+import time
+import socket
+import threading
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from utils.fetch_trace import to_ms
+
+# Phase timings of the request being sent on this thread (see TracingAdapter)
+_local = threading.local()
+
+
+def start_timing() -> Dict[str, Optional[float]]:
+    """Begin collecting connection phase timings (ms) for this thread's next request"""
+    _local.timing = {'dns_ms': None, 'connect_ms': None, 'tls_ms': None}
+    return _local.timing
+
+
+def stop_timing():
+    _local.timing = None
+
+
+def _timing() -> Optional[Dict[str, Optional[float]]]:
+    return getattr(_local, 'timing', None)
+
+
+class _TimedConnectionMixin:
+    """Splits urllib3's connection setup into DNS lookup and TCP connect"""
+    
+    def _new_conn(self):
+        timing = _timing()
+        if timing is None:
+            return super()._new_conn()
+        
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host.strip('[]'), self.port,
+                                           allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 raise its usual NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        timing['dns_ms'] = to_ms(resolved - start)
+        
+        # Connect to the resolved addresses in order, as urllib3 would
+        dns_host = self._dns_host
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+            timing['connect_ms'] = to_ms(time.perf_counter() - resolved)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    
+    def connect(self):
+        timing = _timing()
+        start = time.perf_counter()
+        super().connect()
+        if timing is not None and timing['connect_ms'] is not None:
+            elapsed = to_ms(time.perf_counter() - start)
+            timing['tls_ms'] = round(elapsed - timing['dns_ms'] - timing['connect_ms'], 2)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TracingAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report DNS, connect and TLS time"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
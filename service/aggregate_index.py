@@ -0,0 +1,230 @@
+"""
+In-memory indexed view over Aggregator outputs
+
+Rows are loaded once from outputs/rental_intelligence.csv (or the
+hierarchical JSON) and indexed by city, neighborhood, housing type and year.
+Equality filters intersect per-dimension posting sets (smallest first) and
+year ranges use a sorted key list with bisect, so lookups never walk the full
+dataset.
+"""
+
+import os
+import csv
+import json
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Callable, Hashable
+from utils.logger import setup_logger
+
+
+FLOAT_FIELDS = [
+    'median_monthly_rent_xaf', 'p25_monthly_rent_xaf', 'p75_monthly_rent_xaf',
+    'median_ci_low_xaf', 'median_ci_high_xaf', 'median_rent_per_sqm', 'rent_volatility_score',
+]
+DIMENSIONS = ['city', 'neighborhood', 'housing_type']
+
+
+def _parse_float(value) -> Optional[float]:
+    if value in (None, ''):
+        return None
+    return float(value)
+
+
+def load_rows(filepath: str) -> List[Dict[str, Any]]:
+    """Load aggregate rows from the CSV or hierarchical JSON export"""
+    rows = []
+    
+    if filepath.endswith('.json'):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            tree = json.load(f)
+        for city, neighborhoods in tree.items():
+            for neighborhood, housing_types in neighborhoods.items():
+                for housing_type, years in housing_types.items():
+                    for year, metrics in years.items():
+                        rows.append({
+                            'city': city,
+                            'neighborhood': neighborhood,
+                            'housing_type': housing_type,
+                            'year': int(year),
+                            **metrics,
+                        })
+        return rows
+    
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f):
+            row = {
+                'city': record['city'],
+                'neighborhood': record['neighborhood'],
+                'housing_type': record['housing_type'],
+                'year': int(float(record['year'])),
+                'listing_count': int(float(record['listing_count'])),
+                'data_confidence': record['data_confidence'],
+            }
+            for field in FLOAT_FIELDS:
+                row[field] = _parse_float(record.get(field))
+            rows.append(row)
+    return rows
+
+
+class AggregateIndex:
+    """Immutable, indexed snapshot of one aggregate dataset"""
+    
+    def __init__(self, rows: List[Dict[str, Any]], source: str = '', cache_size: int = 1024,
+                 generation: int = 1):
+        self.rows = rows
+        self.source = source
+        self.generation = generation
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.version = f"{os.path.basename(source)}#{generation}@{self.loaded_at}"
+        
+        self.postings: Dict[str, Dict[str, frozenset]] = {}
+        for dimension in DIMENSIONS:
+            buckets: Dict[str, set] = {}
+            for i, row in enumerate(rows):
+                buckets.setdefault(row[dimension], set()).add(i)
+            self.postings[dimension] = {value: frozenset(ids) for value, ids in buckets.items()}
+        
+        by_year: Dict[int, set] = {}
+        for i, row in enumerate(rows):
+            by_year.setdefault(row['year'], set()).add(i)
+        self.years = sorted(by_year)
+        self.year_postings = [frozenset(by_year[year]) for year in self.years]
+        
+        # Response cache lives with the snapshot, so a hot swap invalidates it
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    @classmethod
+    def from_file(cls, filepath: str, cache_size: int = 1024, generation: int = 1) -> 'AggregateIndex':
+        return cls(load_rows(filepath), source=filepath, cache_size=cache_size, generation=generation)
+    
+    def values(self, dimension: str) -> List[str]:
+        """Distinct values of a dimension"""
+        return sorted(self.postings[dimension])
+    
+    def query(self, city: Optional[Sequence[str]] = None,
+              neighborhood: Optional[Sequence[str]] = None,
+              housing_type: Optional[Sequence[str]] = None,
+              year_min: Optional[int] = None, year_max: Optional[int] = None,
+              min_listings: Optional[int] = None,
+              confidence: Optional[Sequence[str]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Filter rows; each dimension accepts several values
+        
+        Returns:
+            Matching rows, in dataset order
+        """
+        return self._execute(city, neighborhood, housing_type, year_min, year_max,
+                             min_listings, confidence, limit)
+    
+    def cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached response for key, computing and storing it on a miss"""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+        
+        result = compute()
+        
+        with self._cache_lock:
+            self.cache_misses += 1
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+    
+    def _execute(self, city, neighborhood, housing_type, year_min, year_max,
+                 min_listings, confidence, limit) -> List[Dict[str, Any]]:
+        candidates = []
+        for dimension, values in (('city', city), ('neighborhood', neighborhood),
+                                  ('housing_type', housing_type)):
+            if values:
+                postings = self.postings[dimension]
+                candidates.append(frozenset().union(*(postings.get(v, frozenset()) for v in values)))
+        
+        if year_min is not None or year_max is not None:
+            lo = bisect.bisect_left(self.years, year_min) if year_min is not None else 0
+            hi = bisect.bisect_right(self.years, year_max) if year_max is not None else len(self.years)
+            candidates.append(frozenset().union(*self.year_postings[lo:hi]))
+        
+        if candidates:
+            candidates.sort(key=len)
+            ids = candidates[0].intersection(*candidates[1:])
+            ids = sorted(ids)
+        else:
+            ids = range(len(self.rows))
+        
+        result = []
+        for i in ids:
+            row = self.rows[i]
+            if min_listings is not None and row['listing_count'] < min_listings:
+                continue
+            if confidence and row['data_confidence'] not in confidence:
+                continue
+            result.append(row)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+class DatasetHolder:
+    """Holds the live AggregateIndex and swaps it atomically on reload"""
+    
+    def __init__(self, filepath: str, cache_size: int = 1024):
+        self.filepath = filepath
+        self.cache_size = cache_size
+        self.logger = setup_logger("query_service")
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._pending_mtime = None
+        self.current: Optional[AggregateIndex] = None
+        self.reload()
+    
+    def reload(self) -> AggregateIndex:
+        """Build a new index off to the side, then publish it with one assignment"""
+        with self._lock:
+            mtime = os.path.getmtime(self.filepath)
+            generation = self.current.generation + 1 if self.current else 1
+            index = AggregateIndex.from_file(self.filepath, self.cache_size, generation)
+            self.current = index
+            self._mtime = mtime
+            self.logger.info(f"Loaded {len(index.rows)} aggregate rows from {self.filepath}")
+            return index
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Reload when the export file was rewritten (e.g. a pipeline run finished)
+        
+        A new mtime must be seen on two consecutive polls before reloading, so
+        a file that is still being written is not picked up half way. If the
+        new file fails to load, the previous snapshot keeps serving.
+        """
+        try:
+            mtime = os.path.getmtime(self.filepath)
+        except OSError:
+            return False
+        
+        if mtime == self._mtime:
+            self._pending_mtime = None
+            return False
+        if mtime != self._pending_mtime:
+            self._pending_mtime = mtime
+            return False
+        
+        try:
+            self.reload()
+        except Exception as e:
+            self.logger.error(f"Reload of {self.filepath} failed, keeping previous dataset: {e}")
+            self._mtime = mtime
+            return False
+        finally:
+            self._pending_mtime = None
+        return True
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local read-only HTTP/JSON query service over the aggregate outputs
+
+Endpoints:
+    GET  /health                 liveness + dataset version
+    GET  /meta                   dataset version, row count, dimension values, cache stats
+    GET  /query?city=douala&neighborhood=akwa,bonapriso&housing_type=studio
+               &year_min=2024&year_max=2026&min_listings=5&confidence=high,medium&limit=100
+    POST /reload                 reload the dataset now (500 and the old dataset kept if it fails)
+
+The dataset is reloaded automatically when the export file changes (checked
+every --poll seconds). Queries always run against one immutable snapshot;
+a reload builds the new index first and swaps it in with a single reference
+assignment, which also drops the response cache of the old snapshot.
+
+Usage:
+    python -m service.query_server [--data outputs/rental_intelligence.csv] [--port 8765]
+"""
+
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, List, Optional
+from service.aggregate_index import DatasetHolder, DIMENSIONS
+from utils.logger import setup_logger
+
+
+def _list_param(params: Dict[str, List[str]], name: str) -> Optional[List[str]]:
+    """'a,b' or repeated ?name=a&name=b -> ['a', 'b']"""
+    if name not in params:
+        return None
+    values = []
+    for raw in params[name]:
+        values.extend(value.strip() for value in raw.split(','))
+    return values
+
+
+def _int_param(params: Dict[str, List[str]], name: str) -> Optional[int]:
+    if name not in params:
+        return None
+    return int(params[name][-1])
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the live dataset held by the server"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, keep-alive
+    # clients stall on delayed ACKs (~40 ms per request)
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        index = self.server.holder.current
+        
+        if url.path == '/health':
+            self._send(200, {'status': 'ok', 'version': index.version})
+        elif url.path == '/meta':
+            self._send(200, {
+                'version': index.version,
+                'source': index.source,
+                'loaded_at': index.loaded_at,
+                'rows': len(index.rows),
+                'years': index.years,
+                'dimensions': {dimension: index.values(dimension) for dimension in DIMENSIONS},
+                'cache': {'hits': index.cache_hits, 'misses': index.cache_misses},
+            })
+        elif url.path == '/query':
+            self._query(index, url.query)
+        else:
+            self._send(404, {'error': f"Unknown endpoint {url.path}"})
+    
+    def do_POST(self):
+        if urlsplit(self.path).path == '/reload':
+            holder = self.server.holder
+            try:
+                index = holder.reload()
+            except Exception as e:
+                # Missing, corrupt or half-written export: the previous index keeps serving
+                holder.logger.error(f"Reload of {holder.filepath} failed, keeping previous dataset: {e}")
+                self._send(500, {'error': f"Reload failed: {e}", 'version': holder.current.version})
+                return
+            self._send(200, {'status': 'reloaded', 'version': index.version, 'rows': len(index.rows)})
+        else:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+    
+    def _query(self, index, query_string: str):
+        params = parse_qs(query_string, keep_blank_values=True)
+        try:
+            filters = {
+                'city': _list_param(params, 'city'),
+                'neighborhood': _list_param(params, 'neighborhood'),
+                'housing_type': _list_param(params, 'housing_type'),
+                'year_min': _int_param(params, 'year_min'),
+                'year_max': _int_param(params, 'year_max'),
+                'min_listings': _int_param(params, 'min_listings'),
+                'confidence': _list_param(params, 'confidence'),
+                'limit': _int_param(params, 'limit'),
+            }
+            if 'year' in params:
+                filters['year_min'] = filters['year_max'] = _int_param(params, 'year')
+        except ValueError as e:
+            self._send(400, {'error': f"Invalid parameter: {e}"})
+            return
+        
+        cache_key = tuple(sorted((name, tuple(values)) for name, values in params.items()))
+        
+        def compute() -> bytes:
+            rows = index.query(**filters)
+            payload = {'version': index.version, 'count': len(rows), 'results': rows}
+            return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        
+        self._send_bytes(200, index.cached(cache_key, compute))
+    
+    def _send(self, status: int, payload: dict):
+        self._send_bytes(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+    
+    def _send_bytes(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the cost of cached lookups
+        pass
+
+
+class QueryServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a hot-swappable dataset"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, holder: DatasetHolder, poll_interval: float = 5.0):
+        super().__init__(address, QueryRequestHandler)
+        self.holder = holder
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name='dataset-watcher', daemon=True)
+    
+    def start_watcher(self):
+        if self.poll_interval > 0:
+            self._watcher.start()
+    
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.holder.reload_if_changed()
+    
+    def server_close(self):
+        self._stop.set()
+        super().server_close()
+
+
+def create_server(data_path: str, host: str = '127.0.0.1', port: int = 8765,
+                  poll_interval: float = 5.0, cache_size: int = 1024) -> QueryServer:
+    """Load the dataset and build (but do not start) the server"""
+    holder = DatasetHolder(data_path, cache_size=cache_size)
+    server = QueryServer((host, port), holder, poll_interval=poll_interval)
+    server.start_watcher()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve aggregate rent data over local HTTP/JSON")
+    parser.add_argument('--data', default='outputs/rental_intelligence.csv',
+                        help="Aggregator CSV or hierarchical JSON export")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--poll', type=float, default=5.0,
+                        help="Seconds between checks for a new export (0 disables)")
+    parser.add_argument('--cache-size', type=int, default=1024)
+    args = parser.parse_args()
+    
+    logger = setup_logger("query_service")
+    server = create_server(args.data, args.host, args.port, args.poll, args.cache_size)
+    logger.info(f"Serving {args.data} on http://{args.host}:{args.port}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Sharded multi-city runner
+
+Splits the scrape into (city, source) units, queues them in a SQLite work
+queue and runs them on several worker processes. Each unit's raw listings
+are written to a shard file; once every unit is done (or has failed
+max_attempts times) the shards are merged and run through normalization,
+deduplication, aggregation and export like a normal run.
+
+Workers lease units and renew the lease while scraping. If a worker process
+dies, the supervisor releases its units at once and starts a replacement;
+workers on other machines are covered by lease expiry. At most one unit per
+source is leased at a time, so each site still sees one client.
+
+Usage:
+    python sharded_runner.py run [--workers 4] [--run-id ID]
+    python sharded_runner.py worker --run-id ID      # extra workers, e.g. on another machine
+    python sharded_runner.py status --run-id ID
+    python sharded_runner.py merge --run-id ID
+
+For several machines, point --queue and --shard-dir at a shared directory.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+from typing import List, Dict, Any
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.logger import setup_logger
+from utils.config import load_cities, load_sources, source_cities
+from utils.records import json_default
+from storage.work_queue import WorkQueue, DONE, FAILED
+from scrapers.generic_scraper import GenericPortalScraper
+
+
+DEFAULT_QUEUE = "data/queue/work_queue.sqlite"
+DEFAULT_SHARD_DIR = "data/shards"
+
+
+def slugify(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def plan_units(cities: List[str], sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One unit per (city, source); consecutive units belong to different sources"""
+    units = []
+    for city in cities:
+        for source in sources:
+            if city not in source_cities(source, cities):
+                continue
+            units.append({
+                'unit_id': f"{city}__{slugify(source['name'])}",
+                'payload': {'city': city, 'source': source},
+                'concurrency_key': source['name'],
+            })
+    return units
+
+
+class ShardWorker:
+    """Leases units, scrapes them and writes one shard file per unit"""
+    
+    def __init__(self, run_id: str, worker_id: str, queue_path: str = DEFAULT_QUEUE,
+                 shard_dir: str = DEFAULT_SHARD_DIR, lease_seconds: float = 600,
+                 max_attempts: int = 3, poll_interval: float = 2.0):
+        self.logger = setup_logger("shard_worker")
+        self.run_id = run_id
+        self.worker_id = worker_id
+        self.queue_path = queue_path
+        self.shard_dir = os.path.join(shard_dir, run_id)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.queue = WorkQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+        os.makedirs(self.shard_dir, exist_ok=True)
+    
+    def run(self) -> int:
+        """
+        Process units until the run is finished
+        
+        Returns:
+            Number of units completed by this worker
+        """
+        completed = 0
+        while True:
+            unit = self.queue.lease(self.run_id, self.worker_id)
+            if unit is None:
+                if self.queue.is_finished(self.run_id):
+                    break
+                # Remaining units are leased by others (or blocked on their source)
+                time.sleep(self.poll_interval)
+                continue
+            
+            if self._process(unit):
+                completed += 1
+        
+        self.queue.close()
+        self.logger.info(f"Worker {self.worker_id} finished: {completed} units")
+        return completed
+    
+    def _process(self, unit: Dict[str, Any]) -> bool:
+        unit_id = unit['unit_id']
+        city = unit['payload']['city']
+        source = unit['payload']['source']
+        self.logger.info(f"[{self.worker_id}] {unit_id} (attempt {unit['attempts']})")
+        
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(unit_id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            scraper = GenericPortalScraper(
+                source_name=source['name'],
+                base_url=source['url'],
+                city_paths=source.get('search_params', {}),
+                extraction=source.get('extraction'),
+            )
+            listings = scraper.scrape(city)
+            path = self._write_shard(unit_id, listings)
+        except Exception as e:
+            self.logger.error(f"✗ {unit_id}: {e}")
+            self.queue.fail(self.run_id, unit_id, self.worker_id, str(e))
+            return False
+        finally:
+            stop.set()
+            heartbeat.join()
+        
+        result = {'path': os.path.relpath(path, self.shard_dir), 'listings': len(listings),
+                  'requests': scraper.fetch_stats['requests'], 'bytes': scraper.fetch_stats['bytes']}
+        if not self.queue.complete(self.run_id, unit_id, self.worker_id, result):
+            self.logger.warning(f"Lost the lease on {unit_id}; another worker's shard will be used")
+            return False
+        
+        self.logger.info(f"✓ {unit_id}: {len(listings)} listings")
+        return True
+    
+    def _heartbeat(self, unit_id: str, stop: threading.Event):
+        """Renew the lease every third of its length while the unit runs"""
+        queue = WorkQueue(self.queue_path, lease_seconds=self.lease_seconds)
+        try:
+            while not stop.wait(self.lease_seconds / 3):
+                if not queue.heartbeat(self.run_id, unit_id, self.worker_id):
+                    self.logger.warning(f"Lease on {unit_id} was lost")
+                    return
+        finally:
+            queue.close()
+    
+    def _write_shard(self, unit_id: str, listings: List[Dict[str, Any]]) -> str:
+        """Write atomically so a crash never leaves a partial shard"""
+        path = os.path.join(self.shard_dir, f"{unit_id}.json")
+        tmp_path = f"{path}.{self.worker_id}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(listings, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp_path, path)
+        return path
+
+
+def _worker_process(run_id: str, worker_id: str, queue_path: str, shard_dir: str,
+                    lease_seconds: float, max_attempts: int):
+    """multiprocessing entry point"""
+    ShardWorker(run_id, worker_id, queue_path, shard_dir, lease_seconds, max_attempts).run()
+
+
+class ShardedRunner:
+    """Plans a run, supervises local worker processes and merges the shards"""
+    
+    def __init__(self, queue_path: str = DEFAULT_QUEUE, shard_dir: str = DEFAULT_SHARD_DIR,
+                 workers: int = 4, lease_seconds: float = 600, max_attempts: int = 3,
+                 max_restarts: int = 10):
+        """
+        Args:
+            queue_path: Work queue database
+            shard_dir: Directory for per-unit shard files
+            workers: Local worker processes
+            lease_seconds: Lease length (renewed by heartbeats)
+            max_attempts: Attempts per unit before it is given up
+            max_restarts: Replacement workers started after crashes
+        """
+        self.logger = setup_logger("sharded_runner")
+        self.queue_path = queue_path
+        self.shard_dir = shard_dir
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_restarts = max_restarts
+        self.queue = WorkQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    
+    def plan(self, run_id: str, cities: List[str] = None) -> int:
+        """Queue (city, source) units for a run (idempotent)"""
+        cities = cities or load_cities()
+        units = plan_units(cities, load_sources())
+        added = self.queue.enqueue(run_id, units)
+        self.logger.info(
+            f"Run {run_id}: {len(units)} units ({len(cities)} cities), {added} newly queued"
+        )
+        return added
+    
+    def supervise(self, run_id: str):
+        """Run local workers until every unit is done or failed"""
+        host = socket.gethostname()
+        processes = {}
+        restarts = 0
+        
+        def spawn(index: int, generation: int):
+            worker_id = f"{host}-w{index}.{generation}"
+            process = multiprocessing.Process(
+                target=_worker_process,
+                args=(run_id, worker_id, self.queue_path, self.shard_dir,
+                      self.lease_seconds, self.max_attempts),
+                name=worker_id,
+            )
+            process.start()
+            processes[index] = (worker_id, generation, process)
+        
+        for index in range(self.workers):
+            spawn(index, 0)
+        
+        while processes:
+            time.sleep(1)
+            for index, (worker_id, generation, process) in list(processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del processes[index]
+                
+                if process.exitcode != 0:
+                    released = self.queue.release_worker(run_id, worker_id, f"exit code {process.exitcode}")
+                    self.logger.warning(
+                        f"Worker {worker_id} died (exit code {process.exitcode}); released {released} unit(s)"
+                    )
+                    if restarts < self.max_restarts and not self.queue.is_finished(run_id):
+                        restarts += 1
+                        spawn(index, generation + 1)
+            
+            counts = self.queue.counts(run_id)
+            self.logger.debug(f"Run {run_id}: {counts}")
+        
+        counts = self.queue.counts(run_id)
+        self.logger.info(f"Run {run_id} workers finished: {counts}")
+        if not self.queue.is_finished(run_id):
+            self.logger.warning(
+                f"Restart limit reached with units left; remaining workers can finish them "
+                f"with: python sharded_runner.py worker --run-id {run_id}"
+            )
+    
+    def merge(self, run_id: str) -> Dict[str, Any]:
+        """
+        Concatenate completed shards and run normalize -> export on them
+        
+        Returns:
+            Merge summary (units done/failed, listings, bytes)
+        """
+        # Imported here so worker processes never load the pandas pipeline
+        from main import StratAxisRentScraper
+        
+        done = self.queue.units(run_id, DONE)
+        failed = self.queue.units(run_id, FAILED)
+        for unit in failed:
+            self.logger.warning(f"Unit {unit['unit_id']} failed after {unit['attempts']} attempts: {unit['error']}")
+        
+        raw_listings = []
+        for unit in done:
+            path = os.path.join(self.shard_dir, run_id, unit['result']['path'])
+            with open(path, 'r', encoding='utf-8') as f:
+                raw_listings.extend(json.load(f))
+        
+        summary = {
+            'run_id': run_id,
+            'units_done': len(done),
+            'units_failed': [unit['unit_id'] for unit in failed],
+            'raw_listings': len(raw_listings),
+            'requests': sum(unit['result'].get('requests', 0) for unit in done),
+            'bytes': sum(unit['result'].get('bytes', 0) for unit in done),
+        }
+        self.logger.info(
+            f"Merging run {run_id}: {len(raw_listings)} listings from {len(done)} shards "
+            f"({len(failed)} failed units)"
+        )
+        
+        StratAxisRentScraper().run(raw_listings=raw_listings, raw_label=f"shards:{run_id}")
+        
+        with open(os.path.join(self.shard_dir, run_id, 'merge_summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Sharded multi-city scrape runner")
+    parser.add_argument('command', choices=['run', 'worker', 'status', 'merge'])
+    parser.add_argument('--run-id', help="Run identifier (default for 'run': current timestamp)")
+    parser.add_argument('--workers', type=int, default=4, help="Local worker processes")
+    parser.add_argument('--cities', nargs='+', help="Override the enabled cities from config/cities.yaml")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help="Work queue database")
+    parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR)
+    parser.add_argument('--lease-seconds', type=float, default=600)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    args = parser.parse_args()
+    
+    if args.command != 'run' and not args.run_id:
+        parser.error(f"{args.command} needs --run-id")
+    run_id = args.run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    runner = ShardedRunner(args.queue, args.shard_dir, workers=args.workers,
+                           lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    
+    if args.command == 'run':
+        runner.plan(run_id, args.cities)
+        runner.supervise(run_id)
+        runner.merge(run_id)
+    elif args.command == 'worker':
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        ShardWorker(run_id, worker_id, args.queue, args.shard_dir,
+                    args.lease_seconds, args.max_attempts).run()
+    elif args.command == 'status':
+        print(json.dumps(runner.queue.counts(run_id), indent=2))
+    elif args.command == 'merge':
+        print(json.dumps(runner.merge(run_id), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Content-addressed, compressed archive of monthly snapshots
+
+A snapshot (e.g. '2026-01') is a set of files: the month's outputs and the
+raw / cleaned listing dumps of its run. Each file is cut into chunks at
+content-defined boundaries, so records that did not change since the previous
+month land in identical chunks; every distinct chunk is stored once,
+compressed with zstd (if the zstandard package is installed) or gzip, under
+its sha256.
+
+Listing dumps are JSON Lines (see storage.listing_store) and, like the other
+files, are chunked by line. Legacy .json dumps, written by json.dump(...,
+indent=2) before that, are chunked as one compact JSON record per line and
+re-indented on restore (only when that round-trips byte for byte); that mode
+exists only for them. Restored files are checked against the sha256 recorded
+at archive time.
+
+Everything lives in one SQLite file (data/archive/archive.sqlite): the chunk
+blobs and an index of snapshot -> file -> chunk sequence, so any file of any
+month can be read back without touching the others.
+"""
+
+import os
+import gzip
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.logger import setup_logger
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    snapshot_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, path)
+);
+
+CREATE TABLE IF NOT EXISTS file_chunks (
+    snapshot_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, path, seq)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_file_chunks_hash ON file_chunks (chunk_hash);
+"""
+
+# File modes
+LINES = 'lines'
+JSON_RECORDS = 'json-records'
+
+CODECS = ('zstd', 'gzip')
+
+
+def default_codec() -> str:
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def split_units(data: bytes) -> Tuple[str, List[bytes]]:
+    """
+    Split a file into the units chunk boundaries are chosen between
+    
+    Returns:
+        (mode, units): one compact JSON line per record for indent=2 JSON
+        arrays of objects that re-serialize identically, else the file's lines
+    """
+    if data[:1] == b'[':
+        try:
+            records = json.loads(data)
+        except ValueError:
+            records = None
+        if (isinstance(records, list) and all(isinstance(record, dict) for record in records)
+                and _dump_records(records) == data):
+            return JSON_RECORDS, [
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                for record in records
+            ]
+    return LINES, data.splitlines(keepends=True)
+
+
+def join_units(mode: str, data: bytes) -> bytes:
+    """Inverse of split_units for the concatenated chunk bytes of a file"""
+    if mode == JSON_RECORDS:
+        return _dump_records([json.loads(line) for line in data.splitlines() if line])
+    return data
+
+
+def _dump_records(records: List[Dict[str, Any]]) -> bytes:
+    # Format of the legacy .json raw / cleaned dumps (main.py now writes JSON Lines)
+    return json.dumps(records, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+class ArchiveStore:
+    """Deduplicated, compressed snapshots of files, indexed in SQLite"""
+    
+    def __init__(self, db_path: str = "data/archive/archive.sqlite", codec: Optional[str] = None,
+                 avg_chunk_bytes: int = 16384, min_chunk_bytes: int = 2048,
+                 max_chunk_bytes: int = 131072, level: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite file holding the chunks and the index
+            codec: 'zstd' or 'gzip' for new chunks (default: zstd if available)
+            avg_chunk_bytes: Target average chunk size; smaller chunks dedup
+                finer but compress worse
+            min_chunk_bytes: No boundary before a chunk reaches this size
+            max_chunk_bytes: Forced boundary at this size
+            level: Compression level (default: 10 for zstd, 9 for gzip)
+        """
+        self.logger = setup_logger("archive_store")
+        self.db_path = db_path
+        self.codec = codec or default_codec()
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown codec: {self.codec}")
+        if self.codec == 'zstd' and zstandard is None:
+            raise ImportError("zstd compression requires zstandard (pip install zstandard)")
+        self.level = level if level is not None else (10 if self.codec == 'zstd' else 9)
+        self.avg_chunk_bytes = avg_chunk_bytes
+        self.min_chunk_bytes = min_chunk_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def chunk(self, units: Iterable[bytes]) -> List[bytes]:
+        """
+        Group units into content-defined chunks
+        
+        A boundary follows a unit with probability len(unit) / avg_chunk_bytes,
+        decided by the unit's own hash: the same record cuts the same way in
+        every month, so an insertion or change only alters the chunks around it.
+        """
+        chunks = []
+        current = []
+        size = 0
+        for unit in units:
+            current.append(unit)
+            size += len(unit)
+            cut_hash = int.from_bytes(hashlib.blake2b(unit, digest_size=4).digest(), 'big')
+            cut = cut_hash * self.avg_chunk_bytes < len(unit) << 32
+            if size >= self.max_chunk_bytes or (cut and size >= self.min_chunk_bytes):
+                chunks.append(b''.join(current))
+                current = []
+                size = 0
+        if current:
+            chunks.append(b''.join(current))
+        return chunks
+    
+    def add_snapshot(self, snapshot_id: str, paths: Iterable[str], base_dir: str = '.',
+                     replace: bool = False) -> Dict[str, Any]:
+        """
+        Archive files as a snapshot
+        
+        Args:
+            snapshot_id: Snapshot name, e.g. '2026-01'
+            paths: Files to archive (stored relative to base_dir)
+            base_dir: Root the stored paths are relative to
+            replace: Overwrite an existing snapshot of the same name
+        
+        Returns:
+            Files, bytes and new chunks added by this snapshot
+        """
+        replacing = self.has_snapshot(snapshot_id)
+        if replacing and not replace:
+            raise ValueError(f"Snapshot {snapshot_id} already exists")
+        
+        result = {'snapshot_id': snapshot_id, 'files': 0, 'bytes': 0, 'chunks': 0,
+                  'new_chunks': 0, 'new_stored_bytes': 0}
+        # The old snapshot goes in the same transaction, so a failed read or
+        # insert leaves it in place
+        with self.conn:
+            if replacing:
+                self._delete_snapshot_rows(snapshot_id)
+            self.conn.execute(
+                "INSERT INTO snapshots VALUES (?, ?)",
+                (snapshot_id, datetime.now().isoformat(timespec='seconds')),
+            )
+            for path in paths:
+                rel_path = os.path.relpath(path, base_dir).replace(os.sep, '/')
+                with open(os.path.join(base_dir, rel_path), 'rb') as f:
+                    data = f.read()
+                
+                mode, units = split_units(data)
+                chunks = self.chunk(units)
+                hashes = []
+                for chunk in chunks:
+                    chunk_hash, stored = self._put_chunk(chunk)
+                    hashes.append(chunk_hash)
+                    if stored is not None:
+                        result['new_chunks'] += 1
+                        result['new_stored_bytes'] += stored
+                
+                self.conn.execute(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (snapshot_id, rel_path, mode, len(data), hashlib.sha256(data).hexdigest(), len(hashes)),
+                )
+                self.conn.executemany(
+                    "INSERT INTO file_chunks VALUES (?, ?, ?, ?)",
+                    [(snapshot_id, rel_path, seq, chunk_hash) for seq, chunk_hash in enumerate(hashes)],
+                )
+                result['files'] += 1
+                result['bytes'] += len(data)
+                result['chunks'] += len(hashes)
+        
+        if replacing:
+            # After the commit: chunks of the old snapshot were reused by the new one
+            with self.conn:
+                self._collect_chunks()
+        
+        self.logger.info(
+            f"Archived snapshot {snapshot_id}: {result['files']} files, {result['bytes'] / 1e6:.2f} MB, "
+            f"{result['new_chunks']}/{result['chunks']} new chunks "
+            f"({result['new_stored_bytes'] / 1e6:.2f} MB stored)"
+        )
+        return result
+    
+    def _put_chunk(self, chunk: bytes) -> Tuple[str, Optional[int]]:
+        """Store a chunk unless present; returns (hash, stored size or None if deduplicated)"""
+        chunk_hash = hashlib.sha256(chunk).hexdigest()
+        if self.conn.execute("SELECT 1 FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone():
+            return chunk_hash, None
+        
+        if self.codec == 'zstd':
+            data = zstandard.ZstdCompressor(level=self.level).compress(chunk)
+        else:
+            data = gzip.compress(chunk, compresslevel=self.level, mtime=0)
+        self.conn.execute(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+            (chunk_hash, self.codec, len(chunk), len(data), data),
+        )
+        return chunk_hash, len(data)
+    
+    def _get_chunk(self, chunk_hash: str) -> bytes:
+        row = self.conn.execute("SELECT codec, data FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone()
+        if row is None:
+            raise KeyError(f"Missing chunk {chunk_hash}")
+        if row['codec'] == 'zstd':
+            if zstandard is None:
+                raise ImportError("This archive holds zstd chunks; install zstandard to read them")
+            return zstandard.ZstdDecompressor().decompress(row['data'])
+        return gzip.decompress(row['data'])
+    
+    def has_snapshot(self, snapshot_id: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM snapshots WHERE snapshot_id = ?", (snapshot_id,)
+        ).fetchone() is not None
+    
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Snapshots with their file count and original size, oldest first"""
+        rows = self.conn.execute(
+            """SELECT s.snapshot_id, s.created_at, COUNT(f.path) AS files, COALESCE(SUM(f.size), 0) AS bytes
+               FROM snapshots s LEFT JOIN files f ON f.snapshot_id = s.snapshot_id
+               GROUP BY s.snapshot_id ORDER BY s.snapshot_id"""
+        )
+        return [dict(row) for row in rows]
+    
+    def files(self, snapshot_id: str) -> List[Dict[str, Any]]:
+        """Files of a snapshot (path, mode, size, sha256, chunk_count)"""
+        rows = self.conn.execute(
+            "SELECT path, mode, size, sha256, chunk_count FROM files WHERE snapshot_id = ? ORDER BY path",
+            (snapshot_id,),
+        )
+        return [dict(row) for row in rows]
+    
+    def read_file(self, snapshot_id: str, path: str) -> bytes:
+        """
+        Original bytes of one archived file
+        
+        Raises:
+            KeyError: The snapshot does not contain the file
+            ValueError: The rebuilt file does not match its recorded sha256
+        """
+        entry = self.conn.execute(
+            "SELECT mode, sha256 FROM files WHERE snapshot_id = ? AND path = ?", (snapshot_id, path)
+        ).fetchone()
+        if entry is None:
+            raise KeyError(f"{path} is not in snapshot {snapshot_id}")
+        
+        hashes = self.conn.execute(
+            "SELECT chunk_hash FROM file_chunks WHERE snapshot_id = ? AND path = ? ORDER BY seq",
+            (snapshot_id, path),
+        ).fetchall()
+        data = join_units(entry['mode'], b''.join(self._get_chunk(row['chunk_hash']) for row in hashes))
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise ValueError(f"Checksum mismatch restoring {path} from snapshot {snapshot_id}")
+        return data
+    
+    def restore(self, snapshot_id: str, dest_dir: str, paths: Optional[List[str]] = None) -> List[str]:
+        """
+        Write a snapshot's files (or some of them) under dest_dir
+        
+        Returns:
+            Paths written
+        """
+        if not self.has_snapshot(snapshot_id):
+            raise KeyError(f"Unknown snapshot {snapshot_id}")
+        wanted = set(paths) if paths else None
+        written = []
+        for entry in self.files(snapshot_id):
+            if wanted is not None and entry['path'] not in wanted:
+                continue
+            target = os.path.join(dest_dir, entry['path'])
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(self.read_file(snapshot_id, entry['path']))
+            written.append(target)
+        self.logger.info(f"Restored {len(written)} files from snapshot {snapshot_id} to {dest_dir}")
+        return written
+    
+    def delete_snapshot(self, snapshot_id: str) -> int:
+        """
+        Drop a snapshot and the chunks no other snapshot uses
+        
+        Returns:
+            Number of chunks removed
+        """
+        with self.conn:
+            self._delete_snapshot_rows(snapshot_id)
+            return self._collect_chunks()
+    
+    def _delete_snapshot_rows(self, snapshot_id: str):
+        """Remove a snapshot's index rows (caller owns the transaction)"""
+        self.conn.execute("DELETE FROM file_chunks WHERE snapshot_id = ?", (snapshot_id,))
+        self.conn.execute("DELETE FROM files WHERE snapshot_id = ?", (snapshot_id,))
+        self.conn.execute("DELETE FROM snapshots WHERE snapshot_id = ?", (snapshot_id,))
+    
+    def _collect_chunks(self) -> int:
+        """Delete chunks no file references (caller owns the transaction)"""
+        cursor = self.conn.execute(
+            "DELETE FROM chunks WHERE hash NOT IN (SELECT chunk_hash FROM file_chunks)"
+        )
+        return cursor.rowcount
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Archive size and ratios
+        
+        logical_bytes is what plain copies of every snapshot would take;
+        dedup_ratio compares chunk bytes referenced by snapshots with the
+        distinct chunk bytes, compression_ratio distinct chunk bytes with
+        stored bytes, and total_ratio logical with stored bytes.
+        """
+        snapshots, files, logical = self.conn.execute(
+            "SELECT COUNT(DISTINCT snapshot_id), COUNT(*), COALESCE(SUM(size), 0) FROM files"
+        ).fetchone()
+        referenced = self.conn.execute(
+            "SELECT COALESCE(SUM(c.raw_size), 0) FROM file_chunks fc JOIN chunks c ON c.hash = fc.chunk_hash"
+        ).fetchone()[0]
+        chunks, unique, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM chunks"
+        ).fetchone()
+        
+        def ratio(a, b):
+            return round(a / b, 3) if b else None
+        
+        return {
+            'snapshots': snapshots,
+            'files': files,
+            'chunks': chunks,
+            'logical_bytes': logical,
+            'referenced_chunk_bytes': referenced,
+            'unique_chunk_bytes': unique,
+            'stored_bytes': stored,
+            'db_bytes': os.path.getsize(self.db_path),
+            'dedup_ratio': ratio(referenced, unique),
+            'compression_ratio': ratio(unique, stored),
+            'total_ratio': ratio(logical, stored),
+        }
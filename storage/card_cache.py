@@ -0,0 +1,173 @@
+"""
+Persistent cache of listing cards extracted in earlier runs
+
+Most cards on a search page that changed are the same as last run: a new
+listing is added, one price is edited. Each card is fingerprinted (source,
+city and the card's tags, attributes and text) and the fingerprint mapped to the RawListing extracted from it, or to null for a
+card that yields no rental listing. Cards whose fingerprint is known are
+not extracted again; only new and edited cards are.
+
+The page a card was found on is not part of the fingerprint: new listings
+push the others down to later pages, and a card that moved is still a hit.
+Card links are resolved when the card is extracted, so the rare card whose
+link is missing or query-relative keeps the page URL of the run that first
+extracted it.
+
+The fingerprint includes that of the extraction code and config (see
+StratAxisRentScraper.STAGE_FILES), so a selector or rule change starts from
+an empty cache instead of serving stale listings. Entries not seen for
+max_age_days are pruned when the cache is closed.
+
+SQLite (data/state/card_cache.sqlite). Scraper threads share one connection
+behind a lock; new entries and last-seen updates are buffered and committed
+in batches.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+from utils.logger import setup_logger
+from utils.records import RawListing, json_default
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    fingerprint TEXT PRIMARY KEY,
+    listing TEXT,
+    seen_at TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+class CardCache:
+    """Card fingerprint -> listing extracted from the card, across runs"""
+    
+    def __init__(self, db_path: str = "data/state/card_cache.sqlite", extract_version: str = '',
+                 max_age_days: int = 180, flush_rows: int = 1000):
+        """
+        Args:
+            db_path: SQLite file
+            extract_version: Fingerprint of the extraction code and config
+            max_age_days: Entries not seen for this long are pruned on close
+            flush_rows: Buffered writes committed per transaction
+        """
+        self.logger = setup_logger("card_cache")
+        self.db_path = db_path
+        self.extract_version = extract_version
+        self.max_age = timedelta(days=max_age_days)
+        self.flush_rows = flush_rows
+        self.stats = Counter()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        
+        # Written on flush: new entries, and fingerprints hit since the last flush
+        self._pending: Dict[str, Optional[str]] = {}
+        self._seen = set()
+    
+    def card_fingerprint(self, source: str, city: str, signature: str) -> str:
+        """
+        Fingerprint of a listing card, independent of whitespace, indentation
+        and the results page it appears on
+        
+        Args:
+            city: Part of the fingerprint, since the extracted listing records it
+            signature: The card's tags, attributes and text (see scrapers.base_scraper.card_signature)
+        """
+        digest = hashlib.sha256(self.extract_version.encode('utf-8'))
+        for part in (source, city, ' '.join(signature.split())):
+            digest.update(b'\0' + part.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get_cards(self, fingerprints: Sequence[str]) -> Dict[str, Optional[RawListing]]:
+        """
+        Cached results of the cards seen before
+        
+        Returns:
+            fingerprint -> RawListing, or None for a card known to yield no
+            listing; fingerprints never seen are absent
+        """
+        found = {}
+        with self._lock:
+            missing = []
+            for fp in fingerprints:
+                if fp in self._pending:
+                    found[fp] = self._pending[fp]
+                else:
+                    missing.append(fp)
+            for start in range(0, len(missing), _QUERY_CHUNK):
+                chunk = missing[start:start + _QUERY_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT fingerprint, listing FROM cards WHERE fingerprint IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            self._seen.update(found)
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(set(fingerprints)) - len(found)
+        
+        return {
+            fp: RawListing.from_dict(json.loads(listing)) if listing is not None else None
+            for fp, listing in found.items()
+        }
+    
+    def put_cards(self, listings: Dict[str, Optional[RawListing]]):
+        """Store freshly extracted cards (None: the card yields no listing)"""
+        encoded = {
+            fp: json.dumps(listing, ensure_ascii=False, default=json_default) if listing is not None else None
+            for fp, listing in listings.items()
+        }
+        with self._lock:
+            self._pending.update(encoded)
+            self._flush_if_full()
+    
+    def _flush_if_full(self):
+        if len(self._pending) + len(self._seen) >= self.flush_rows:
+            self._flush()
+    
+    def _flush(self):
+        """Commit buffered entries and last-seen times in one transaction (lock held)"""
+        now = self._now()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cards VALUES (?, ?, ?)",
+                [(fp, listing, now) for fp, listing in self._pending.items()],
+            )
+            self.conn.executemany("UPDATE cards SET seen_at = ? WHERE fingerprint = ?",
+                                  [(now, fp) for fp in self._seen - self._pending.keys()])
+        self._pending.clear()
+        self._seen.clear()
+    
+    def summary(self) -> Dict[str, int]:
+        """Hits and misses of this run, plus the number of cards stored"""
+        with self._lock:
+            self._flush()
+            cards = self.conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        return {**dict(self.stats), 'cards': cards}
+    
+    def close(self):
+        """Flush, prune entries not seen for max_age_days, and close"""
+        with self._lock:
+            if self.conn is None:
+                return
+            self._flush()
+            cutoff = (datetime.now() - self.max_age).isoformat(timespec='seconds')
+            with self.conn:
+                pruned = self.conn.execute("DELETE FROM cards WHERE seen_at < ?", (cutoff,)).rowcount
+            if pruned:
+                self.logger.info(f"Pruned {pruned} card cache entries not seen since {cutoff[:10]}")
+            self.conn.close()
+            self.conn = None
+    
+    def _now(self) -> str:
+        return datetime.now().isoformat(timespec='seconds')
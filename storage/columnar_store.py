@@ -0,0 +1,206 @@
+"""
+Partitioned columnar storage for raw and cleaned listings
+
+Listings are written as a Parquet dataset partitioned by city/year/month
+(hive layout: city=douala/year=2026/month=1/part-<run_id>-<write>-0.parquet),
+with dictionary-encoded low-cardinality string columns and zstd compression.
+Readers push partition and column predicates down to pyarrow, so only the
+matching directories and columns are read.
+
+Raw listings carry no parsed date, so they are partitioned by the year/month
+they were scraped in; cleaned listings use their normalized listing year/month.
+"""
+
+import os
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    ds = None
+
+
+def _dict_string():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def raw_schema():
+    """Schema of raw scraped listings (partition columns excluded)"""
+    return pa.schema([
+        ('neighborhood', _dict_string()),
+        ('housing_type_raw', pa.string()),
+        ('rent_price_raw', pa.string()),
+        ('currency_raw', _dict_string()),
+        ('payment_frequency_raw', _dict_string()),
+        ('bedrooms_raw', _dict_string()),
+        ('size_raw', pa.string()),
+        ('listing_date', pa.string()),
+        ('source_site', _dict_string()),
+        ('listing_url', pa.string()),
+        ('full_description', pa.string()),
+        ('scraped_at', pa.timestamp('s')),
+        ('run_id', _dict_string()),
+    ])
+
+
+def cleaned_schema():
+    """Schema of normalized listings (partition columns excluded)"""
+    return pa.schema([
+        ('neighborhood', _dict_string()),
+        ('housing_type', _dict_string()),
+        ('bedrooms', pa.int16()),
+        ('size_sqm', pa.float64()),
+        ('monthly_rent_xaf', pa.float64()),
+        ('rent_per_sqm', pa.float64()),
+        ('source_site', _dict_string()),
+        ('listing_url', pa.string()),
+        ('has_price', pa.bool_()),
+        ('has_size', pa.bool_()),
+        ('has_neighborhood', pa.bool_()),
+        ('has_housing_type', pa.bool_()),
+        ('has_date', pa.bool_()),
+        ('scraped_at', pa.timestamp('s')),
+        ('run_id', _dict_string()),
+    ])
+
+
+class ColumnarListingStore:
+    """Parquet listing dataset partitioned by city/year/month"""
+    
+    PARTITION_COLS = ['city', 'year', 'month']
+    
+    def __init__(self, root: str, kind: str = 'cleaned'):
+        """
+        Args:
+            root: Dataset directory (e.g. 'data/cleaned/parquet')
+            kind: 'raw' or 'cleaned', selects the column schema
+        """
+        if pa is None:
+            raise ImportError("Columnar storage requires pyarrow (pip install pyarrow)")
+        if kind not in ('raw', 'cleaned'):
+            raise ValueError(f"Unknown listing kind: {kind}")
+        
+        self.root = root
+        self.kind = kind
+        self.schema = raw_schema() if kind == 'raw' else cleaned_schema()
+        self.partitioning = ds.partitioning(
+            pa.schema([('city', pa.string()), ('year', pa.int16()), ('month', pa.int8())]),
+            flavor='hive',
+        )
+    
+    def write(self, listings: List[Dict[str, Any]], run_id: Optional[str] = None,
+              scraped_at: Optional[datetime] = None) -> int:
+        """
+        Append listings to the dataset
+        
+        Args:
+            listings: Raw or normalized listing dicts
+            run_id: Label used in file names; defaults to the scrape timestamp
+            scraped_at: Scrape time; also the partition date for raw listings
+        
+        Returns:
+            Number of rows written
+        """
+        if not listings:
+            return 0
+        
+        scraped_at = (scraped_at or datetime.now()).replace(microsecond=0)
+        run_id = run_id or scraped_at.strftime("%Y%m%d_%H%M%S")
+        
+        columns = {name: [] for name in self.schema.names}
+        columns.update({name: [] for name in self.PARTITION_COLS})
+        
+        for listing in listings:
+            for name in self.schema.names:
+                columns[name].append(listing.get(name))
+            columns['city'].append(listing.get('city', ''))
+            if self.kind == 'raw':
+                columns['year'].append(scraped_at.year)
+                columns['month'].append(scraped_at.month)
+            else:
+                columns['year'].append(listing.get('year'))
+                columns['month'].append(listing.get('month'))
+        
+        columns['scraped_at'] = [scraped_at] * len(listings)
+        columns['run_id'] = [run_id] * len(listings)
+        
+        full_schema = self.schema.append(pa.field('city', pa.string())) \
+            .append(pa.field('year', pa.int16())).append(pa.field('month', pa.int8()))
+        table = pa.Table.from_pydict(columns, schema=full_schema)
+        
+        # Unique per write: batches written in the same second (same default
+        # run_id) would otherwise replace each other's part files
+        write_id = uuid.uuid4().hex[:12]
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=self.partitioning,
+            basename_template=f"part-{run_id}-{write_id}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+        )
+        return table.num_rows
+    
+    def dataset(self):
+        """Open the dataset (lazily; no data is read)"""
+        return ds.dataset(self.root, format='parquet', partitioning=self.partitioning)
+    
+    def build_filter(self, cities: Optional[Sequence[str]] = None,
+                     years: Optional[Sequence[int]] = None,
+                     months: Optional[Sequence[int]] = None,
+                     sources: Optional[Sequence[str]] = None):
+        """Combine simple predicates into a pyarrow filter expression"""
+        expression = None
+        for name, values in (('city', cities), ('year', years),
+                             ('month', months), ('source_site', sources)):
+            if values is None:
+                continue
+            clause = ds.field(name).isin(list(values))
+            expression = clause if expression is None else expression & clause
+        return expression
+    
+    def read_table(self, columns: Optional[Sequence[str]] = None, expression=None, **predicates):
+        """
+        Read matching rows as an Arrow table
+        
+        Args:
+            columns: Columns to load (partition columns may be included)
+            expression: Optional pyarrow filter expression, combined with predicates
+            **predicates: cities / years / months / sources value lists
+        """
+        if not os.path.isdir(self.root):
+            return pa.table({name: [] for name in (columns or [])})
+        
+        predicate = self.build_filter(**predicates)
+        if expression is not None:
+            predicate = expression if predicate is None else predicate & expression
+        
+        return self.dataset().to_table(
+            columns=list(columns) if columns is not None else None,
+            filter=predicate,
+        )
+    
+    def read_frame(self, columns: Optional[Sequence[str]] = None, expression=None,
+                   categorical: bool = False, **predicates):
+        """
+        Read matching rows as a pandas DataFrame
+        
+        Dictionary-encoded columns are decoded to plain strings unless
+        categorical=True, in which case they become pandas categoricals.
+        """
+        table = self.read_table(columns, expression, **predicates)
+        if not categorical:
+            for i, field in enumerate(table.schema):
+                if pa.types.is_dictionary(field.type):
+                    table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+        return table.to_pandas()
+    
+    def read_listings(self, columns: Optional[Sequence[str]] = None, expression=None,
+                      **predicates) -> List[Dict[str, Any]]:
+        """Read matching rows as listing dicts"""
+        return self.read_table(columns, expression, **predicates).to_pylist()
@@ -0,0 +1,208 @@
+"""
+Persisted per-page crawl state for delta scrapes
+
+For every (source, city, search page) the state keeps the HTTP validators
+(ETag / Last-Modified), a hash of the response body, a hash of the listings
+parsed from it, the listings themselves, and how many consecutive checks
+found the page unchanged. A delta scrape uses it to:
+    
+    - send conditional GETs, so unchanged pages cost a 304 and no body
+    - skip parsing when the body hash is unchanged
+    - revisit pages that were stable for several checks less often
+    - skip URLs that recently returned 404/410
+    - carry the last known listings forward for every page it did not
+      re-parse, so the month's dataset stays complete
+
+State lives in SQLite (data/state/crawl_state.sqlite); scraper threads share
+one connection behind a lock.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from utils.logger import setup_logger
+from utils.records import json_default
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT NOT NULL,
+    city TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    listings_hash TEXT,
+    listings TEXT NOT NULL DEFAULT '[]',
+    unchanged_runs INTEGER NOT NULL DEFAULT 0,
+    checked_at TEXT NOT NULL,
+    changed_at TEXT,
+    PRIMARY KEY (source, city, url)
+) WITHOUT ROWID;
+"""
+
+# Statuses after which a URL is not re-requested for a while
+MISSING_STATUSES = (404, 410)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def listings_hash(listings: List[Dict[str, Any]]) -> str:
+    """Order-insensitive hash of parsed listings"""
+    encoded = sorted(
+        json.dumps(listing, sort_keys=True, ensure_ascii=False, default=json_default) for listing in listings
+    )
+    return hashlib.sha256('\n'.join(encoded).encode('utf-8')).hexdigest()
+
+
+class CrawlState:
+    """SQLite-backed page state shared by the scrapers of one delta run"""
+    
+    # Page plans
+    FETCH = 'fetch'
+    CARRY = 'carry'
+    SKIP_MISSING = 'skip_missing'
+    
+    def __init__(self, db_path: str = "data/state/crawl_state.sqlite",
+                 stable_runs: int = 2, stable_revisit_days: int = 45,
+                 missing_retry_days: int = 90, max_carry_days: int = 90):
+        """
+        Args:
+            db_path: SQLite file
+            stable_runs: Consecutive unchanged checks after which a page is
+                revisited only every stable_revisit_days
+            stable_revisit_days: Revisit interval for stable pages
+            missing_retry_days: Days before a 404/410 URL is requested again
+            max_carry_days: A page that cannot be fetched keeps contributing
+                its last listings for this many days after its last good check
+        """
+        self.logger = setup_logger("crawl_state")
+        self.db_path = db_path
+        self.stable_runs = stable_runs
+        self.stable_revisit = timedelta(days=stable_revisit_days)
+        self.missing_retry = timedelta(days=missing_retry_days)
+        self.max_carry = timedelta(days=max_carry_days)
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def page_count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    
+    def get(self, source: str, city: str, url: str) -> Optional[Dict[str, Any]]:
+        """Stored state for a page, or None if it was never checked"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM pages WHERE source = ? AND city = ? AND url = ?", (source, city, url)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def page_urls(self, source: str, city: str) -> List[str]:
+        """URLs of every page checked before for a source and city"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT url FROM pages WHERE source = ? AND city = ? ORDER BY url", (source, city)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def plan(self, page: Optional[Dict[str, Any]], now: datetime = None) -> str:
+        """Decide whether a page needs a request this run"""
+        if page is None:
+            return self.FETCH
+        now = now or datetime.now()
+        age = now - datetime.fromisoformat(page['checked_at'])
+        
+        if page['status'] in MISSING_STATUSES:
+            return self.SKIP_MISSING if age < self.missing_retry else self.FETCH
+        if page['unchanged_runs'] >= self.stable_runs and age < self.stable_revisit:
+            return self.CARRY
+        return self.FETCH
+    
+    def conditional_headers(self, page: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a previously fetched page"""
+        headers = {}
+        if page and page['status'] == 200:
+            if page['etag']:
+                headers['If-None-Match'] = page['etag']
+            if page['last_modified']:
+                headers['If-Modified-Since'] = page['last_modified']
+        return headers
+    
+    def carried_listings(self, page: Optional[Dict[str, Any]], verified: bool = False,
+                         now: datetime = None) -> List[Dict[str, Any]]:
+        """
+        Last known listings of a page, unless they are too old to reuse
+        
+        Args:
+            page: Stored page state
+            verified: The page was just confirmed unchanged (304 or same body)
+        """
+        if not page or page['status'] != 200:
+            return []
+        # checked_at only advances on a successful check
+        if not verified and (now or datetime.now()) - datetime.fromisoformat(page['checked_at']) > self.max_carry:
+            return []
+        return json.loads(page['listings'])
+    
+    def record_unchanged(self, source: str, city: str, url: str,
+                         etag: str = None, last_modified: str = None):
+        """A 304, or a 200 whose body or listings match the stored ones"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                """UPDATE pages SET unchanged_runs = unchanged_runs + 1, checked_at = ?,
+                       etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                   WHERE source = ? AND city = ? AND url = ?""",
+                (self._now(), etag, last_modified, source, city, url),
+            )
+    
+    def record_fetched(self, source: str, city: str, url: str, body_hash: str,
+                       listings: List[Dict[str, Any]], etag: str = None,
+                       last_modified: str = None) -> bool:
+        """
+        Store a parsed 200 response
+        
+        Returns:
+            True if the page's listings changed since the previous check
+        """
+        new_hash = listings_hash(listings)
+        previous = self.get(source, city, url)
+        changed = previous is None or previous['listings_hash'] != new_hash
+        now = self._now()
+        
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source, city, url, 200, etag, last_modified, body_hash, new_hash,
+                    json.dumps(listings, ensure_ascii=False, default=json_default),
+                    0 if changed else previous['unchanged_runs'] + 1,
+                    now, now if changed else previous['changed_at'],
+                ),
+            )
+        return changed
+    
+    def record_missing(self, source: str, city: str, url: str, status: int):
+        """A 404/410: drop the page's listings and back off"""
+        now = self._now()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, NULL, NULL, NULL, NULL, '[]', 0, ?, ?)",
+                (source, city, url, status, now, now),
+            )
+    
+    def _now(self) -> str:
+        return datetime.now().isoformat(timespec='seconds')
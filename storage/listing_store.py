@@ -0,0 +1,341 @@
+"""
+Append-only JSON Lines listing store with an offset index
+
+Raw or cleaned listings are appended to a .jsonl file as they are scraped,
+one compact JSON object per line, next to two small sidecars:
+
+    raw_listings_<ts>.jsonl          the records
+    raw_listings_<ts>.jsonl.idx      per record: end offset and slice id (two uint64)
+    raw_listings_<ts>.jsonl.slices   one [source_site, city] JSON line per slice id
+
+Each batch is flushed to the data file before its index entries, so the
+index never points past the data. Opening a store repairs what a crash can
+leave behind: index entries past the data are dropped, complete lines the
+index missed are indexed again, and in append mode a partial last line is
+truncated. A dump whose sidecars are missing (older streamed dumps, files
+restored from the archive) is indexed by one scan.
+
+Readers memory-map the data file and decode only the records they ask for:
+one record by position, a range, or every record of a (source, city) slice.
+"""
+
+import os
+import sys
+import json
+import mmap
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.logger import setup_logger
+from utils.records import json_default
+
+
+INDEX_SUFFIX = '.idx'
+SLICES_SUFFIX = '.slices'
+
+# Index entries: (end offset, slice id), little-endian uint64
+_ENTRY_BYTES = 16
+
+
+def sidecar_paths(path: str) -> List[str]:
+    """Index and slice table files that belong to a store's data file"""
+    return [path + INDEX_SUFFIX, path + SLICES_SUFFIX]
+
+
+def is_sidecar(path: str) -> bool:
+    return path.endswith((INDEX_SUFFIX, SLICES_SUFFIX, INDEX_SUFFIX + '.tmp', SLICES_SUFFIX + '.tmp'))
+
+
+def _slice_key(listing: Any) -> Tuple[str, str]:
+    return (listing.get('source_site') or '', listing.get('city') or '')
+
+
+class ListingStore:
+    """JSON Lines listing file with an offset index, appended to and read by record"""
+    
+    def __init__(self, path: str, mode: str = 'r', fsync: bool = False):
+        """
+        Args:
+            path: Data file (.jsonl); sidecars are written next to it
+            mode: 'r' to read (nothing on disk is modified), 'a' to create or
+                append to the file (repairing a crashed tail first)
+            fsync: Also fsync the data before writing each batch's index
+                entries, so the index survives a machine crash, not only a
+                process crash
+        """
+        if mode not in ('r', 'a'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.logger = setup_logger("listing_store")
+        self.path = path
+        self.mode = mode
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        
+        # Record i spans [ends[i - 1], ends[i]) of the data file
+        self._ends = array('Q')
+        self._slice_of = array('Q')
+        self._slices: List[Tuple[str, str]] = []
+        self._slice_ids: Dict[Tuple[str, str], int] = {}
+        self._slice_rows: Optional[Dict[int, List[int]]] = None
+        
+        self._map = None
+        self._reader = None
+        self._data = self._index = self._slice_file = None
+        
+        if mode == 'a':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            open(path, 'ab').close()
+        elif not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self._load()
+    
+    def _load(self):
+        data_size = os.path.getsize(self.path)
+        index_path, slices_path = sidecar_paths(self.path)
+        
+        stored_slices = self._read_slices(slices_path)
+        for key in stored_slices:
+            self._add_slice(key)
+        
+        entries = array('Q')
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                raw = f.read()
+            entries.frombytes(raw[:len(raw) - len(raw) % _ENTRY_BYTES])
+            if sys.byteorder == 'big':
+                entries.byteswap()
+        stored_entries = len(entries) // 2
+        ends, slice_of = entries[0::2], entries[1::2]
+        
+        # Drop entries a crash left pointing past the data (or at a slice never written)
+        valid = stored_entries
+        with open(self.path, 'rb') as f:
+            while valid and (ends[valid - 1] > data_size or slice_of[valid - 1] >= len(self._slices)
+                             or not self._ends_line(f, ends[valid - 1])):
+                valid -= 1
+            del ends[valid:], slice_of[valid:]
+            self._ends, self._slice_of = ends, slice_of
+            
+            indexed_end = ends[-1] if ends else 0
+            recovered, valid_end = 0, indexed_end
+            if data_size > indexed_end:
+                with mmap.mmap(f.fileno(), data_size, access=mmap.ACCESS_READ) as view:
+                    recovered, valid_end = self._index_tail(view, indexed_end)
+        
+        dropped_bytes = data_size - valid_end
+        if not os.path.exists(index_path) and not dropped_bytes:
+            if recovered:
+                self.logger.info(f"{self.path}: no index, indexed {recovered} records")
+        elif valid < stored_entries or recovered or dropped_bytes:
+            self.logger.warning(
+                f"{self.path}: dropped {stored_entries - valid} stale index entries, "
+                f"indexed {recovered} unindexed records, "
+                f"{'truncating' if self.mode == 'a' else 'ignoring'} {dropped_bytes} bytes of partial record"
+            )
+        
+        if self.mode == 'a':
+            if dropped_bytes:
+                os.truncate(self.path, valid_end)
+            if len(self._slices) != len(stored_slices) or not os.path.exists(slices_path):
+                self._rewrite(slices_path, ''.join(self._slice_line(key) for key in self._slices).encode('utf-8'))
+            if valid < stored_entries or recovered or not os.path.exists(index_path):
+                self._rewrite(index_path, self._entry_bytes(self._ends, self._slice_of))
+            self._data = open(self.path, 'ab')
+            self._index = open(index_path, 'ab')
+            self._slice_file = open(slices_path, 'a', encoding='utf-8')
+        self._size = valid_end
+    
+    @staticmethod
+    def _read_slices(slices_path: str) -> List[Tuple[str, str]]:
+        slices = []
+        if not os.path.exists(slices_path):
+            return slices
+        with open(slices_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    source, city = json.loads(line)
+                except ValueError:
+                    break
+                slices.append((source, city))
+        return slices
+    
+    @staticmethod
+    def _ends_line(f, end: int) -> bool:
+        if end == 0:
+            return True
+        f.seek(end - 1)
+        return f.read(1) == b'\n'
+    
+    def _index_tail(self, view: mmap.mmap, start: int) -> Tuple[int, int]:
+        """Index the complete records from start on; returns (records added, end of valid data)"""
+        recovered = 0
+        while True:
+            newline = view.find(b'\n', start)
+            if newline < 0:
+                break
+            try:
+                listing = json.loads(view[start:newline])
+            except ValueError:
+                break
+            if not isinstance(listing, dict):
+                break
+            start = newline + 1
+            self._ends.append(start)
+            self._slice_of.append(self._add_slice(_slice_key(listing)))
+            recovered += 1
+        return recovered, start
+    
+    def _add_slice(self, key: Tuple[str, str]) -> int:
+        slice_id = self._slice_ids.get(key)
+        if slice_id is None:
+            slice_id = self._slice_ids[key] = len(self._slices)
+            self._slices.append(key)
+        return slice_id
+    
+    @staticmethod
+    def _slice_line(key: Tuple[str, str]) -> str:
+        return json.dumps(list(key), ensure_ascii=False) + '\n'
+    
+    @staticmethod
+    def _entry_bytes(ends: array, slice_of: array) -> bytes:
+        entries = array('Q', bytes(_ENTRY_BYTES * len(ends)))
+        entries[0::2], entries[1::2] = ends, slice_of
+        if sys.byteorder == 'big':
+            entries.byteswap()
+        return entries.tobytes()
+    
+    @staticmethod
+    def _rewrite(path: str, content: bytes):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    
+    def append(self, listing: Any):
+        self.extend([listing])
+    
+    def extend(self, listings: Iterable[Any]) -> int:
+        """
+        Append listings (dicts or records) and make them durable as one batch
+        
+        Returns:
+            Number of listings written
+        """
+        if self.mode != 'a':
+            raise ValueError(f"{self.path} is open read-only")
+        
+        with self._lock:
+            first = len(self._ends)
+            first_new_slice = len(self._slices)
+            lines = []
+            size = self._size
+            for listing in listings:
+                line = json.dumps(listing, ensure_ascii=False, default=json_default).encode('utf-8') + b'\n'
+                lines.append(line)
+                size += len(line)
+                self._ends.append(size)
+                self._slice_of.append(self._add_slice(_slice_key(listing)))
+            if not lines:
+                return 0
+            
+            # Data, then slice names, then the index entries that refer to both
+            self._data.write(b''.join(lines))
+            self._data.flush()
+            if self.fsync:
+                os.fsync(self._data.fileno())
+            if len(self._slices) > first_new_slice:
+                self._slice_file.write(''.join(self._slice_line(key) for key in self._slices[first_new_slice:]))
+                self._slice_file.flush()
+            self._index.write(self._entry_bytes(self._ends[first:], self._slice_of[first:]))
+            self._index.flush()
+            
+            self._size = size
+            self._slice_rows = None
+            return len(lines)
+    
+    def __len__(self) -> int:
+        return len(self._ends)
+    
+    def _view(self, end: int):
+        """Memory map covering at least the first end bytes (remapped as the file grows)"""
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            if self._reader is None:
+                self._reader = open(self.path, 'rb')
+            self._map = mmap.mmap(self._reader.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+    
+    def _decode(self, row: int) -> Dict[str, Any]:
+        start = self._ends[row - 1] if row else 0
+        end = self._ends[row]
+        return json.loads(self._view(end)[start:end])
+    
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        """Listing at a position (negative positions count from the end)"""
+        with self._lock:
+            if row < 0:
+                row += len(self._ends)
+            if not 0 <= row < len(self._ends):
+                raise IndexError(row)
+            return self._decode(row)
+    
+    def read(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Listings start..stop-1, decoded from one slice of the map"""
+        with self._lock:
+            start, stop, _ = slice(start, stop).indices(len(self._ends))
+            if start >= stop:
+                return []
+            base = self._ends[start - 1] if start else 0
+            end = self._ends[stop - 1]
+            # One parse of the lines as an array (JSON escapes every newline inside a record)
+            return json.loads(b'[' + self._view(end)[base:end - 1].replace(b'\n', b',') + b']')
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.read())
+    
+    def slices(self) -> Dict[Tuple[str, str], int]:
+        """(source_site, city) -> number of records"""
+        with self._lock:
+            return {self._slices[slice_id]: len(rows) for slice_id, rows in self._rows_by_slice().items()}
+    
+    def _rows_by_slice(self) -> Dict[int, List[int]]:
+        if self._slice_rows is None:
+            rows = {}
+            for row, slice_id in enumerate(self._slice_of):
+                rows.setdefault(slice_id, []).append(row)
+            self._slice_rows = rows
+        return self._slice_rows
+    
+    def slice_rows(self, source: str, city: Optional[str] = None) -> List[int]:
+        """Positions of a source's records, in one city or all of them"""
+        with self._lock:
+            by_slice = self._rows_by_slice()
+            rows = []
+            for slice_id, (slice_source, slice_city) in enumerate(self._slices):
+                if slice_source == source and (city is None or slice_city == city):
+                    rows.extend(by_slice.get(slice_id, ()))
+            return sorted(rows)
+    
+    def iter_slice(self, source: str, city: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Decode only the records of a source (and city), in file order"""
+        for row in self.slice_rows(source, city):
+            yield self[row]
+    
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            for handle in (self._reader, self._data, self._index, self._slice_file):
+                if handle is not None:
+                    handle.close()
+            self._reader = self._data = self._index = self._slice_file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
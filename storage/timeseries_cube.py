@@ -0,0 +1,386 @@
+"""
+Rent time-series cube over the monthly archives
+
+MonthlyScraperScheduler archives each month's rental_intelligence CSV under
+outputs/monthly_archives/<year>/<Month>/. The cube ingests those snapshots
+incrementally into SQLite (only months not yet ingested, or whose archived
+CSV was replaced by a later run, are read) and precomputes, per
+(city, neighborhood, housing_type) and month:
+
+    - median rent observed that month (the snapshot row for the most recent
+      listing year up to the year of the run, i.e. the current market rent
+      as seen in that month)
+    - month-over-month and year-over-year change (%)
+    - 3 and 12 month rolling medians of the monthly medians
+
+Series rows are clustered on (city, neighborhood, housing_type, period), so
+trend queries are index range scans.
+
+Usage:
+    python -m storage.timeseries_cube build [--archive outputs/monthly_archives]
+    python -m storage.timeseries_cube trend douala --neighborhood akwa --type two_bedroom
+"""
+
+import os
+import re
+import csv
+import sqlite3
+import argparse
+import statistics
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
+from utils.logger import setup_logger
+
+
+ARCHIVE_FILE_PATTERN = re.compile(r'rental_intelligence_(\d{4})_(\d{2})_\w+?_(\d{8})\.csv$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_months (
+    period TEXT PRIMARY KEY,
+    source_file TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    source_mtime REAL,
+    run_date TEXT
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    period TEXT NOT NULL,
+    city TEXT NOT NULL,
+    neighborhood TEXT NOT NULL,
+    housing_type TEXT NOT NULL,
+    data_year INTEGER NOT NULL,
+    median_monthly_rent_xaf REAL,
+    p25_monthly_rent_xaf REAL,
+    p75_monthly_rent_xaf REAL,
+    median_rent_per_sqm REAL,
+    listing_count INTEGER,
+    rent_volatility_score REAL,
+    data_confidence TEXT,
+    PRIMARY KEY (period, city, neighborhood, housing_type, data_year)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    city TEXT NOT NULL,
+    neighborhood TEXT NOT NULL,
+    housing_type TEXT NOT NULL,
+    period TEXT NOT NULL,
+    data_year INTEGER NOT NULL,
+    median_monthly_rent_xaf REAL,
+    listing_count INTEGER,
+    mom_change_pct REAL,
+    yoy_change_pct REAL,
+    rolling_median_3m REAL,
+    rolling_median_12m REAL,
+    PRIMARY KEY (city, neighborhood, housing_type, period)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_snapshots_key
+    ON snapshots (city, neighborhood, housing_type, period);
+
+CREATE INDEX IF NOT EXISTS idx_series_period ON series (period, city);
+"""
+
+# Added after the first release; cubes built before get them on open
+INGESTED_MONTHS_COLUMNS = {'source_mtime': 'REAL', 'run_date': 'TEXT'}
+
+SeriesKey = Tuple[str, str, str]
+
+
+def period_index(period: str) -> int:
+    """'2026-01' -> months since year 0, for calendar arithmetic"""
+    year, month = period.split('-')
+    return int(year) * 12 + int(month) - 1
+
+
+def run_date(csv_path: str) -> str:
+    """Date the archived CSV was produced: its filename stamp, else its mtime"""
+    match = ARCHIVE_FILE_PATTERN.search(os.path.basename(csv_path))
+    if match:
+        stamp = match.group(3)
+        return f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:]}"
+    return datetime.fromtimestamp(os.path.getmtime(csv_path)).strftime('%Y-%m-%d')
+
+
+def _to_float(value: str) -> Optional[float]:
+    return float(value) if value not in (None, '') else None
+
+
+def _pct_change(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    if current is None or not previous:
+        return None
+    return (current - previous) / previous * 100
+
+
+class RentTimeSeriesCube:
+    """SQLite-backed rent time series built from monthly archive snapshots"""
+    
+    ROLLING_WINDOWS = (3, 12)
+    
+    def __init__(self, db_path: str = "data/aggregated/rent_timeseries.sqlite"):
+        self.logger = setup_logger("timeseries_cube")
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+    
+    def _migrate(self):
+        """Add ingested_months columns missing from cubes built by earlier versions"""
+        existing = {row['name'] for row in self.conn.execute("PRAGMA table_info(ingested_months)")}
+        with self.conn:
+            for column, sql_type in INGESTED_MONTHS_COLUMNS.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE ingested_months ADD COLUMN {column} {sql_type}")
+    
+    def close(self):
+        self.conn.close()
+    
+    def ingested_periods(self) -> List[str]:
+        rows = self.conn.execute("SELECT period FROM ingested_months ORDER BY period")
+        return [row['period'] for row in rows]
+    
+    def ingested_sources(self) -> Dict[str, Tuple[str, Optional[float]]]:
+        """Map period -> (source_file, source_mtime) it was ingested from"""
+        rows = self.conn.execute("SELECT period, source_file, source_mtime FROM ingested_months")
+        return {row['period']: (row['source_file'], row['source_mtime']) for row in rows}
+    
+    def discover_archive(self, archive_root: str) -> Dict[str, str]:
+        """Map period -> latest archived CSV for that month"""
+        found = {}
+        for dirpath, _, filenames in os.walk(archive_root):
+            for filename in filenames:
+                match = ARCHIVE_FILE_PATTERN.search(filename)
+                if not match:
+                    continue
+                year, month, stamp = match.groups()
+                period = f"{year}-{month}"
+                path = os.path.join(dirpath, filename)
+                # Several runs in one month: keep the latest
+                if period not in found or stamp > found[period][0]:
+                    found[period] = (stamp, path)
+        return {period: path for period, (_, path) in found.items()}
+    
+    def ingest_archive(self, archive_root: str = "outputs/monthly_archives") -> List[str]:
+        """
+        Ingest archived months that are not in the cube yet, and re-ingest
+        months whose latest archived CSV changed since (e.g. a --resume rerun)
+        
+        Returns:
+            Periods ingested by this call
+        """
+        available = self.discover_archive(archive_root)
+        ingested = self.ingested_sources()
+        new_periods = sorted(
+            period for period, path in available.items()
+            if ingested.get(period) != (path, os.path.getmtime(path))
+        )
+        
+        if not new_periods:
+            self.logger.info("Time-series cube is up to date")
+            return []
+        
+        touched = set()
+        for period in new_periods:
+            touched |= self.ingest_snapshot(period, available[period], refresh=False)
+        
+        self.refresh_series(touched)
+        self.logger.info(f"Ingested {len(new_periods)} month(s) into {self.db_path}: {', '.join(new_periods)}")
+        return new_periods
+    
+    def ingest_snapshot(self, period: str, csv_path: str, refresh: bool = True) -> Set[SeriesKey]:
+        """
+        Load one month's aggregated CSV
+        
+        Returns:
+            Series keys touched by the snapshot or the one it replaced
+        """
+        produced = run_date(csv_path)
+        rows = []
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                if not row.get('year'):
+                    continue
+                rows.append((
+                    period,
+                    row['city'],
+                    row['neighborhood'] or '',
+                    row['housing_type'],
+                    int(float(row['year'])),
+                    _to_float(row.get('median_monthly_rent_xaf')),
+                    _to_float(row.get('p25_monthly_rent_xaf')),
+                    _to_float(row.get('p75_monthly_rent_xaf')),
+                    _to_float(row.get('median_rent_per_sqm')),
+                    int(float(row['listing_count'])) if row.get('listing_count') else None,
+                    _to_float(row.get('rent_volatility_score')),
+                    row.get('data_confidence'),
+                ))
+        
+        # Keys only in the replaced snapshot need their series recomputed too
+        touched = {
+            tuple(row) for row in self.conn.execute(
+                "SELECT DISTINCT city, neighborhood, housing_type FROM snapshots WHERE period = ?", (period,)
+            )
+        }
+        
+        with self.conn:
+            self.conn.execute("DELETE FROM snapshots WHERE period = ?", (period,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingested_months "
+                "(period, source_file, ingested_at, source_mtime, run_date) VALUES (?, ?, ?, ?, ?)",
+                (period, csv_path, datetime.now().isoformat(timespec='seconds'),
+                 os.path.getmtime(csv_path), produced),
+            )
+        
+        touched |= {(row[1], row[2], row[3]) for row in rows}
+        if refresh:
+            self.refresh_series(touched)
+        return touched
+    
+    def refresh_series(self, keys: Set[SeriesKey]):
+        """Recompute the derived series for the given (city, neighborhood, housing_type) keys"""
+        with self.conn:
+            for city, neighborhood, housing_type in keys:
+                observations = self._observations(city, neighborhood, housing_type)
+                self.conn.execute(
+                    "DELETE FROM series WHERE city = ? AND neighborhood = ? AND housing_type = ?",
+                    (city, neighborhood, housing_type),
+                )
+                self.conn.executemany(
+                    "INSERT INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (city, neighborhood, housing_type, *values)
+                        for values in self._derive(observations)
+                    ],
+                )
+    
+    def _observations(self, city: str, neighborhood: str, housing_type: str) -> List[sqlite3.Row]:
+        """
+        One row per period: the snapshot row for the most recent listing year
+        
+        Years after the run date are skipped. The run date, not the period,
+        bounds them: a January run archived for December reports the new year.
+        """
+        return self.conn.execute(
+            """
+            SELECT s.period, s.data_year, s.median_monthly_rent_xaf, s.listing_count
+            FROM snapshots s
+            JOIN (
+                SELECT sn.period, MAX(sn.data_year) AS data_year
+                FROM snapshots sn
+                LEFT JOIN ingested_months m ON m.period = sn.period
+                WHERE sn.city = ? AND sn.neighborhood = ? AND sn.housing_type = ?
+                  AND sn.data_year <= CAST(substr(COALESCE(m.run_date, sn.period), 1, 4) AS INTEGER)
+                GROUP BY sn.period
+            ) latest ON latest.period = s.period AND latest.data_year = s.data_year
+            WHERE s.city = ? AND s.neighborhood = ? AND s.housing_type = ?
+            ORDER BY s.period
+            """,
+            (city, neighborhood, housing_type, city, neighborhood, housing_type),
+        ).fetchall()
+    
+    def _derive(self, observations: List[sqlite3.Row]) -> List[tuple]:
+        """Compute MoM/YoY changes and rolling medians over calendar months"""
+        by_index = {
+            period_index(row['period']): row['median_monthly_rent_xaf']
+            for row in observations
+        }
+        
+        derived = []
+        for row in observations:
+            idx = period_index(row['period'])
+            median = row['median_monthly_rent_xaf']
+            
+            rolling = []
+            for window in self.ROLLING_WINDOWS:
+                values = [
+                    by_index[i] for i in range(idx - window + 1, idx + 1)
+                    if by_index.get(i) is not None
+                ]
+                rolling.append(statistics.median(values) if values else None)
+            
+            derived.append((
+                row['period'],
+                row['data_year'],
+                median,
+                row['listing_count'],
+                _pct_change(median, by_index.get(idx - 1)),
+                _pct_change(median, by_index.get(idx - 12)),
+                *rolling,
+            ))
+        return derived
+    
+    def trend(self, city: str, neighborhood: Optional[str] = None,
+              housing_type: Optional[str] = None, start: Optional[str] = None,
+              end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Query the precomputed series
+        
+        Args:
+            city: City name
+            neighborhood: Optional neighborhood ('' is the unknown neighborhood)
+            housing_type: Optional housing type
+            start: First period (inclusive), 'YYYY-MM'
+            end: Last period (inclusive), 'YYYY-MM'
+        
+        Returns:
+            List of series rows as dicts, ordered by key and period
+        """
+        clauses = ["city = ?"]
+        params: List[Any] = [city]
+        
+        if neighborhood is not None:
+            clauses.append("neighborhood = ?")
+            params.append(neighborhood)
+        if housing_type is not None:
+            clauses.append("housing_type = ?")
+            params.append(housing_type)
+        if start:
+            clauses.append("period >= ?")
+            params.append(start)
+        if end:
+            clauses.append("period <= ?")
+            params.append(end)
+        
+        rows = self.conn.execute(
+            f"SELECT * FROM series WHERE {' AND '.join(clauses)} "
+            "ORDER BY city, neighborhood, housing_type, period",
+            params,
+        )
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the rent time-series cube")
+    parser.add_argument('--db', default="data/aggregated/rent_timeseries.sqlite")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help="Ingest new months from the monthly archive")
+    build.add_argument('--archive', default="outputs/monthly_archives")
+    
+    trend = subparsers.add_parser('trend', help="Print a trend series")
+    trend.add_argument('city')
+    trend.add_argument('--neighborhood')
+    trend.add_argument('--type', dest='housing_type')
+    trend.add_argument('--start')
+    trend.add_argument('--end')
+    
+    args = parser.parse_args()
+    cube = RentTimeSeriesCube(args.db)
+    
+    try:
+        if args.command == 'build':
+            cube.ingest_archive(args.archive)
+        else:
+            for row in cube.trend(args.city, args.neighborhood, args.housing_type, args.start, args.end):
+                print(row)
+    finally:
+        cube.close()
+
+
+if __name__ == "__main__":
+    main()
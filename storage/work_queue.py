@@ -0,0 +1,260 @@
+"""
+SQLite-backed work queue with leases
+
+Units of work (one city x source scrape each) are leased by workers for a
+fixed time and renewed by heartbeats. A worker that dies stops renewing, its
+lease expires, and the unit goes back to the queue, up to max_attempts. A
+local supervisor that sees a worker process exit can release its leases
+straight away instead of waiting for expiry.
+
+Every state change runs in a BEGIN IMMEDIATE transaction, so any number of
+processes, or machines sharing the directory, can lease concurrently without
+handing out the same unit twice. The database uses SQLite's rollback journal
+(not WAL), which only needs working POSIX file locks on the shared directory.
+"""
+
+import os
+import json
+import time
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+from utils.logger import setup_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    run_id TEXT NOT NULL,
+    unit_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    concurrency_key TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, unit_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_units_status ON units (run_id, status);
+"""
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """Lease-based queue of work units for one or more runs"""
+    
+    def __init__(self, db_path: str = "data/queue/work_queue.sqlite",
+                 lease_seconds: float = 600, max_attempts: int = 3):
+        """
+        Args:
+            db_path: SQLite file (put it on the shared directory for multi-machine runs)
+            lease_seconds: How long a unit stays leased without a heartbeat
+            max_attempts: Leases per unit before it is marked failed
+        """
+        self.logger = setup_logger("work_queue")
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        
+        # Transactions are managed explicitly (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def _transaction(self):
+        return _Immediate(self.conn)
+    
+    def enqueue(self, run_id: str, units: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add units to a run; units already present are left as they are
+        
+        Args:
+            run_id: Run the units belong to
+            units: Dicts with 'unit_id', 'payload' (JSON-serializable) and an
+                optional 'concurrency_key' (at most one live lease per key)
+        
+        Returns:
+            Number of units added
+        """
+        now = time.time()
+        rows = [
+            (run_id, unit['unit_id'], json.dumps(unit['payload'], ensure_ascii=False),
+             unit.get('concurrency_key'), now)
+            for unit in units
+        ]
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO units (run_id, unit_id, payload, concurrency_key, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return self.conn.total_changes - before
+    
+    def lease(self, run_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next available unit
+        
+        Pending units come first, then units whose lease expired. Units whose
+        concurrency key has a live lease are skipped, so one source is never
+        scraped by two workers at once.
+        
+        Returns:
+            The leased unit (payload decoded), or None if nothing is available now
+        """
+        now = time.time()
+        with self._transaction():
+            self._fail_exhausted(run_id, now)
+            row = self.conn.execute(
+                """SELECT * FROM units u
+                   WHERE run_id = ? AND (status = ? OR (status = ? AND lease_expires < ?))
+                     AND (concurrency_key IS NULL OR NOT EXISTS (
+                         SELECT 1 FROM units o
+                         WHERE o.run_id = u.run_id AND o.concurrency_key = u.concurrency_key
+                           AND o.status = ? AND o.lease_expires >= ?))
+                   ORDER BY status = ? DESC, attempts, rowid
+                   LIMIT 1""",
+                (run_id, PENDING, LEASED, now, LEASED, now, PENDING),
+            ).fetchone()
+            if row is None:
+                return None
+            
+            if row['status'] == LEASED:
+                self.logger.warning(
+                    f"Lease on {row['unit_id']} held by {row['worker_id']} expired; re-leasing"
+                )
+            self.conn.execute(
+                """UPDATE units SET status = ?, worker_id = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated_at = ?
+                   WHERE run_id = ? AND unit_id = ?""",
+                (LEASED, worker_id, now + self.lease_seconds, now, run_id, row['unit_id']),
+            )
+        
+        unit = dict(row)
+        unit['payload'] = json.loads(unit['payload'])
+        unit['attempts'] += 1
+        return unit
+    
+    def heartbeat(self, run_id: str, unit_id: str, worker_id: str) -> bool:
+        """
+        Extend a lease
+        
+        Returns:
+            False if the worker no longer holds the lease
+        """
+        now = time.time()
+        with self._transaction():
+            cursor = self.conn.execute(
+                """UPDATE units SET lease_expires = ?, updated_at = ?
+                   WHERE run_id = ? AND unit_id = ? AND worker_id = ? AND status = ?""",
+                (now + self.lease_seconds, now, run_id, unit_id, worker_id, LEASED),
+            )
+            return cursor.rowcount == 1
+    
+    def complete(self, run_id: str, unit_id: str, worker_id: str, result: Any = None) -> bool:
+        """
+        Mark a leased unit done
+        
+        Returns:
+            False if the lease was lost (another worker owns the unit now)
+        """
+        with self._transaction():
+            cursor = self.conn.execute(
+                """UPDATE units SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE run_id = ? AND unit_id = ? AND worker_id = ? AND status = ?""",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(),
+                 run_id, unit_id, worker_id, LEASED),
+            )
+            return cursor.rowcount == 1
+    
+    def fail(self, run_id: str, unit_id: str, worker_id: str, error: str):
+        """Return a unit to the queue, or mark it failed once attempts are exhausted"""
+        with self._transaction():
+            self.conn.execute(
+                """UPDATE units SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                       error = ?, worker_id = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE run_id = ? AND unit_id = ? AND worker_id = ? AND status = ?""",
+                (self.max_attempts, FAILED, PENDING, error, time.time(),
+                 run_id, unit_id, worker_id, LEASED),
+            )
+    
+    def release_worker(self, run_id: str, worker_id: str, error: str = "worker exited") -> int:
+        """
+        Release every lease held by a dead worker
+        
+        Returns:
+            Number of units released
+        """
+        with self._transaction():
+            units = self.conn.execute(
+                "SELECT unit_id FROM units WHERE run_id = ? AND worker_id = ? AND status = ?",
+                (run_id, worker_id, LEASED),
+            ).fetchall()
+        for row in units:
+            self.fail(run_id, row['unit_id'], worker_id, error)
+        return len(units)
+    
+    def _fail_exhausted(self, run_id: str, now: float):
+        """Expired leases with no attempts left become failed units"""
+        self.conn.execute(
+            """UPDATE units SET status = ?, error = COALESCE(error, 'lease expired'), updated_at = ?
+               WHERE run_id = ? AND status = ? AND lease_expires < ? AND attempts >= ?""",
+            (FAILED, now, run_id, LEASED, now, self.max_attempts),
+        )
+    
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """Units per status"""
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM units WHERE run_id = ? GROUP BY status", (run_id,)
+        )
+        for row in rows:
+            counts[row['status']] = row['n']
+        return counts
+    
+    def is_finished(self, run_id: str) -> bool:
+        """True once every unit is done or failed"""
+        with self._transaction():
+            self._fail_exhausted(run_id, time.time())
+        counts = self.counts(run_id)
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+    
+    def units(self, run_id: str, status: str = None) -> List[Dict[str, Any]]:
+        """Units of a run (optionally one status), payload and result decoded"""
+        query = "SELECT * FROM units WHERE run_id = ?"
+        params = [run_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        units = []
+        for row in self.conn.execute(query + " ORDER BY rowid", params):
+            unit = dict(row)
+            unit['payload'] = json.loads(unit['payload'])
+            unit['result'] = json.loads(unit['result']) if unit['result'] else None
+            units.append(unit)
+        return units
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+    
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,43 @@
+import os
+import yaml
+from typing import List, Dict, Any
+
+SOURCE_CATEGORIES = ('portals', 'classifieds', 'agencies')
+
+
+def load_yaml(filepath: str) -> dict:
+    """Load a YAML configuration file"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_cities(config_dir: str = "config") -> List[str]:
+    """
+    Enabled city slugs from cities.yaml
+    
+    Returns:
+        City names in configured order, e.g. ['douala', 'yaounde', 'bafoussam']
+    """
+    config = load_yaml(os.path.join(config_dir, 'cities.yaml'))
+    return [
+        city['name'].lower() for city in config.get('cities', [])
+        if city.get('enabled', True)
+    ]
+
+
+def load_sources(config_dir: str = "config") -> List[Dict[str, Any]]:
+    """Portals, classifieds and agencies from sources.yaml, in scrape order"""
+    config = load_yaml(os.path.join(config_dir, 'sources.yaml'))
+    sources = []
+    for category in SOURCE_CATEGORIES:
+        sources.extend(config.get(category, []) or [])
+    return sources
+
+
+def source_cities(source: Dict[str, Any], cities: List[str]) -> List[str]:
+    """Cities to scrape for a source (its own `cities:` list restricts the global one)"""
+    allowed = source.get('cities')
+    if not allowed:
+        return list(cities)
+    allowed = {city.lower() for city in allowed}
+    return [city for city in cities if city in allowed]
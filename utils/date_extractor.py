@@ -18,19 +18,22 @@ class DateExtractor:
         'september': 9, 'october': 10, 'november': 11, 'december': 12
     }
     
-    def extract_date(self, text: str, fallback_current: bool = True) -> Tuple[Optional[int], Optional[int]]:
+    def extract_date(self, text: str, fallback_current: bool = True,
+                     reference: Optional[datetime] = None) -> Tuple[Optional[int], Optional[int]]:
         """
         Extract year and month from text
         
         Args:
             text: Text to extract date from
             fallback_current: If True, return current year/month if no date found
+            reference: Date relative dates and the fallback are resolved against
+                (the scrape time of the listing); defaults to now
             
         Returns:
             Tuple of (year, month)
         """
         if not text:
-            return self._current_date() if fallback_current else (None, None)
+            return self._current_date(reference) if fallback_current else (None, None)
         
         # Try ISO format first (2024-01-15, 2024/01/15)
         iso_match = re.search(r'(\d{4})[-/](\d{1,2})', text)
@@ -59,7 +62,7 @@ class DateExtractor:
                     return year, month_num
         
         # Try relative dates (e.g., "Il y a 3 jours", "2 days ago")
-        relative = self._parse_relative_date(text)
+        relative = self._parse_relative_date(text, reference)
         if relative:
             return relative
         
@@ -71,11 +74,11 @@ class DateExtractor:
             pass
         
         # Fallback to current date
-        return self._current_date() if fallback_current else (None, None)
+        return self._current_date(reference) if fallback_current else (None, None)
     
-    def _parse_relative_date(self, text: str) -> Optional[Tuple[int, int]]:
+    def _parse_relative_date(self, text: str, reference: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
         """Parse relative dates like 'il y a 3 jours' or '2 weeks ago'"""
-        current = datetime.now()
+        current = reference or datetime.now()
         
         # Days ago
         match = re.search(r'(?:il y a|ago)\s*(\d+)\s*(?:jour|day)s?', text.lower())
@@ -109,9 +112,9 @@ class DateExtractor:
         """Check if date is valid and within 2021-2026 range"""
         return 2021 <= year <= 2026 and 1 <= month <= 12
     
-    def _current_date(self) -> Tuple[int, int]:
-        """Return current year and month"""
-        now = datetime.now()
+    def _current_date(self, reference: Optional[datetime] = None) -> Tuple[int, int]:
+        """Return current (or reference) year and month"""
+        now = reference or datetime.now()
         return now.year, now.month
 
 
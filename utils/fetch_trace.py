@@ -0,0 +1,189 @@
+import re
+import os
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+def to_ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+_DIGITS_RE = re.compile(r'\d+')
+_QUERY_VALUE_RE = re.compile(r'=[^&]*')
+
+
+def url_pattern(url: str, base_url: str = '', city: str = None) -> str:
+    """
+    URL with its source base, city and numbers abstracted
+    
+    https://site.cm/location/douala?page=2 -> {base}/location/{city}?page=
+    """
+    base = base_url.rstrip('/')
+    pattern = '{base}' + url[len(base):] if base and url.startswith(base) else url
+    if city:
+        pattern = re.sub(re.escape(city), '{city}', pattern, flags=re.IGNORECASE)
+    head, _, query = pattern.partition('?')
+    head = _DIGITS_RE.sub('{n}', head)
+    return f"{head}?{_QUERY_VALUE_RE.sub('=', query)}" if query else head
+
+
+class FetchTrace:
+    """
+    HAR-like JSON Lines trace of every HTTP request attempt
+    
+    One compact record per attempt: source, city, url, url pattern, attempt,
+    status or error, politeness sleep, DNS / connect / TLS / TTFB / total
+    time, bytes, and for parsed pages the parse time and listings found.
+    """
+    
+    enabled = True
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.records = 0
+    
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps({key: value for key, value in record.items() if value is not None},
+                          ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.records += 1
+    
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class NullFetchTrace:
+    """Trace sink used when tracing is disabled"""
+    
+    enabled = False
+    path = None
+    
+    def write(self, record: Dict[str, Any]):
+        pass
+    
+    def close(self):
+        pass
+
+
+_active = NullFetchTrace()
+
+
+def get_fetch_trace():
+    """The process-wide trace sink (NullFetchTrace unless enable_fetch_trace() was called)"""
+    return _active
+
+
+def enable_fetch_trace(path: str) -> FetchTrace:
+    """Record every request of scrapers created from now on to a JSONL file"""
+    global _active
+    _active.close()
+    _active = FetchTrace(path)
+    return _active
+
+
+def disable_fetch_trace():
+    global _active
+    _active.close()
+    _active = NullFetchTrace()
+
+
+def load_trace(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    records = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def waste_reason(record: Dict[str, Any]) -> Optional[str]:
+    """Why a request's time was wasted, or None if it was useful"""
+    if 'error' in record:
+        return 'error'
+    status = record.get('status')
+    if status in (404, 410):
+        return 'missing'
+    if status is not None and status >= 400:
+        return 'http_error'
+    if status == 200 and record.get('listings') == 0:
+        return 'zero_yield'
+    return None
+
+
+def _cost_ms(record: Dict[str, Any]) -> float:
+    """Wall time a request attempt cost the scrape (sleeps included)"""
+    return sum(record.get(key) or 0 for key in ('sleep_ms', 'total_ms', 'parse_ms', 'extract_ms', 'backoff_ms'))
+
+
+def summarize_trace(records: List[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+    """
+    Rank sources and URL patterns by time spent on requests that yielded nothing
+    
+    Returns:
+        Totals plus 'sources', 'patterns' and 'urls' rankings, each row with
+        requests, wasted requests by reason, total and wasted seconds, and
+        listings found
+    """
+    def new_row():
+        return {'requests': 0, 'wasted_requests': 0, 'reasons': defaultdict(int),
+                'seconds': 0.0, 'wasted_seconds': 0.0, 'listings': 0, 'bytes': 0}
+    
+    groups = {'sources': defaultdict(new_row), 'patterns': defaultdict(new_row), 'urls': defaultdict(new_row)}
+    totals = new_row()
+    for record in records:
+        cost = _cost_ms(record) / 1000
+        reason = waste_reason(record)
+        keys = {
+            'sources': record.get('source'),
+            'patterns': f"{record.get('source')} {record.get('pattern', record.get('url'))}",
+            'urls': record.get('url'),
+        }
+        for row in [totals] + [groups[name][key] for name, key in keys.items()]:
+            row['requests'] += 1
+            row['seconds'] += cost
+            row['listings'] += record.get('listings') or 0
+            row['bytes'] += record.get('bytes') or 0
+            if reason:
+                row['wasted_requests'] += 1
+                row['wasted_seconds'] += cost
+                row['reasons'][reason] += 1
+    
+    def finish(row):
+        return {**row, 'reasons': dict(row['reasons']),
+                'seconds': round(row['seconds'], 3), 'wasted_seconds': round(row['wasted_seconds'], 3)}
+    
+    summary = {'totals': finish(totals)}
+    for name, rows in groups.items():
+        ranked = sorted(rows.items(), key=lambda item: item[1]['wasted_seconds'], reverse=True)
+        summary[name] = [{'key': key, **finish(row)} for key, row in ranked[:top]]
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Plain-text tables of a summarize_trace() result"""
+    totals = summary['totals']
+    lines = [
+        f"{totals['requests']} requests, {totals['seconds']:.1f}s, "
+        f"{totals['wasted_requests']} wasted ({totals['wasted_seconds']:.1f}s), "
+        f"{totals['listings']} listings, {totals['bytes'] / 1e6:.1f} MB"
+    ]
+    for name, title in (('sources', 'Sources'), ('patterns', 'Source URL patterns'), ('urls', 'URLs')):
+        rows = summary[name]
+        heading = f"{title} by wasted time"
+        width = max([len(str(row['key'])) for row in rows] + [len(heading)])
+        lines.append('')
+        lines.append(f"{heading:<{width}} {'wasted s':>9} {'total s':>9} "
+                     f"{'requests':>9} {'wasted':>7} {'listings':>9}  reasons")
+        for row in rows:
+            reasons = ', '.join(f"{reason} {count}" for reason, count in sorted(row['reasons'].items()))
+            lines.append(
+                f"{str(row['key']):<{width}} {row['wasted_seconds']:>9.2f} {row['seconds']:>9.2f} "
+                f"{row['requests']:>9} {row['wasted_requests']:>7} {row['listings']:>9}  {reasons}"
+            )
+    return '\n'.join(lines) + '\n'
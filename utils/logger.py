@@ -1,13 +1,137 @@
-import logging
 import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_DIR = "logs"
+
+# Run log shared by every process of a run (set by the first process, inherited by children)
+RUN_LOG_ENV = "STRATAXIS_RUN_LOG"
+
+FILE_FORMAT = '%(asctime)s | %(levelname)-8s | %(processName)s | %(name)s | %(message)s'
+CONSOLE_FORMAT = '%(levelname)-8s | %(message)s'
+
+
+class _DelayedFileHandler(logging.FileHandler):
+    """FileHandler that creates its directory and file on the first record"""
+    
+    def __init__(self, filename: str, encoding: str = None):
+        super().__init__(filename, encoding=encoding, delay=True)
+    
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _RunLog:
+    """
+    One queue, listener thread and file handler per process
+    
+    Loggers only put records on the queue; the listener thread formats and
+    writes them to the run log. Every process of a run appends to the same file.
+    """
+    
+    def __init__(self, path: str):
+        self.pid = os.getpid()
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.stopped = False
+        
+        file_handler = _DelayedFileHandler(path, encoding='utf-8')
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT, datefmt='%Y-%m-%d %H:%M:%S'))
+        self.listener = QueueListener(self.queue, file_handler)
+        self.listener.start()
+    
+    def stop(self):
+        """Drain the queue and close the file"""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_run_log: Optional[_RunLog] = None
+_run_log_lock = threading.Lock()
+
+
+def run_log_path() -> str:
+    """Path of this run's consolidated log file (chosen once, inherited by child processes)"""
+    path = os.environ.get(RUN_LOG_ENV)
+    if not path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.environ[RUN_LOG_ENV] = os.path.abspath(os.path.join(LOG_DIR, f"scraper_{timestamp}.log"))
+    return path
+
+
+def _current_run_log() -> _RunLog:
+    """The run log of this process, started on the first record (again after a fork)"""
+    global _run_log
+    run_log = _run_log
+    if run_log is not None and run_log.pid == os.getpid():
+        return run_log
+    
+    with _run_log_lock:
+        if _run_log is None or _run_log.pid != os.getpid():
+            _run_log = _RunLog(run_log_path())
+            multiprocessing = sys.modules.get('multiprocessing')
+            if multiprocessing is not None and multiprocessing.parent_process() is not None:
+                # multiprocessing children leave through os._exit(), skipping atexit
+                from multiprocessing.util import Finalize
+                Finalize(_run_log, _run_log.stop, exitpriority=100)
+        return _run_log
+
+
+def _stop_run_log():
+    if _run_log is not None and _run_log.pid == os.getpid():
+        _run_log.stop()
+
+
+atexit.register(_stop_run_log)
+
+
+class _RunLogHandler(QueueHandler):
+    """Puts records on the current process's run log queue"""
+    
+    def __init__(self):
+        super().__init__(None)
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze the message (args may change before the listener formats it);
+        # unlike QueueHandler.prepare, no copy and no formatting on the caller's thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        _current_run_log().queue.put_nowait(record)
+
+
+_run_log_handler = _RunLogHandler()
+
 
 def setup_logger(name="strataxis_scraper"):
-    """Setup structured logger with file and console handlers"""
+    """
+    Setup structured logger with file and console handlers
     
-    # Create logs directory
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
+    Every logger writes to the same run log (logs/scraper_<timestamp>.log)
+    through a queue drained by a background thread, so logging a record
+    costs the caller a queue put rather than a file write. Console output
+    (INFO and above) stays synchronous to keep its order with print().
+    The log file (and logs/) is only created when the first record is
+    written, so constructing components does not touch the filesystem.
+    """
+    
+    # Fix the run log path now, so processes started before the first record inherit it
+    run_log_path()
     
     # Create logger
     logger = logging.getLogger(name)
@@ -17,28 +141,64 @@ def setup_logger(name="strataxis_scraper"):
     if logger.handlers:
         return logger
     
-    # File handler (detailed logs)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_handler = logging.FileHandler(
-        os.path.join(log_dir, f"scraper_{timestamp}.log"),
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        '%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
-    
     # Console handler (important logs only)
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter(
-        '%(levelname)-8s | %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
     
-    logger.addHandler(file_handler)
+    logger.addHandler(_run_log_handler)
     logger.addHandler(console_handler)
     
     return logger
+
+
+class LogSampler:
+    """
+    Sampled / rate-limited logging for hot paths
+    
+    Per key, the first `burst` records are logged, then one in every
+    `every`, and at most one per `interval` seconds if set. Logged records
+    report how many were suppressed since the previous one. Messages take
+    %-style arguments, so suppressed records are never formatted.
+    
+    Counts are not locked: under concurrency a few more or fewer records
+    than configured may get through.
+    """
+    
+    def __init__(self, logger: logging.Logger, every: int = 100, burst: int = 5,
+                 interval: Optional[float] = None):
+        self.logger = logger
+        self.every = every
+        self.burst = burst
+        self.interval = interval
+        self._seen: Dict[str, int] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._last: Dict[str, float] = {}
+    
+    def allow(self, key: str) -> bool:
+        """Count an occurrence of key and tell whether to log it"""
+        seen = self._seen[key] = self._seen.get(key, 0) + 1
+        if seen > self.burst and seen % self.every:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        if self.interval is not None:
+            now = time.monotonic()
+            if now - self._last.get(key, float('-inf')) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+        return True
+    
+    def log(self, level: int, key: str, msg: str, *args):
+        if not self.logger.isEnabledFor(level) or not self.allow(key):
+            return
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            msg = f"{msg} (+{suppressed} similar suppressed)"
+        self.logger.log(level, msg, *args)
+    
+    def debug(self, key: str, msg: str, *args):
+        self.log(logging.DEBUG, key, msg, *args)
+    
+    def warning(self, key: str, msg: str, *args):
+        self.log(logging.WARNING, key, msg, *args)
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import bisect
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Histogram buckets by metric-name suffix (Prometheus naming: *_seconds, *_bytes)
+SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DEFAULT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _buckets_for(name: str) -> Tuple[float, ...]:
+    if name.endswith('_seconds'):
+        return SECONDS_BUCKETS
+    if name.endswith('_bytes'):
+        return BYTES_BUCKETS
+    return DEFAULT_BUCKETS
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'min', 'max')
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': {str(bound): n for bound, n in zip(self.bounds, self.counts) if n},
+            'overflow': self.counts[-1],
+        }
+
+
+class _Timer:
+    """Context manager observing elapsed seconds into a histogram"""
+    
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+    
+    def __init__(self, metrics: 'Metrics', name: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Metrics:
+    """
+    Thread-safe counters and histograms with labels
+    
+    Counters are monotonically increasing totals (name them *_total);
+    histograms record distributions, with buckets chosen by the name's unit
+    suffix (*_seconds, *_bytes). timer() observes a block's duration.
+    """
+    
+    enabled = True
+    
+    def __init__(self, prefix: str = "strataxis"):
+        self.prefix = prefix
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+    
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+    
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(_buckets_for(name))
+            histogram.observe(value)
+    
+    def timer(self, name: str, **labels) -> _Timer:
+        return _Timer(self, name, labels)
+    
+    def counter_value(self, name: str, **labels) -> float:
+        """Current value of one counter series (0 if never incremented)"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """All series as plain data"""
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: [{'labels': dict(key), **histogram.to_dict()} for key, histogram in sorted(series.items())]
+                for name, series in sorted(self._histograms.items())
+            }
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'written_at': datetime.now().isoformat(timespec='seconds'),
+            'counters': counters,
+            'histograms': histograms,
+        }
+    
+    def write_json(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        return path
+    
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector)"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            
+            for name, series in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(histogram.bounds, histogram.counts):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{_format_labels(key, le=bound)} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, le='+Inf')} {histogram.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+    
+    def write_prometheus(self, path: str) -> str:
+        """Write atomically, so the collector never reads a partial file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+
+class _NullTimer:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Metrics sink used when instrumentation is disabled: every call is a no-op"""
+    
+    enabled = False
+    
+    def inc(self, name: str, amount: float = 1, **labels):
+        pass
+    
+    def observe(self, name: str, value: float, **labels):
+        pass
+    
+    def timer(self, name: str, **labels) -> _NullTimer:
+        return _NULL_TIMER
+    
+    def counter_value(self, name: str, **labels) -> float:
+        return 0
+
+
+def _format_labels(key: LabelKey, **extra) -> str:
+    pairs = list(key) + [(name, value if isinstance(value, str) else _format_value(value))
+                         for name, value in extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_active = NullMetrics()
+
+
+def get_metrics():
+    """The process-wide metrics sink (NullMetrics unless enable_metrics() was called)"""
+    return _active
+
+
+def enable_metrics(prefix: str = "strataxis") -> Metrics:
+    """Install and return a recording Metrics instance for this process"""
+    global _active
+    _active = Metrics(prefix)
+    return _active
+
+
+def disable_metrics():
+    global _active
+    _active = NullMetrics()
@@ -0,0 +1,244 @@
+import io
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.logger import setup_logger
+
+
+# Allocations of the profiling machinery itself, left out of memory reports
+_OWN_FILES = {tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__}
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') or 'unit'
+
+
+class _Frame:
+    """An open unit: its profiler, stats of finished inner units, and their bookkeeping time"""
+    
+    __slots__ = ('profile', 'children', 'overhead', 'cpu_overhead')
+    
+    def __init__(self, profile: cProfile.Profile):
+        self.profile = profile
+        self.children: List[pstats.Stats] = []
+        self.overhead = 0.0
+        self.cpu_overhead = 0.0
+
+
+class Profiler:
+    """
+    Separate cProfile captures (and optional tracemalloc diffs) per named unit
+    
+    Each `with profiler.profile(name):` block writes <name>.prof (load with
+    pstats or snakeviz) and <name>.txt (top functions by cumulative and own
+    time, and top allocating lines) to one directory per run. Units nest: an
+    inner unit suspends the outer one's profiler, and the outer .prof then
+    includes the inner units, so a stage profile covers its whole stage.
+    
+    cProfile only sees the thread that opened the unit. tracemalloc is
+    process-wide, so units running concurrently in other threads share
+    each other's allocations.
+    """
+    
+    enabled = True
+    
+    def __init__(self, output_dir: str = "data/profiles", memory: bool = False, top: int = 25):
+        """
+        Args:
+            output_dir: Profiles go to <output_dir>/<timestamp>/
+            memory: Also trace allocations (slows the run down noticeably)
+            top: Rows in each summary table
+        """
+        self.logger = setup_logger("profiler")
+        self.run_dir = os.path.join(output_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.memory = memory
+        self.top = top
+        self.units: List[Dict[str, Any]] = []
+        self._names = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+        self._started_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+    
+    @contextmanager
+    def profile(self, name: str):
+        entered, cpu_entered = time.perf_counter(), time.thread_time()
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        if parent:
+            parent.profile.disable()
+        
+        # Taken before enabling the profiler, which would otherwise time it
+        snapshot = self._snapshot() if self.memory else None
+        frame = _Frame(cProfile.Profile())
+        try:
+            frame.profile.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active cProfile per process: concurrent
+            # units (streaming scrape threads) cannot all be captured
+            self.logger.warning(f"Not profiling {name}: {e}")
+            if parent:
+                parent.profile.enable()
+            yield
+            return
+        
+        stack.append(frame)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            frame.profile.disable()
+            end, cpu_end = time.perf_counter(), time.thread_time()
+            stack.pop()
+            
+            stats = pstats.Stats(frame.profile)
+            if frame.children:
+                stats.add(*frame.children)
+            memory = self._memory_diff(snapshot) if snapshot is not None else None
+            # Inner units' snapshots and report writing are not the unit's own time
+            self._write_unit(name, stats, end - start - frame.overhead,
+                             cpu_end - cpu_start - frame.cpu_overhead, memory)
+            
+            if parent:
+                parent.children.append(stats)
+                parent.overhead += (start - entered) + (time.perf_counter() - end) + frame.overhead
+                parent.cpu_overhead += (cpu_start - cpu_entered) + (time.thread_time() - cpu_end) + frame.cpu_overhead
+                parent.profile.enable()
+    
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # Unfiltered: Snapshot.filter_traces() is far slower than grouping
+        return tracemalloc.take_snapshot()
+    
+    def _memory_diff(self, before: tracemalloc.Snapshot) -> Dict[str, Any]:
+        """Net allocation of the unit and its top allocating lines"""
+        diff = [
+            stat for stat in self._snapshot().compare_to(before, 'lineno')
+            if stat.traceback[0].filename not in _OWN_FILES
+        ]
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'net_bytes': sum(stat.size_diff for stat in diff),
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'top': [
+                {
+                    'line': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_diff_bytes': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                }
+                for stat in diff[:self.top]
+            ],
+        }
+    
+    def _unique_name(self, name: str) -> str:
+        with self._lock:
+            slug = base = _slug(name)
+            suffix = 1
+            while slug in self._names:
+                suffix += 1
+                slug = f"{base}-{suffix}"
+            self._names.add(slug)
+            return slug
+    
+    def _write_unit(self, name: str, stats: pstats.Stats, wall: float, cpu: float,
+                    memory: Optional[Dict[str, Any]]):
+        slug = self._unique_name(name)
+        os.makedirs(self.run_dir, exist_ok=True)
+        prof_path = os.path.join(self.run_dir, f"{slug}.prof")
+        stats.dump_stats(prof_path)
+        
+        entry = {
+            'name': name,
+            'prof': prof_path,
+            'report': os.path.join(self.run_dir, f"{slug}.txt"),
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(cpu, 4),
+            'calls': stats.total_calls,
+            'net_alloc_bytes': memory['net_bytes'] if memory else None,
+        }
+        with open(entry['report'], 'w', encoding='utf-8') as f:
+            f.write(self._report(name, prof_path, entry, memory))
+        
+        with self._lock:
+            self.units.append(entry)
+    
+    def _report(self, name: str, prof_path: str, entry: Dict[str, Any],
+                memory: Optional[Dict[str, Any]]) -> str:
+        out = io.StringIO()
+        out.write(f"{name}\n")
+        out.write(f"wall {entry['wall_seconds']:.3f}s, cpu {entry['cpu_seconds']:.3f}s, "
+                  f"{entry['calls']:,} calls\n")
+        
+        # From the file: strip_dirs() must not touch the stats outer units merge
+        stats = pstats.Stats(prof_path, stream=out).strip_dirs()
+        for sort in ('cumulative', 'tottime'):
+            out.write(f"\n== Top {self.top} by {sort} ==\n")
+            stats.sort_stats(sort).print_stats(self.top)
+        
+        if memory:
+            out.write(f"\n== Top {self.top} allocating lines "
+                      f"(net {memory['net_bytes'] / 1e6:+.2f} MB, "
+                      f"traced peak {memory['traced_peak_bytes'] / 1e6:.1f} MB) ==\n")
+            for row in memory['top']:
+                out.write(f"{row['size_diff_bytes'] / 1024:>+12.1f} KiB {row['count_diff']:>+9} blocks  {row['line']}\n")
+        return out.getvalue()
+    
+    def summary_table(self) -> str:
+        """One row per unit, slowest first"""
+        rows = sorted(self.units, key=lambda unit: unit['wall_seconds'], reverse=True)
+        width = max([len(unit['name']) for unit in rows] + [4])
+        lines = [f"{'unit':<{width}} {'wall (s)':>9} {'cpu (s)':>9} {'calls':>12} {'net alloc (MB)':>15}"]
+        for unit in rows:
+            alloc = '' if unit['net_alloc_bytes'] is None else f"{unit['net_alloc_bytes'] / 1e6:+.2f}"
+            lines.append(
+                f"{unit['name']:<{width}} {unit['wall_seconds']:>9.3f} {unit['cpu_seconds']:>9.3f} "
+                f"{unit['calls']:>12,} {alloc:>15}"
+            )
+        return '\n'.join(lines) + '\n'
+    
+    def finish(self) -> Optional[str]:
+        """
+        Write the run's index (profiles.json) and summary table (summary.txt)
+        
+        Returns:
+            Profile directory, or None if nothing was profiled
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if not self.units:
+            return None
+        
+        with open(os.path.join(self.run_dir, 'profiles.json'), 'w', encoding='utf-8') as f:
+            json.dump({'memory': self.memory, 'units': self.units}, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(self.run_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.summary_table())
+        
+        self.logger.info(f"Profiles written to {self.run_dir} ({len(self.units)} units)")
+        return self.run_dir
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+class NullProfiler:
+    """Profiler used when profiling is off: every unit is a no-op"""
+    
+    enabled = False
+    
+    def profile(self, name: str):
+        return _NULL_CONTEXT
+    
+    def finish(self) -> Optional[str]:
+        return None
@@ -0,0 +1,182 @@
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def _shared(value: Any) -> Any:
+    """One object per distinct categorical string (city, source, ...) instead of one per listing"""
+    return sys.intern(str(value)) if isinstance(value, str) else value
+
+
+class _Record(Mapping):
+    """
+    Slotted listing record that reads like the dict it replaces
+    
+    record['city'], record.get('city'), `in`, iteration, keys() and items()
+    behave as on a dict with FIELDS as keys, in the same order. Records are
+    read-only by convention; to_dict() gives a plain dict (JSON export,
+    callers that need to modify a listing).
+    """
+    
+    __slots__ = ()
+    
+    # Keys, in the order of the dict the record replaces (stored slots and derived properties)
+    FIELDS = ()
+    _KEYS = frozenset()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._KEYS else default
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._KEYS
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.FIELDS, self._values(self)))
+    
+    @classmethod
+    def from_dict(cls, data: Mapping):
+        """Record from a listing dict (e.g. loaded from a JSON dump); derived keys are recomputed"""
+        if type(data) is cls:
+            return data
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+    
+    def __reduce__(self):
+        # Positional slot values: far smaller pickles (checkpoints, worker results) than slot dicts
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._KEYS = frozenset(cls.FIELDS)
+        cls._values = staticmethod(attrgetter(*cls.FIELDS))
+
+
+class RawListing(_Record):
+    """A scraped listing, as built by BaseScraper.build_listing_dict()"""
+    
+    __slots__ = (
+        'city', 'neighborhood', 'housing_type_raw', 'rent_price_raw', 'currency_raw',
+        'payment_frequency_raw', 'bedrooms_raw', 'size_raw', 'listing_date',
+        'source_site', 'listing_url', 'full_description',
+    )
+    FIELDS = __slots__
+    
+    def __init__(self, city: str = '', neighborhood: str = '', housing_type_raw: str = '',
+                 rent_price_raw: str = '', currency_raw: str = 'XAF', payment_frequency_raw: str = '',
+                 bedrooms_raw: str = '', size_raw: str = '', listing_date: str = '',
+                 source_site: str = '', listing_url: str = '', full_description: str = ''):
+        self.city = _shared(city)
+        self.neighborhood = _shared(neighborhood)
+        self.housing_type_raw = housing_type_raw
+        self.rent_price_raw = rent_price_raw
+        self.currency_raw = _shared(currency_raw)
+        self.payment_frequency_raw = _shared(payment_frequency_raw)
+        self.bedrooms_raw = _shared(bedrooms_raw)
+        self.size_raw = size_raw
+        self.listing_date = listing_date
+        self.source_site = _shared(source_site)
+        self.listing_url = listing_url
+        self.full_description = full_description
+
+
+class NormalizedListing(_Record):
+    """
+    A normalized listing, as returned by Normalizer.normalize_listing()
+    
+    rent_per_sqm and the has_* quality flags are derived from the stored
+    fields on access, by the rules the normalizer used to store them with.
+    """
+    
+    __slots__ = (
+        'city', 'neighborhood', 'housing_type', 'bedrooms', 'size_sqm', 'monthly_rent_xaf',
+        'year', 'month', 'source_site', 'listing_url',
+    )
+    FIELDS = (
+        'city', 'neighborhood', 'housing_type', 'bedrooms', 'size_sqm',
+        'monthly_rent_xaf', 'rent_per_sqm', 'year', 'month', 'source_site', 'listing_url',
+        'has_price', 'has_size', 'has_neighborhood', 'has_housing_type', 'has_date',
+    )
+    
+    def __init__(self, city: str = '', neighborhood: str = '', housing_type: str = '',
+                 bedrooms: Optional[int] = None, size_sqm: Optional[float] = None,
+                 monthly_rent_xaf: Optional[float] = None, year: Optional[int] = None,
+                 month: Optional[int] = None, source_site: str = '', listing_url: str = ''):
+        self.city = _shared(city)
+        self.neighborhood = _shared(neighborhood)
+        self.housing_type = _shared(housing_type)
+        self.bedrooms = bedrooms
+        self.size_sqm = size_sqm
+        self.monthly_rent_xaf = monthly_rent_xaf
+        self.year = year
+        self.month = month
+        self.source_site = _shared(source_site)
+        self.listing_url = listing_url
+    
+    @property
+    def rent_per_sqm(self) -> Optional[float]:
+        if self.monthly_rent_xaf and self.size_sqm:
+            return self.monthly_rent_xaf / self.size_sqm
+        return None
+    
+    @property
+    def has_price(self) -> bool:
+        return self.monthly_rent_xaf is not None
+    
+    @property
+    def has_size(self) -> bool:
+        return self.size_sqm is not None
+    
+    @property
+    def has_neighborhood(self) -> bool:
+        return bool(self.neighborhood)
+    
+    @property
+    def has_housing_type(self) -> bool:
+        return bool(self.housing_type)
+    
+    @property
+    def has_date(self) -> bool:
+        return self.year is not None
+
+
+def record_columns(records: Sequence[Any],
+                   fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, List[Any]]]:
+    """
+    Column lists (field -> values) of a sequence of records of one type
+    
+    Args:
+        records: Listing records
+        fields: Fields to extract (default: all FIELDS)
+    
+    Returns:
+        Columns in FIELDS (or fields) order, or None if the sequence is empty
+        or holds anything else (e.g. dicts loaded from an older checkpoint)
+    """
+    if not records:
+        return None
+    record_type = type(records[0])
+    if not issubclass(record_type, _Record) or any(type(record) is not record_type for record in records):
+        return None
+    return {field: list(map(attrgetter(field), records)) for field in fields or record_type.FIELDS}
+
+
+def json_default(value: Any) -> Dict[str, Any]:
+    """json.dump(s) default= hook: records serialize as their dict"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")